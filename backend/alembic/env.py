@@ -10,6 +10,7 @@ from app.db.database import Base
 from app.models.user import User, UserProfile
 from app.models.vanity import VanityProduct, ProductDatabase, ProductCategory
 from app.models.makeup import MakeupSession, ScheduledEvent, MakeupHistory
+from app.models.cache import SkinAnalysisCacheEntry, LLMResponseCacheEntry
 
 # Import settings
 from app.core.config import settings
@@ -0,0 +1,60 @@
+"""add skin analysis cache table
+
+Revision ID: 5c1e7a9d2b30
+Revises: abc123def456
+Create Date: 2026-10-17 09:00:00.000000+00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c1e7a9d2b30'
+down_revision = 'abc123def456'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Create skin_analysis_cache table
+    op.create_table(
+        'skin_analysis_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('analysis_version', sa.String(length=50), nullable=False),
+        sa.Column('face_hash', sa.BigInteger(), nullable=True),
+        sa.Column('band_0', sa.Integer(), nullable=True),
+        sa.Column('band_1', sa.Integer(), nullable=True),
+        sa.Column('band_2', sa.Integer(), nullable=True),
+        sa.Column('band_3', sa.Integer(), nullable=True),
+        sa.Column('result', sa.JSON(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('last_hit_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'content_hash', 'analysis_version', name='uq_skin_analysis_cache_user_hash_version')
+    )
+    op.create_index(op.f('ix_skin_analysis_cache_id'), 'skin_analysis_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_skin_analysis_cache_user_id'), 'skin_analysis_cache', ['user_id'], unique=False)
+    op.create_index(op.f('ix_skin_analysis_cache_content_hash'), 'skin_analysis_cache', ['content_hash'], unique=False)
+    op.create_index(op.f('ix_skin_analysis_cache_analysis_version'), 'skin_analysis_cache', ['analysis_version'], unique=False)
+    for band in range(4):
+        op.create_index(
+            op.f(f'ix_skin_analysis_cache_band_{band}'),
+            'skin_analysis_cache',
+            [f'band_{band}'],
+            unique=False
+        )
+
+
+def downgrade() -> None:
+    # Drop table if rolling back
+    for band in range(4):
+        op.drop_index(op.f(f'ix_skin_analysis_cache_band_{band}'), table_name='skin_analysis_cache')
+    op.drop_index(op.f('ix_skin_analysis_cache_analysis_version'), table_name='skin_analysis_cache')
+    op.drop_index(op.f('ix_skin_analysis_cache_content_hash'), table_name='skin_analysis_cache')
+    op.drop_index(op.f('ix_skin_analysis_cache_user_id'), table_name='skin_analysis_cache')
+    op.drop_index(op.f('ix_skin_analysis_cache_id'), table_name='skin_analysis_cache')
+    op.drop_table('skin_analysis_cache')
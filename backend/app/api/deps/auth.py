@@ -10,6 +10,7 @@ from sqlalchemy import select
 from app.db.database import get_db
 from app.models.user import User
 from app.core.security import decode_token, validate_token_type
+from app.services.llm.tokens import set_usage_user
 from typing import Optional
 
 security = HTTPBearer()
@@ -42,6 +43,7 @@ async def get_current_user(
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Inactive user")
 
+    set_usage_user(user.id)
     return user
 
 
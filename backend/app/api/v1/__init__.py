@@ -8,6 +8,7 @@ from app.api.v1.endpoints import (
     profile,
     makeup,
     vanity,
+    vanity_smart,
     events,
     speech
 )
@@ -20,5 +21,6 @@ api_v1_router.include_router(auth.router, prefix="/auth", tags=["Authentication"
 api_v1_router.include_router(profile.router, prefix="/profile", tags=["Profile"])
 api_v1_router.include_router(makeup.router, prefix="/makeup", tags=["Makeup"])
 api_v1_router.include_router(vanity.router, prefix="/vanity", tags=["Vanity | Products"])
+api_v1_router.include_router(vanity_smart.router)  # prefix and tags set on the router
 api_v1_router.include_router(events.router, prefix="/events", tags=["Events"])
 api_v1_router.include_router(speech.router, prefix="/speech", tags=["Speech"])
\ No newline at end of file
@@ -6,7 +6,8 @@ Complete makeup session workflow
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.db.database import get_db
+from app.db.database import AsyncSessionLocal, get_db
+from app.core.sse import sse_event, sse_response
 from app.models.user import User
 from app.models.makeup import MakeupSession, SessionStatus,HairRecommendation
 from app.schemas.makeup import (
@@ -17,16 +18,19 @@ from app.schemas.makeup import (
 )
 from app.models.user import User, UserStyleSession
 from app.api.deps.auth import get_current_user
+from app.core.config import settings
 from app.services.azure.vision_service import vision_service
 from app.services.azure.storage_service import storage_service
 from app.services.azure.llm_service import llm_service
 # from app.services.azure.search_service import search_service
 from app.models.vanity import VanityProduct
+from app.services.search.catalog_search import catalog_search
+from app.services.search.shade_index import SKIN_MATCHED_CATEGORIES, shade_delta_e
 from datetime import datetime
 
 from datetime import datetime, timezone
 from loguru import logger
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 router = APIRouter()
 
@@ -497,6 +501,113 @@ async def generate_makeup_plan(
     
     logger.info(f"🎨 Starting makeup plan generation for session {session_id}")
     
+    session, user_profile_data, outfit_data, accessories_data = await _load_plan_context(
+        session_id, current_user, db
+    )
+    
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # STEP 1.4: Generate AI makeup plan
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    logger.info("🤖 Calling LLM service to generate makeup plan...")
+    
+    makeup_plan = await llm_service.generate_makeup_plan(
+        user_profile_data,
+        session.occasion.value,
+        session.scope.value,
+        outfit_data,
+        accessories_data
+    )
+    
+    makeup_plan = _finalize_plan(makeup_plan, session.occasion.value, session.scope.value)
+    
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # STEP 1.7: Save to database
+    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    _apply_plan(session, makeup_plan)
+    
+    await db.commit()
+    await db.refresh(session)
+    
+    logger.info(f"✅ Makeup plan saved successfully with {session.total_steps} steps")
+    
+    return MakeupPlan(**makeup_plan)
+
+
+@router.post("/{session_id}/generate-plan/stream")
+async def stream_makeup_plan(
+    session_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    ⚡ Streaming makeup plan over Server-Sent Events.
+    
+    Events: `step` for every step as soon as the model finishes it (with the
+    new product requirement, if any, and the running duration), then `plan`
+    (the final MakeupPlan, saved to the session). Failures are sent as an
+    `error` event.
+    """
+    session, user_profile_data, outfit_data, accessories_data = await _load_plan_context(
+        session_id, current_user, db
+    )
+    occasion, scope = session.occasion.value, session.scope.value
+    user_id = current_user.id
+    
+    logger.info(f"🎨 Streaming makeup plan for session {session_id}")
+    
+    async def event_stream():
+        total_duration = 0
+        seen_categories = set()
+        step_count = 0
+        try:
+            async for event, data in llm_service.stream_makeup_plan(
+                user_profile_data, occasion, scope, outfit_data, accessories_data
+            ):
+                if event == "step":
+                    step_count += 1
+                    total_duration += data.get("duration_minutes", 5)
+                    requirement = None
+                    category = data.get("category")
+                    if category and category not in seen_categories:
+                        seen_categories.add(category)
+                        requirement = _product_requirement(data).model_dump()
+                    yield sse_event("step", {
+                        "index": step_count,
+                        "step": data,
+                        "product_requirement": requirement,
+                        "total_duration_minutes": total_duration
+                    })
+                    continue
+                
+                makeup_plan = _finalize_plan(data, occasion, scope)
+                
+                # The request-scoped session is closed once streaming starts
+                async with AsyncSessionLocal() as stream_db:
+                    result = await stream_db.execute(
+                        select(MakeupSession).where(
+                            MakeupSession.id == session_id,
+                            MakeupSession.user_id == user_id
+                        )
+                    )
+                    _apply_plan(result.scalar_one(), makeup_plan)
+                    await stream_db.commit()
+                
+                logger.info(f"✅ Streamed makeup plan saved with {len(makeup_plan.get('steps', []))} steps")
+                yield sse_event("plan", MakeupPlan(**makeup_plan).model_dump())
+        
+        except Exception as e:
+            logger.error(f"❌ Streaming makeup plan error: {str(e)}")
+            yield sse_event("error", {
+                "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                "detail": "Failed to generate makeup plan. Please try again."
+            })
+    
+    return sse_response(event_stream())
+
+
+async def _load_plan_context(session_id: int, current_user: User, db: AsyncSession):
+    """Session, profile, outfit and accessories needed to prompt for a plan"""
+    
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     # STEP 1.1: Fetch and validate session
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -570,26 +681,31 @@ async def generate_makeup_plan(
     
     logger.info(f"👗 Outfit context loaded: {outfit_data['outfit_type']} in {outfit_data['dominant_color']}")
     
-    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-    # STEP 1.4: Generate AI makeup plan
-    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-    logger.info("🤖 Calling LLM service to generate makeup plan...")
-    
-    makeup_plan = await llm_service.generate_makeup_plan(
-        user_profile_data,
-        session.occasion.value,
-        session.scope.value,
-        outfit_data,
-        accessories_data
+    return session, user_profile_data, outfit_data, accessories_data
+
+
+def _product_requirement(step: Dict) -> ProductRequirement:
+    return ProductRequirement(
+        category=step.get("category"),
+        specific_type=step.get("product_type", step.get("category")),
+        shade_requirement=step.get("shade_needed"),
+        finish_type=step.get("finish_type"),
+        priority=step.get("priority", "required"),
+        alternative_options=step.get("alternatives", []),
+        usage_tips=step.get("tips", "")
     )
+
+
+def _finalize_plan(makeup_plan: Dict, occasion: str, scope: str) -> Dict:
+    """Metadata, duration, difficulty and product requirements derived from the steps"""
     
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     # STEP 1.5: Enhance plan with metadata
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     if "occasion" not in makeup_plan:
-        makeup_plan["occasion"] = session.occasion.value
+        makeup_plan["occasion"] = occasion
     if "scope" not in makeup_plan:
-        makeup_plan["scope"] = session.scope.value
+        makeup_plan["scope"] = scope
     
     # Calculate total duration
     total_duration = sum(step.get("duration_minutes", 5) for step in makeup_plan.get("steps", []))
@@ -614,37 +730,19 @@ async def generate_makeup_plan(
         category = step.get("category")
         if category and category not in seen_categories:
             seen_categories.add(category)
-            
-            product_req = ProductRequirement(
-                category=category,
-                specific_type=step.get("product_type", category),
-                shade_requirement=step.get("shade_needed"),
-                finish_type=step.get("finish_type"),
-                priority=step.get("priority", "required"),
-                alternative_options=step.get("alternatives", []),
-                usage_tips=step.get("tips", "")
-            )
-            product_requirements.append(product_req)
+            product_requirements.append(_product_requirement(step))
     
     makeup_plan["product_requirements"] = [req.dict() for req in product_requirements]
     
     logger.info(f"📦 Extracted {len(product_requirements)} product requirements")
-    
-    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-    # STEP 1.7: Save to database
-    # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    return makeup_plan
+
+
+def _apply_plan(session: MakeupSession, makeup_plan: Dict):
     session.makeup_plan = makeup_plan
     session.total_steps = len(makeup_plan.get("steps", []))
     session.steps_completed = []
     session.current_step = 1
-    
-    await db.commit()
-    await db.refresh(session)
-    
-    logger.info(f"✅ Makeup plan saved successfully with {session.total_steps} steps")
-    
-    return MakeupPlan(**makeup_plan)
-
 
 
 @router.get("/{session_id}/product-matching", response_model=List[ProductMatch])
@@ -787,6 +885,11 @@ async def match_products(
                 })
     
     logger.info(f"📋 Processing {len(product_requirements)} product requirements")
+
+    # Skin tone from face analysis; complexion products are matched against it in CIELAB
+    await db.refresh(current_user, ["profile"])
+    profile = current_user.profile
+    skin_tone_hex = profile.skin_tone_hex if profile else None
     
     # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
     # STEP 2.4: Match each requirement with user's products
@@ -804,12 +907,20 @@ async def match_products(
         ]
         
         if matching_products:
+            # ΔE2000 between skin tone and each shade (None when either is unknown)
+            shade_distances = {
+                p.id: shade_delta_e(skin_tone_hex, p.shade)
+                if skin_tone_hex and category in SKIN_MATCHED_CATEGORIES else None
+                for p in matching_products
+            }
+
             # User has products in this category
-            # Pick the best one (prioritize safe, recently used)
+            # Pick the best one (prioritize safe, closest shade, recently used)
             best_product = max(
                 matching_products,
                 key=lambda p: (
                     p.is_safe_for_user,
+                    -(shade_distances[p.id] if shade_distances[p.id] is not None else 100.0),
                     0 if not p.expiry_date else (p.expiry_date - utc_now()).days,
                     0 if not p.last_used else -(utc_now() - p.last_used).days
                 )
@@ -819,13 +930,15 @@ async def match_products(
             suitability_score = _calculate_suitability_score(
                 best_product,
                 req,
-                session.makeup_plan
+                session.makeup_plan,
+                shade_distance=shade_distances[best_product.id]
             )
             
             suitability_reasons = _get_suitability_reasons(
                 best_product,
                 req,
-                suitability_score
+                suitability_score,
+                shade_distance=shade_distances[best_product.id]
             )
             
             # Check expiry status
@@ -870,7 +983,8 @@ async def match_products(
                 recommended_products=_get_shopping_recommendations(
                     category,
                     req,
-                    session.makeup_plan
+                    session.makeup_plan,
+                    skin_tone_hex=skin_tone_hex
                 ),
                 estimated_price_range=_estimate_price_range(category)
             )
@@ -1340,7 +1454,8 @@ def utc_now():
 def _calculate_suitability_score(
     product: VanityProduct,
     requirement: Dict,
-    makeup_plan: Dict           
+    makeup_plan: Dict,
+    shade_distance: Optional[float] = None
 ) -> float:
     """
     Calculate how suitable a product is for the current makeup plan.
@@ -1350,6 +1465,7 @@ def _calculate_suitability_score(
         product: The VanityProduct to evaluate
         requirement: Product requirement dict with category, shade, finish info
         makeup_plan: The complete makeup plan dict
+        shade_distance: ΔE2000 between the user's skin tone and the shade
         
     Returns:
         float: Suitability score from 0-100
@@ -1388,6 +1504,15 @@ def _calculate_suitability_score(
         if product.shade and shade_needed.lower() in product.shade.lower():
             score += 10.0
     
+    # ✅ Skin tone match (complexion products, CIELAB ΔE2000)
+    if shade_distance is not None:
+        if shade_distance < 3:  # hard to tell apart on skin
+            score += 15.0
+        elif shade_distance < settings.SHADE_MATCH_MAX_DELTA_E:
+            score += 8.0
+        elif shade_distance > 2 * settings.SHADE_MATCH_MAX_DELTA_E:
+            score -= 10.0
+    
     finish_needed = requirement.get("finish_type")
     if finish_needed and hasattr(product, "finish"):
         if product.finish and finish_needed.lower() in product.finish.lower():
@@ -1404,7 +1529,8 @@ def _calculate_suitability_score(
 def _get_suitability_reasons(
     product: VanityProduct,
     requirement: Dict,
-    score: float
+    score: float,
+    shade_distance: Optional[float] = None
 ) -> List[str]:
     """
     Generate human-readable reasons for the suitability score.
@@ -1413,6 +1539,7 @@ def _get_suitability_reasons(
         product: The VanityProduct being evaluated
         requirement: Product requirement dict
         score: The calculated suitability score
+        shade_distance: ΔE2000 between the user's skin tone and the shade
         
     Returns:
         List[str]: List of reason strings explaining the score
@@ -1435,6 +1562,15 @@ def _get_suitability_reasons(
     else:
         reasons.append("⚠️ May contain ingredients you're sensitive to")
     
+    # Shade vs skin tone
+    if shade_distance is not None:
+        if shade_distance < 3:
+            reasons.append("Shade closely matches your skin tone")
+        elif shade_distance < settings.SHADE_MATCH_MAX_DELTA_E:
+            reasons.append("Shade is a near match for your skin tone")
+        elif shade_distance > 2 * settings.SHADE_MATCH_MAX_DELTA_E:
+            reasons.append("⚠️ Shade may not match your skin tone")
+    
     # Expiry assessment
     if product.expiry_date:
         days_until_expiry = (product.expiry_date - utc_now()).days
@@ -1480,7 +1616,8 @@ def _get_expiry_status(product: VanityProduct) -> str:
 def _get_shopping_recommendations(
     category: str,
     requirement: Dict,
-    makeup_plan: Dict
+    makeup_plan: Dict,
+    skin_tone_hex: Optional[str] = None
 ) -> List[Dict]:
     """
     Generate shopping recommendations for missing products.
@@ -1489,6 +1626,7 @@ def _get_shopping_recommendations(
         category: Product category (e.g., "foundation", "lipstick")
         requirement: Product requirement dict with details
         makeup_plan: The complete makeup plan
+        skin_tone_hex: User's skin tone; complexion categories get catalog shade matches
         
     Returns:
         List[Dict]: List of recommendation dictionaries
@@ -1526,6 +1664,24 @@ def _get_shopping_recommendations(
         "suggestion": f"Look for {requirement.get('specific_type', category)} suitable for {makeup_plan.get('occasion', 'your event')}"
     })
     
+    # Closest catalog shades to the user's skin tone
+    if skin_tone_hex and category_clean in SKIN_MATCHED_CATEGORIES and catalog_search.available:
+        try:
+            matches = catalog_search.closest_shades(skin_tone_hex, category_clean, top=3)
+            recommendations[0]["shade_matches"] = [
+                {
+                    "product_id": m["id"],
+                    "brand": m["brand"],
+                    "product_name": m["product_name"],
+                    "shade": m["shade"],
+                    "price": m["price"],
+                    "delta_e": m["delta_e"],
+                }
+                for m in matches
+            ]
+        except Exception as e:
+            logger.warning(f"⚠️ Shade matching failed for {category}: {e}")
+    
     return recommendations
 
 
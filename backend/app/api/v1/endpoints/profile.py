@@ -270,7 +270,8 @@ Handles dict response from vision service correctly
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.db.database import get_db
+from app.db.database import get_db, AsyncSessionLocal
+from app.core.sse import sse_event, sse_response
 from app.models.user import User, UserProfile
 from app.schemas.user import (
     ProfileSetup, ProfileUpdate, UserProfileResponse,
@@ -278,14 +279,17 @@ from app.schemas.user import (
     UserStats, SkinConcernDetail, FacialFeatures
 )
 from app.api.deps.auth import get_current_user
-from app.services.azure.vision_service import vision_service
+from app.core.config import settings
+from app.services.azure.vision_service import vision_service, ANALYSIS_VERSION
 from app.services.azure.storage_service import storage_service
+from app.services.vision.worker_pool import VisionPoolBusy
+from app.services.llm.tokens import token_ledger
 from app.models.vanity import VanityProduct
 from app.models.makeup import MakeupSession, ScheduledEvent
 from datetime import datetime
 from loguru import logger
 from dataclasses import asdict
-from typing import Optional
+from typing import List, Optional
 
 router = APIRouter()
 
@@ -308,6 +312,108 @@ async def setup_profile(
     return current_user.profile
 
 
+def _validate_face_image(image: UploadFile, image_bytes: bytes):
+    """Reject non-images and uploads over 10MB"""
+    if not image.content_type.startswith("image/"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be an image (JPEG, PNG)"
+        )
+    if len(image_bytes) > 10 * 1024 * 1024:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Image must be less than 10MB"
+        )
+
+
+async def _save_analysis_to_profile(
+    db: AsyncSession,
+    user_id: int,
+    analysis_dict: dict,
+    image_url: str
+) -> UserProfile:
+    """Write a face analysis onto the user's profile (single commit)"""
+    result = await db.execute(
+        select(UserProfile).where(UserProfile.user_id == user_id)
+    )
+    profile = result.scalar_one()
+    
+    # Basic analysis
+    profile.skin_tone = analysis_dict.get("skin_tone")
+    profile.skin_tone_hex = analysis_dict.get("skin_tone_hex")
+    profile.fitzpatrick_scale = analysis_dict.get("fitzpatrick_scale")
+    profile.undertone = analysis_dict.get("undertone")
+    profile.skin_type = analysis_dict.get("skin_type")
+    
+    # Detailed
+    profile.texture_score = analysis_dict.get("texture_score")
+    profile.hydration_level = analysis_dict.get("hydration_level")
+    profile.oil_level = analysis_dict.get("oil_level")
+    profile.pore_size = analysis_dict.get("pore_size")
+    
+    # Face
+    profile.face_shape = analysis_dict.get("face_shape")
+    profile.facial_features = analysis_dict.get("facial_features", {})
+    
+    # Concerns
+    profile.skin_concerns = analysis_dict.get("concerns", [])
+    
+    # Metadata
+    profile.face_image_url = image_url
+    # profile.face_analysis_data = analysis_dict.get("raw_data", {})
+    profile.last_analysis_date = datetime.utcnow()
+    profile.analysis_confidence = analysis_dict.get("confidence_scores", {}).get("overall", 0.85)
+    profile.analysis_version = ANALYSIS_VERSION
+    
+    await db.commit()
+    
+    logger.info(
+        f"✅ Analysis saved: {profile.skin_tone} ({profile.fitzpatrick_scale}), "
+        f"{profile.undertone} undertone, {len(profile.skin_concerns)} concerns"
+    )
+    return profile
+
+
+def _analysis_response(analysis_dict: dict) -> SkinAnalysisResult:
+    """Pydantic response model from a SkinAnalysisResult dict"""
+    return SkinAnalysisResult(
+        skin_tone=analysis_dict["skin_tone"],
+        skin_tone_hex=analysis_dict["skin_tone_hex"],
+        fitzpatrick_scale=analysis_dict["fitzpatrick_scale"],
+        undertone=analysis_dict["undertone"],
+        skin_type=analysis_dict["skin_type"],
+        texture_score=analysis_dict["texture_score"],
+        hydration_level=analysis_dict["hydration_level"],
+        oil_level=analysis_dict["oil_level"],
+        pore_size=analysis_dict["pore_size"],
+        face_shape=analysis_dict["face_shape"],
+        facial_features=FacialFeatures(**analysis_dict.get("facial_features", {})),
+        concerns=[
+            SkinConcernDetail(
+                type=c["type"],
+                severity=c["severity"],
+                locations=c["locations"],
+                confidence=c["confidence"],
+                detected_automatically=c.get("detected_automatically", True),
+                notes=c.get("notes")
+            )
+            for c in analysis_dict.get("concerns", [])
+        ],
+        confidence_scores=analysis_dict.get("confidence_scores", {}),
+        recommendations=analysis_dict.get("recommendations", []),
+        raw_data=analysis_dict.get("raw_data")
+    )
+
+
+def _vision_busy_error(busy: VisionPoolBusy) -> HTTPException:
+    logger.warning(f"⏳ Face analysis rejected: {str(busy)}")
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Face analysis is busy right now. Please try again in a few seconds.",
+        headers={"Retry-After": "5"}
+    )
+
+
 @router.post("/analyze-face", response_model=SkinAnalysisResult)
 async def analyze_face(
     image: UploadFile = File(...),
@@ -319,27 +425,14 @@ async def analyze_face(
     Uses Azure Computer Vision + OpenCV
     """
     try:
-        # Validate
-        if not image.content_type.startswith("image/"):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File must be an image (JPEG, PNG)"
-            )
-        
-        # Read image
+        # Read + validate image (max 10MB)
         image_bytes = await image.read()
-        
-        # Size check (max 10MB)
-        if len(image_bytes) > 10 * 1024 * 1024:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Image must be less than 10MB"
-            )
+        _validate_face_image(image, image_bytes)
         
         logger.info(f"🔬 Analyzing face for user {current_user.id}")
         
         # 🚀 FAST ANALYSIS (2-4 seconds)
-        analysis_result = await vision_service.analyze_face_comprehensive(image_bytes)
+        analysis_result = await vision_service.analyze_face_comprehensive(image_bytes, current_user.id)
         analysis_dict = asdict(analysis_result)   # ✅ convert dataclass to dict
 
         
@@ -351,74 +444,74 @@ async def analyze_face(
         )
         
         # 💾 Update profile
-        result = await db.execute(
-            select(UserProfile).where(UserProfile.user_id == current_user.id)
-        )
-        profile = result.scalar_one()
-        
-        # Basic analysis
-        profile.skin_tone = analysis_dict.get("skin_tone")
-        profile.skin_tone_hex = analysis_dict.get("skin_tone_hex")
-        profile.fitzpatrick_scale = analysis_dict.get("fitzpatrick_scale")
-        profile.undertone = analysis_dict.get("undertone")
-        profile.skin_type = analysis_dict.get("skin_type")
+        await _save_analysis_to_profile(db, current_user.id, analysis_dict, image_url)
         
-        # Detailed
-        profile.texture_score = analysis_dict.get("texture_score")
-        profile.hydration_level = analysis_dict.get("hydration_level")
-        profile.oil_level = analysis_dict.get("oil_level")
-        profile.pore_size = analysis_dict.get("pore_size")
+        # Return as Pydantic model
+        return _analysis_response(analysis_dict)
         
-        # Face
-        profile.face_shape = analysis_dict.get("face_shape")
-        profile.facial_features = analysis_dict.get("facial_features", {})
+    except HTTPException:
+        raise
+    except VisionPoolBusy as busy:
+        raise _vision_busy_error(busy)
+    except ValueError as ve:
+        logger.error(f"❌ Validation error: {str(ve)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
+    except Exception as e:
+        logger.error(f"❌ Face analysis error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to analyze face image. Please try again with a clear, well-lit face photo."
+        )
+
+
+@router.post("/analyze-face/batch", response_model=SkinAnalysisResult)
+async def analyze_face_batch(
+    images: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    📸 Analyse 2-3 selfies (e.g. different lighting) together.
+    One multi-image GPT-4o request, results aggregated, profile written once.
+    """
+    try:
+        if not images or len(images) > settings.VISION_BATCH_MAX_IMAGES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Upload between 1 and {settings.VISION_BATCH_MAX_IMAGES} images"
+            )
         
-        # Concerns
-        profile.skin_concerns = analysis_dict.get("concerns", [])
+        images_bytes = []
+        for image in images:
+            image_bytes = await image.read()
+            _validate_face_image(image, image_bytes)
+            images_bytes.append(image_bytes)
         
-        # Metadata
-        profile.face_image_url = image_url
-        # profile.face_analysis_data = analysis_dict.get("raw_data", {})
-        profile.last_analysis_date = datetime.utcnow()
-        profile.analysis_confidence = analysis_dict.get("confidence_scores", {}).get("overall", 0.85)
-        profile.analysis_version = "v2.0_optimized"
+        logger.info(f"🔬 Analyzing {len(images_bytes)} face images for user {current_user.id}")
         
-        await db.commit()
+        analysis_result = await vision_service.analyze_faces_batch(images_bytes)
+        analysis_dict = asdict(analysis_result)
         
-        logger.info(
-            f"✅ Analysis saved: {profile.skin_tone} ({profile.fitzpatrick_scale}), "
-            f"{profile.undertone} undertone, {len(profile.skin_concerns)} concerns"
+        # 📤 Store the first analysed photo as the profile face image
+        primary = analysis_dict["raw_data"]["batch"]["analysed"][0]
+        image_url = await storage_service.upload_face_image(
+            images_bytes[primary],
+            current_user.id,
+            images[primary].content_type
         )
         
-        # Return as Pydantic model
-        return SkinAnalysisResult(
-            skin_tone=analysis_dict["skin_tone"],
-            skin_tone_hex=analysis_dict["skin_tone_hex"],
-            fitzpatrick_scale=analysis_dict["fitzpatrick_scale"],
-            undertone=analysis_dict["undertone"],
-            skin_type=analysis_dict["skin_type"],
-            texture_score=analysis_dict["texture_score"],
-            hydration_level=analysis_dict["hydration_level"],
-            oil_level=analysis_dict["oil_level"],
-            pore_size=analysis_dict["pore_size"],
-            face_shape=analysis_dict["face_shape"],
-            facial_features=FacialFeatures(**analysis_dict.get("facial_features", {})),
-            concerns=[
-                SkinConcernDetail(
-                    type=c["type"],
-                    severity=c["severity"],
-                    locations=c["locations"],
-                    confidence=c["confidence"],
-                    detected_automatically=c.get("detected_automatically", True),
-                    notes=c.get("notes")
-                )
-                for c in analysis_dict.get("concerns", [])
-            ],
-            confidence_scores=analysis_dict.get("confidence_scores", {}),
-            recommendations=analysis_dict.get("recommendations", []),
-            raw_data=analysis_dict.get("raw_data")
-        )
+        # 💾 Update profile
+        await _save_analysis_to_profile(db, current_user.id, analysis_dict, image_url)
+        
+        return _analysis_response(analysis_dict)
         
+    except HTTPException:
+        raise
+    except VisionPoolBusy as busy:
+        raise _vision_busy_error(busy)
     except ValueError as ve:
         logger.error(f"❌ Validation error: {str(ve)}")
         raise HTTPException(
@@ -426,13 +519,66 @@ async def analyze_face(
             detail=str(ve)
         )
     except Exception as e:
-        logger.error(f"❌ Face analysis error: {str(e)}")
+        logger.error(f"❌ Batch face analysis error: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to analyze face image. Please try again with a clear, well-lit face photo."
+            detail="Failed to analyze face images. Please try again with clear, well-lit face photos."
         )
 
 
+@router.post("/analyze-face/stream")
+async def analyze_face_stream(
+    image: UploadFile = File(...),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    ⚡ Progressive face analysis over Server-Sent Events.
+    
+    Events: `local` (OpenCV tone/undertone/hex, ~300ms), then `azure` and
+    `gpt4` as they complete, then `result` (final SkinAnalysisResult, saved
+    to the profile). Failures are sent as an `error` event.
+    """
+    image_bytes = await image.read()
+    _validate_face_image(image, image_bytes)
+    content_type = image.content_type
+    user_id = current_user.id
+    
+    logger.info(f"🔬 Streaming face analysis for user {user_id}")
+    
+    async def event_stream():
+        try:
+            async for event, data in vision_service.stream_face_analysis(image_bytes, user_id):
+                if event != "result":
+                    yield sse_event(event, data)
+                    continue
+                
+                analysis_dict = asdict(data)
+                response = _analysis_response(analysis_dict)
+                
+                image_url = await storage_service.upload_face_image(image_bytes, user_id, content_type)
+                
+                # The request-scoped session is closed once streaming starts
+                async with AsyncSessionLocal() as db:
+                    await _save_analysis_to_profile(db, user_id, analysis_dict, image_url)
+                
+                yield sse_event("result", response.model_dump())
+                
+        except VisionPoolBusy as busy:
+            error = _vision_busy_error(busy)
+            yield sse_event("error", {"status": error.status_code, "detail": error.detail})
+        except ValueError as ve:
+            logger.error(f"❌ Validation error: {str(ve)}")
+            yield sse_event("error", {"status": status.HTTP_400_BAD_REQUEST, "detail": str(ve)})
+        except Exception as e:
+            logger.error(f"❌ Streaming face analysis error: {str(e)}")
+            yield sse_event("error", {
+                "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                "detail": "Failed to analyze face image. Please try again with a clear, well-lit face photo."
+            })
+    
+    return sse_response(event_stream())
+
+
 @router.put("/allergies", response_model=UserProfileResponse)
 async def update_allergies(
     allergy_data: AllergyProfile,
@@ -524,6 +670,12 @@ async def get_profile(
     return current_user.profile
 
 
+@router.get("/llm-usage")
+async def get_llm_usage(current_user: User = Depends(get_current_user)):
+    """AI token usage of the current user since this worker started"""
+    return {"user_id": current_user.id, **token_ledger.user_totals(current_user.id)}
+
+
 @router.get("/dashboard", response_model=DashboardResponse)
 async def get_dashboard(
     current_user: User = Depends(get_current_user),
@@ -27,7 +27,6 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from loguru import logger
 import io
-import json
 import re
 import httpx  # For barcode API lookups
 
@@ -163,7 +162,7 @@ IMPORTANT:
             response = await llm_service_instance.get_structured_response(
                 prompt=prompt,
                 system_role="product research specialist",
-                max_tokens=1000
+                task="barcode_lookup"
             )
             
             # Check if we got meaningful results
@@ -261,13 +260,15 @@ async def scan_product(
                 if isinstance(ingredients_text, str) and ingredients_text:
                     try:
                         ing_prompt = f"""
-Extract ingredient list from: {ingredients_text[:500]}
+Extract the ingredient list from the text below.
 Return JSON: {{"ingredients": ["ingredient1", "ingredient2"]}}
+
+Text: {ingredients_text}
 """
                         ing_result = await llm_service.get_structured_response(
                             prompt=ing_prompt,
                             system_role="ingredient parser",
-                            max_tokens=500
+                            task="ingredient_extraction"
                         )
                         ingredients_list = ing_result.get("ingredients", [])
                     except Exception as ing_error:
@@ -331,22 +332,15 @@ Return ONLY valid JSON:
     "ingredients": []
 }}
 
-Text: {extracted_text[:2000]}
+Text: {extracted_text}
 """
                 
                 try:
-                    llm_resp = await llm_service.client.chat.completions.create(
-                        model=llm_service.model,
-                        messages=[
-                            {"role": "system", "content": "You are a beauty product parser."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        temperature=0.3,
-                        max_tokens=1000,
-                        response_format={"type": "json_object"}
+                    structured_data = await llm_service.get_structured_response(
+                        prompt=prompt,
+                        system_role="beauty product parser",
+                        task="product_text_parse"
                     )
-                    
-                    structured_data = json.loads(llm_resp.choices[0].message.content)
                     lookup_method = "llm_parsing"
                 except Exception as parse_error:
                     logger.error(f"❌ LLM parsing failed: {parse_error}")
@@ -508,7 +502,7 @@ Text: {extracted_text[:2000]}
             else:
                 category_for_search = str(category_value)
             
-            await search_service.upload_products([{
+            search_service.enqueue_products([{
                 "id": str(new_product.id),
                 "brand": new_product.brand or "",
                 "product_name": new_product.product_name or "Unknown",
@@ -523,7 +517,7 @@ Text: {extracted_text[:2000]}
                 "image_url": new_product.product_image_url or "",
                 "product_url": "",
             }])
-            logger.info("✅ Indexed in Azure Search")
+            logger.info("✅ Queued for Azure Search indexing")
         except Exception as e:
             logger.warning(f"⚠️ Azure Search failed: {e}")
 
@@ -778,13 +772,15 @@ async def test_ocr(
                 if isinstance(ingredients_text, str) and ingredients_text:
                     try:
                         ing_prompt = f"""
-Extract ingredient list from: {ingredients_text[:500]}
+Extract the ingredient list from the text below.
 Return JSON: {{"ingredients": ["ingredient1", "ingredient2"]}}
+
+Text: {ingredients_text}
 """
                         ing_result = await llm_service.get_structured_response(
                             prompt=ing_prompt,
                             system_role="ingredient parser",
-                            max_tokens=500
+                            task="ingredient_extraction"
                         )
                         ingredients_list = ing_result.get("ingredients", [])
                     except Exception as ing_error:
@@ -846,22 +842,15 @@ Extract cosmetic product info from text. Return ONLY valid JSON:
     "ingredients": []
 }}
 
-Text: {best_text[:2000]}
+Text: {best_text}
 """
                 
                 try:
-                    llm_resp = await llm_service.client.chat.completions.create(
-                        model=llm_service.model,
-                        messages=[
-                            {"role": "system", "content": "You are a beauty product parser."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        temperature=0.3,
-                        max_tokens=1000,
-                        response_format={"type": "json_object"}
+                    structured_data = await llm_service.get_structured_response(
+                        prompt=prompt,
+                        system_role="beauty product parser",
+                        task="product_text_parse"
                     )
-                    
-                    structured_data = json.loads(llm_resp.choices[0].message.content)
                     lookup_method = "llm_parsing"
                 except Exception as parse_error:
                     logger.error(f"❌ LLM parsing failed: {parse_error}")
@@ -1018,7 +1007,7 @@ Text: {best_text[:2000]}
             else:
                 category_for_search = str(category_value)
             
-            await search_service.upload_products([{
+            search_service.enqueue_products([{
                 "id": str(new_product.id),
                 "brand": new_product.brand or "",
                 "product_name": new_product.product_name or "Unknown",
@@ -1033,7 +1022,7 @@ Text: {best_text[:2000]}
                 "image_url": new_product.product_image_url or "",
                 "product_url": "",
             }])
-            logger.info("✅ Indexed in Azure Search")
+            logger.info("✅ Queued for Azure Search indexing")
         except Exception as e:
             logger.warning(f"⚠️ Azure Search failed: {e}")
         
@@ -1124,7 +1113,7 @@ Return JSON:
         enrichment = await llm_service.get_structured_response(
             prompt=enrichment_prompt,
             system_role="cosmetic_expert",
-            max_tokens=300
+            task="product_enrichment"
         )
 
         if enrichment:
@@ -1291,4 +1280,62 @@ async def get_vanity_stats(
         "by_category": by_category,
         "expiring_soon": len(expiring_soon),
         "most_used": max(products, key=lambda p: p.times_used).product_name if products else None
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/products/safety-check")
+async def recheck_products_safety(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Re-run the safety check for every product with known ingredients (batched LLM calls)"""
+    await db.refresh(current_user, ["profile"])
+    profile = current_user.profile
+
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User profile not found. Please complete your beauty profile first."
+        )
+
+    result = await db.execute(
+        select(VanityProduct).where(
+            VanityProduct.user_id == current_user.id,
+            VanityProduct.is_active == True
+        )
+    )
+    products = [p for p in result.scalars().all() if p.ingredients]
+    if not products:
+        return {"checked": 0, "unsafe_count": 0, "unsafe_product_ids": [], "results": {}}
+
+    verdicts = await llm_service.check_products_safety_batch(
+        products=[
+            {"id": p.id, "product_name": p.product_name, "ingredients": p.ingredients}
+            for p in products
+        ],
+        user_profile={
+            "allergies": profile.allergies or [],
+            "skin_concerns": profile.skin_concerns or [],
+            "skin_type": profile.skin_type,
+            "skin_tone": profile.skin_tone,
+            "undertone": profile.undertone
+        }
+    )
+
+    for product in products:
+        verdict = verdicts.get(str(product.id))
+        if verdict is None:
+            continue
+        product.is_safe_for_user = verdict["is_safe"]
+        product.safety_warnings = verdict["warnings"]
+
+    await db.commit()
+
+    unsafe = [p.id for p in products if p.is_safe_for_user is False]
+    logger.info(f"🧴 Re-checked {len(products)} products for user {current_user.id}")
+    return {
+        "checked": len(products),
+        "unsafe_count": len(unsafe),
+        "unsafe_product_ids": unsafe,
+        "results": verdicts
+    }
@@ -6,16 +6,31 @@ Powered by Azure AI Search + LLM personalization
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from app.services.azure.search_service import search_service
 from app.services.azure.llm_service import llm_service
+from app.services.llm.prompts import compact
 from app.models.user import User
+from app.models.vanity import VanityProduct
 from app.db.database import get_db
-from app.api.dependencies.auth import get_current_user
+from app.api.deps.auth import get_current_user
 from typing import Dict, Any, Optional
 from loguru import logger
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/smart-vanity", tags=["Vanity | Smart Finder"])
 
 
+async def _load_profile(db: AsyncSession, current_user: User):
+    """Beauty profile of the caller (400 if they have not created one yet)"""
+    await db.refresh(current_user, ["profile"])
+    profile = current_user.profile
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User profile not found. Please complete your beauty profile first."
+        )
+    return profile
+
+
 # ======================================================
 # 🧠 1️⃣ Smart AI Product Finder
 # ======================================================
@@ -32,6 +47,8 @@ async def smart_find_products(
     - Uses Azure Search + AI safety enrichment
     """
     try:
+        profile = await _load_profile(db, current_user)
+
         # 🧠 Step 1: Parse user query into structured filters using LLM
         logger.info(f"🪄 Parsing smart vanity query: {query}")
 
@@ -55,7 +72,7 @@ Return a JSON object like:
         parsed = await llm_service.get_structured_response(
             prompt=llm_prompt,
             system_role="beauty_expert",
-            max_tokens=500
+            task="query_parse"
         )
 
         filters = parsed or {}
@@ -63,11 +80,11 @@ Return a JSON object like:
         max_price = filters.get("max_price")
         tags = filters.get("special_tags", [])
         user_profile = {
-            "skin_tone": filters.get("skin_tone") or current_user.profile.skin_tone,
-            "undertone": filters.get("undertone") or current_user.profile.undertone,
-            "skin_type": filters.get("skin_type") or current_user.profile.skin_type,
-            "allergies": current_user.profile.allergies,
-            "skin_concerns": current_user.profile.skin_concerns,
+            "skin_tone": filters.get("skin_tone") or profile.skin_tone,
+            "undertone": filters.get("undertone") or profile.undertone,
+            "skin_type": filters.get("skin_type") or profile.skin_type,
+            "allergies": profile.allergies,
+            "skin_concerns": profile.skin_concerns,
         }
 
         logger.info(f"✨ Parsed filters for search: {filters}")
@@ -87,11 +104,16 @@ Return a JSON object like:
             raise HTTPException(status.HTTP_404_NOT_FOUND, detail="No matching products found.")
 
         # 🧠 Step 3: Optionally summarize results for chat or voice response
+        summary_fields = ("brand", "product_name", "category", "price", "average_rating", "is_safe_for_user", "safety_warnings")
+        top_products = [
+            {k: v for k, v in product.items() if k in summary_fields}
+            for product in results[:3]
+        ]
         summary_prompt = f"""
 Summarize these products in 2-3 short lines for a user with {user_profile['skin_type']} skin.
-Data: {results[:3]}
+Data: {compact(top_products)}
 """
-        summary = await llm_service.get_text_completion(summary_prompt)
+        summary = await llm_service.get_text_completion(summary_prompt, task="result_summary")
 
         logger.info(f"💄 Smart vanity results ready ({len(results)} products).")
         return {
@@ -103,6 +125,8 @@ Data: {results[:3]}
             "results": results
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Smart product finder error: {str(e)}")
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to process smart product query.")
@@ -114,6 +138,7 @@ Data: {results[:3]}
 @router.get("/substitutes/{product_id}")
 async def find_product_substitutes(
     product_id: int,
+    mode: str = Query("blend", pattern="^(blend|formula|shade)$", description="Match on formula, shade, or both"),
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -122,23 +147,36 @@ async def find_product_substitutes(
     - Checks price, safety, and user profile match.
     """
     try:
-        result = await db.execute(f"SELECT * FROM vanity_products WHERE id = {product_id}")
-        product = result.fetchone()
+        result = await db.execute(
+            select(VanityProduct).where(
+                VanityProduct.id == product_id,
+                VanityProduct.user_id == current_user.id
+            )
+        )
+        product = result.scalar_one_or_none()
         if not product:
             raise HTTPException(404, detail="Product not found")
 
+        profile = await _load_profile(db, current_user)
         user_profile = {
-            "skin_tone": current_user.profile.skin_tone,
-            "undertone": current_user.profile.undertone,
-            "skin_type": current_user.profile.skin_type,
-            "allergies": current_user.profile.allergies,
-            "skin_concerns": current_user.profile.skin_concerns,
+            "skin_tone": profile.skin_tone,
+            "undertone": profile.undertone,
+            "skin_type": profile.skin_type,
+            "allergies": profile.allergies,
+            "skin_concerns": profile.skin_concerns,
         }
 
         substitutes = await search_service.find_product_substitutes(
-            original_category=product.category,
+            category=product.category.value if product.category else None,
             user_profile=user_profile,
-            max_price=product.price or None
+            max_price=product.price or None,
+            product={
+                "brand": product.brand,
+                "product_name": product.product_name,
+                "shade": product.shade,
+                "ingredients": product.ingredients or [],
+            },
+            mode=mode
         )
 
         return {
@@ -147,6 +185,8 @@ async def find_product_substitutes(
             "suggestions": substitutes
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Substitute search failed: {str(e)}")
         raise HTTPException(status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Could not fetch substitutes.")
@@ -0,0 +1,74 @@
+"""
+GlamAI - In-process Caching
+Small thread-safe LRU tier used in front of slower (DB / API) tiers
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Bounded LRU map with optional TTL.
+    `ttl_seconds` is the default lifetime (None = until evicted by size);
+    `set()` can override it per entry.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl_seconds: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()  # (expires_at, value)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @staticmethod
+    def _expired(expires_at: Optional[float]) -> bool:
+        return expires_at is not None and time.monotonic() > expires_at
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            if self._expired(entry[0]):
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """Snapshot of live (key, value) pairs, most recently used last"""
+        with self._lock:
+            live = [(k, v) for k, (expires_at, v) in self._data.items() if not self._expired(expires_at)]
+        return iter(live)
+
+    def find(self, predicate: Callable[[Hashable, Any], bool]) -> Optional[Any]:
+        """First live value (most recent first) whose (key, value) matches `predicate`"""
+        for key, value in reversed(list(self.items())):
+            if predicate(key, value):
+                return value
+        return None
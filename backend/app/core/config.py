@@ -5,7 +5,7 @@ Centralized settings management using Pydantic Settings
 
 from pydantic_settings import BaseSettings
 from pydantic import field_validator, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 import secrets
 
 
@@ -47,6 +47,68 @@ class Settings(BaseSettings):
     ENABLE_CUSTOM_VISION: bool = False
     ENABLE_GPT4_VISION: bool = True
     
+    # Vision Worker Pool (OpenCV stages run off the event loop)
+    VISION_POOL_WORKERS: int = 0  # 0 = one worker per CPU core
+    VISION_POOL_MAX_QUEUE: int = 8
+    VISION_WORKING_MAX_SIDE: int = 1600  # decoded working copy shared by all stages
+    
+    # Face detection (Haar on a downscaled gray copy, or OpenCV DNN res10 SSD)
+    VISION_FACE_DETECTOR: str = "haar"  # haar | dnn
+    VISION_DETECT_MAX_SIDE: int = 480  # 0 = detect on the full working copy
+    VISION_MIN_FACE_RATIO: float = 0.15  # min face size vs. shorter image side
+    VISION_DETECT_EYES: bool = False
+    VISION_DNN_PROTOTXT: Optional[str] = None  # deploy.prototxt
+    VISION_DNN_MODEL: Optional[str] = None  # res10_300x300_ssd_iter_140000.caffemodel
+    VISION_DNN_CONFIDENCE: float = 0.6
+    
+    # GPT-4o vision payload (face crop sized to the detail level's tile budget)
+    VISION_DETAIL_POLICY: str = "auto"  # auto | low | high
+    VISION_FACE_CROP_MARGIN: float = 0.25  # padding around the face bbox, as a fraction of its size
+    VISION_HIGH_DETAIL_MAX_TILES: int = 4  # 512px tiles allowed for a high-detail crop
+    
+    # Skin analysis result cache (exact upload hash + face-crop dHash)
+    ENABLE_VISION_CACHE: bool = True
+    VISION_CACHE_SIZE: int = 256  # in-process LRU entries
+    VISION_CACHE_MAX_DISTANCE: int = 3  # max dHash Hamming distance for a near match
+    VISION_BATCH_MAX_IMAGES: int = 3  # selfies per /analyze-face/batch request
+    
+    # Local-first tier: GPT-4o only when the OpenCV estimate is ambiguous
+    ENABLE_LOCAL_FIRST_TIER: bool = True
+    VISION_LOCAL_CONFIDENCE_THRESHOLD: float = 0.8  # 0-1, higher = escalate more often
+    
+    # Per-branch deadlines for the face analysis fan-out (seconds)
+    VISION_LOCAL_TIMEOUT_SECONDS: float = 10.0
+    VISION_AZURE_TIMEOUT_SECONDS: float = 8.0
+    VISION_GPT4_TIMEOUT_SECONDS: float = 25.0
+    
+    # LLM response cache (memory LRU + llm_response_cache table)
+    ENABLE_LLM_CACHE: bool = True
+    LLM_CACHE_SIZE: int = 1024  # in-process LRU entries
+    
+    # Batched product safety checks
+    ENABLE_INGREDIENT_MATCHER: bool = True  # dictionary screening before the LLM
+    LLM_SAFETY_BATCH_MAX_PRODUCTS: int = 10  # products per LLM call
+    LLM_SAFETY_BATCH_TOKEN_BUDGET: int = 3000  # approx. prompt tokens per call
+    LLM_SAFETY_BATCH_CONCURRENCY: int = 2  # chunks in flight per batch
+    
+    # Azure OpenAI governor (shared by every chat completion; 0 disables a bucket)
+    OPENAI_RPM_LIMIT: int = 300  # requests per minute
+    OPENAI_TPM_LIMIT: int = 150000  # tokens per minute (estimated, reconciled with usage)
+    OPENAI_MIN_CONCURRENCY: int = 1
+    OPENAI_INITIAL_CONCURRENCY: int = 8
+    OPENAI_MAX_CONCURRENCY: int = 32
+    OPENAI_LATENCY_TARGET_MS: float = 30000.0  # slower successes shrink the limit
+    OPENAI_BACKGROUND_SHARE: float = 0.5  # share of the limit background work may use
+    OPENAI_MAX_RETRIES: int = 3
+    OPENAI_BACKOFF_BASE_SECONDS: float = 0.5
+    OPENAI_BACKOFF_MAX_SECONDS: float = 20.0
+    OPENAI_REQUEST_TIMEOUT_SECONDS: float = 60.0
+    
+    # LLM task routing (see app/services/azure/model_router.py)
+    AZURE_OPENAI_SMALL_DEPLOYMENT_NAME: Optional[str] = None  # cheap model for extraction / parsing tasks
+    LLM_ROUTE_OVERRIDES: Dict[str, Dict[str, Any]] = {}  # JSON, e.g. {"query_parse": {"tier": "large"}}
+    LLM_STRICT_SCHEMAS: bool = True  # json_schema structured outputs (needs gpt-4o 2024-08-06+ deployments)
+    
     # Azure Speech
     AZURE_SPEECH_KEY: str
     AZURE_SPEECH_REGION: str
@@ -65,6 +127,26 @@ class Settings(BaseSettings):
     AZURE_SEARCH_KEY: str
     AZURE_SEARCH_INDEX_NAME: str = "products-index-v2"
     
+    # In-process catalog search (BM25 over product_database; Azure Search is the fallback)
+    ENABLE_LOCAL_SEARCH: bool = True
+    LOCAL_SEARCH_REFRESH_SECONDS: float = 30.0  # incremental sync interval (updated_at watermark)
+    SIMILARITY_VECTOR_DIM: int = 128  # hashed TF-IDF ingredient vector width for substitutes
+    SHADE_MATCH_MAX_DELTA_E: float = 6.0  # ΔE2000 limit for skin-tone shade matches (<2 is barely visible)
+    
+    # Azure Search indexing queue (documents are batched off the request path)
+    SEARCH_INDEX_BATCH_SIZE: int = 500  # documents per upload (Azure caps a batch at 1000)
+    SEARCH_INDEX_MAX_AGE_SECONDS: float = 2.0  # flush a partial batch once its oldest doc waited this long
+    SEARCH_INDEX_MAX_ATTEMPTS: int = 5
+    SEARCH_INDEX_BACKOFF_BASE_SECONDS: float = 1.0
+    SEARCH_INDEX_BACKOFF_MAX_SECONDS: float = 60.0
+    SEARCH_INDEX_MAX_PENDING: int = 50000
+    
+    # Materialized trending feed (per category, stale-while-revalidate)
+    TRENDING_FEED_SIZE: int = 50  # products materialized per category; larger `top` bypasses the feed
+    TRENDING_REFRESH_SECONDS: float = 300.0  # recompute interval; older entries are served stale and revalidated
+    TRENDING_MAX_STALE_SECONDS: float = 3600.0  # older than this, a read waits for the recompute
+    TRENDING_SHARED_CACHE: bool = False  # also keep feeds in Redis (REDIS_URL) for other workers
+    
     # Azure Blob Storage
     AZURE_STORAGE_ACCOUNT_NAME: str
     AZURE_STORAGE_KEY: str
@@ -0,0 +1,47 @@
+"""
+GlamAI - Single-flight Call Coalescing
+Concurrent identical requests share one upstream call
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.core.metrics import metrics
+
+
+class SingleFlight:
+    """
+    Per-key deduplication of in-flight coroutines.
+
+    The first caller for a key starts the work as its own task; callers that
+    arrive while it runs await the same task and get the same result or
+    exception. The task is shielded, so one waiter disconnecting does not
+    cancel it for the others. Nothing is kept once the call finishes;
+    caching results is the caller's job.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], label: str = "") -> Any:
+        task = self._calls.get(key)
+        if task is not None:
+            metrics.incr("singleflight_coalesced_total", group=self.name, call=label or self.name)
+            return await asyncio.shield(task)
+
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda _: self._forget(key, task))
+        metrics.incr("singleflight_leaders_total", group=self.name, call=label or self.name)
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Nobody may be left to retrieve it; mark the exception as observed
+        if not task.cancelled():
+            task.exception()
@@ -9,7 +9,7 @@ import sys
 import asyncio
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, status
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse, FileResponse
@@ -18,6 +18,12 @@ from loguru import logger
 from sqlalchemy import text
 
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.llm.tokens import endpoint_label, token_ledger, usage_scope
+from app.services.vision.worker_pool import vision_pool
+from app.services.search.catalog_search import catalog_search
+from app.services.azure.search_service import search_service
+from app.services.azure.vision_service import vision_service
 from app.db.database import async_engine, init_db, close_db
 from app.api.v1.endpoints import auth, profile, makeup, vanity, events,speech
 from app.api.v1 import api_v1_router
@@ -69,10 +75,21 @@ async def lifespan(app: FastAPI):
     await init_db()
     logger.info("📦 Database initialized")
 
+    # Start vision workers (OpenCV stages run off the event loop)
+    vision_pool.start()
+
+    # Build the in-process catalog search index and keep it in sync
+    catalog_search.start()
+
     yield  # --- Application runs here ---
 
     # Shutdown
     logger.info("🧹 Shutting down application...")
+    await catalog_search.stop()
+    await search_service.indexer.stop()  # last flush of queued index documents
+    await search_service.trending.stop()
+    vision_pool.shutdown()
+    await vision_service.close()
     await close_db()
     logger.info("🛑 Database connections closed")
 
@@ -122,6 +139,13 @@ if settings.ENVIRONMENT == "production":
         allowed_hosts=["*.glamai.com", "glamai.com"]
     )
 
+# LLM token accounting: bill calls made while serving a request to its endpoint
+# (the auth dependency fills in the user)
+@app.middleware("http")
+async def llm_usage_scope(request: Request, call_next):
+    with usage_scope(endpoint_label(request.method, request.url.path)):
+        return await call_next(request)
+
 # ============================================================
 # ROUTES
 # ============================================================
@@ -137,6 +161,12 @@ async def health_check():
     }
 
 
+@app.get("/metrics", tags=["Health"])
+async def metrics_snapshot():
+    """In-process service metrics (timings, queue depth, counters, LLM token usage)"""
+    return {**metrics.snapshot(), "llm_tokens": token_ledger.snapshot()}
+
+
 @app.get("/", tags=["Root"])
 async def root():
     """Root endpoint"""
@@ -9,6 +9,7 @@ from app.models.makeup import (
     MakeupSession, ScheduledEvent, MakeupHistory,
     OccasionType, MakeupScope, SessionStatus
 )
+from app.models.cache import SkinAnalysisCacheEntry, LLMResponseCacheEntry
 
 __all__ = [
     # User models
@@ -29,4 +30,8 @@ __all__ = [
     "OccasionType",
     "MakeupScope",
     "SessionStatus",
+    
+    # Cache models
+    "SkinAnalysisCacheEntry",
+    "LLMResponseCacheEntry",
 ]
\ No newline at end of file
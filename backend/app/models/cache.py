@@ -0,0 +1,65 @@
+"""
+GlamAI - Cache Models
+Persistent tiers for expensive AI results
+"""
+
+from sqlalchemy import (
+    Column, Integer, BigInteger, Float, String, Text, DateTime, JSON, ForeignKey, UniqueConstraint
+)
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class SkinAnalysisCacheEntry(Base):
+    """
+    Cached SkinAnalysisResult keyed by upload content hash and a
+    perceptual hash of the face crop, per user. Entries are only valid
+    for the `analysis_version` that produced them.
+    """
+    __tablename__ = "skin_analysis_cache"
+    __table_args__ = (
+        UniqueConstraint(
+            "user_id", "content_hash", "analysis_version",
+            name="uq_skin_analysis_cache_user_hash_version"
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    content_hash = Column(String(64), nullable=False, index=True)  # sha256 hex
+    analysis_version = Column(String(50), nullable=False, index=True)
+
+    # 64-bit dHash of the face crop, plus 16-bit LSH bands for near-match lookup
+    face_hash = Column(BigInteger, nullable=True)
+    band_0 = Column(Integer, nullable=True, index=True)
+    band_1 = Column(Integer, nullable=True, index=True)
+    band_2 = Column(Integer, nullable=True, index=True)
+    band_3 = Column(Integer, nullable=True, index=True)
+
+    result = Column(JSON, nullable=False)  # serialized SkinAnalysisResult
+    hit_count = Column(Integer, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_hit_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class LLMResponseCacheEntry(Base):
+    """
+    Shared tier of the LLMService response cache. `cache_key` hashes the
+    normalized messages, deployment, temperature and max_tokens.
+    """
+    __tablename__ = "llm_response_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String(64), nullable=False, unique=True, index=True)  # sha256 hex
+    method = Column(String(100), nullable=False, index=True)
+    model = Column(String(100), nullable=True)
+
+    content = Column(Text, nullable=False)  # raw completion text
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    latency_ms = Column(Float, default=0.0)
+    hit_count = Column(Integer, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=True, index=True)
@@ -163,6 +163,44 @@ class MakeupPlan(BaseModel):
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+
+# ============= LLM Structured Outputs =============
+# Strict JSON-schema response formats for LLMService; optional fields are
+# emitted as null rather than omitted.
+
+class OutfitAccessories(BaseModel):
+    """Accessories by body area"""
+    head: Optional[AccessoryItem] = None
+    ear: Optional[AccessoryItem] = None
+    nose: Optional[AccessoryItem] = None
+    neck: Optional[AccessoryItem] = None
+    hand: Optional[AccessoryItem] = None
+    wrist: Optional[AccessoryItem] = None
+    waist: Optional[AccessoryItem] = None
+    feet: Optional[AccessoryItem] = None
+
+
+class OutfitParse(BaseModel):
+    """parse_outfit_description output"""
+    refined_description: str
+    outfit_type: str
+    colors: List[str] = []
+    accessories: OutfitAccessories
+    confidence: float
+
+
+class MakeupPlanDraft(BaseModel):
+    """generate_makeup_plan output (before product requirements are attached)"""
+    occasion: Optional[str] = None
+    scope: Optional[str] = None
+    style: str
+    reasoning: Optional[str] = None
+    intensity: Optional[str] = None
+    steps: List[MakeupStep]
+    key_focus: List[str] = []
+    estimated_duration: Optional[int] = None
+    difficulty: Optional[str] = None
+
 class ProductMatch(BaseModel):
     """Product matching result"""
     category: str
@@ -307,6 +307,31 @@ class SkinAnalysisResult(BaseModel):
         }
 
 
+class DetectedSkinConcern(BaseModel):
+    """Skin concern as reported by the vision model"""
+    type: str
+    severity: str
+    locations: List[str] = []
+    confidence: float
+
+
+class FaceAnalysis(BaseModel):
+    """GPT-4o face analysis output (strict structured output)"""
+    skin_tone: str
+    fitzpatrick_scale: str
+    undertone: str
+    skin_type: str
+    hydration_level: str
+    oil_level: str
+    pore_size: str
+    texture_quality: str
+    face_shape: str
+    concerns: List[DetectedSkinConcern] = []
+    facial_features: FacialFeatures
+    makeup_recommendations: List[str] = []
+    confidence_overall: float
+
+
 class AllergyProfile(BaseModel):
     """User allergy and sensitivity profile"""
     allergies: List[str] = []  # ["parabens", "fragrances", "sulfates"]
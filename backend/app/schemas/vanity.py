@@ -143,6 +143,22 @@ class ProductSafetyCheck(BaseModel):
     recommendation: str
 
 
+class ProductSafetyVerdict(ProductSafetyCheck):
+    """LLM safety verdict (strict structured output)"""
+    safety_score: float
+    severity: str
+    confidence: float
+
+
+class ProductSafetyVerdictItem(ProductSafetyVerdict):
+    id: str
+
+
+class ProductSafetyBatch(BaseModel):
+    """Batched LLM safety verdicts, one per product id"""
+    results: List[ProductSafetyVerdictItem]
+
+
 class ProductDatabaseItem(BaseModel):
     """Product from global AI/enriched database"""
     id: int
@@ -0,0 +1,178 @@
+"""
+GlamAI - LLM Response Cache
+Two-tier cache (in-process LRU + Postgres) for LLMService completions
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from loguru import logger
+from sqlalchemy import select, update, or_
+from sqlalchemy.dialects.postgresql import insert
+import hashlib
+import json
+import re
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.database import AsyncSessionLocal
+from app.models.cache import LLMResponseCacheEntry
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Per-method caching rules declared by LLMService"""
+    ttl_seconds: float = 0
+    persist: bool = True  # also store in the shared Postgres tier
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+
+NO_CACHE = CachePolicy()
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+@dataclass
+class CachedCompletion:
+    content: str
+    model: Optional[str] = None  # deployment that produced it
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency_ms: float = 0.0
+
+
+def _normalize(text: str) -> str:
+    """Whitespace-insensitive prompt form (indentation / trailing spaces don't split keys)"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_cache_key(
+    messages: List[Dict[str, Any]],
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    response_format: Optional[Dict[str, Any]] = None
+) -> str:
+    canonical = {
+        "messages": [
+            {"role": m["role"], "content": _normalize(m["content"]) if isinstance(m["content"], str) else m["content"]}
+            for m in messages
+        ],
+        "model": model,
+        "temperature": round(float(temperature), 3),
+        "max_tokens": max_tokens,
+        "response_format": response_format,
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """Memory LRU (per process) in front of the shared llm_response_cache table"""
+
+    def __init__(self, maxsize: int = 1024):
+        self._memory = LRUCache(maxsize=maxsize)
+
+    async def get(self, method: str, key: str, policy: CachePolicy) -> Optional[CachedCompletion]:
+        if not policy.enabled:
+            return None
+
+        cached = self._memory.get(key)
+        tier = "memory"
+        if cached is None and policy.persist:
+            cached = await self._db_get(key)
+            tier = "db"
+            if cached is not None:
+                self._memory.set(key, cached, ttl_seconds=policy.ttl_seconds)
+
+        if cached is None:
+            self._record(method, hit=False)
+            return None
+
+        self._record(method, hit=True, tier=tier)
+        metrics.incr("llm_cache_saved_tokens", cached.prompt_tokens + cached.completion_tokens, method=method)
+        metrics.incr("llm_cache_saved_ms", cached.latency_ms, method=method)
+        return cached
+
+    async def put(self, method: str, key: str, policy: CachePolicy, completion: CachedCompletion):
+        if not policy.enabled:
+            return
+        self._memory.set(key, completion, ttl_seconds=policy.ttl_seconds)
+        if not policy.persist:
+            return
+
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=policy.ttl_seconds)
+        values = {
+            "method": method,
+            "model": completion.model,
+            "content": completion.content,
+            "prompt_tokens": completion.prompt_tokens,
+            "completion_tokens": completion.completion_tokens,
+            "latency_ms": completion.latency_ms,
+            "expires_at": expires_at,
+        }
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    insert(LLMResponseCacheEntry)
+                    .values(cache_key=key, hit_count=0, **values)
+                    .on_conflict_do_update(index_elements=["cache_key"], set_=values)
+                )
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {str(e)}")
+
+    def clear_memory(self):
+        self._memory.clear()
+
+    def _record(self, method: str, hit: bool, tier: str = ""):
+        if hit:
+            metrics.incr("llm_cache_hits_total", method=method, tier=tier)
+        else:
+            metrics.incr("llm_cache_misses_total", method=method)
+        hits = (
+            metrics.counter_value("llm_cache_hits_total", method=method, tier="memory")
+            + metrics.counter_value("llm_cache_hits_total", method=method, tier="db")
+        )
+        total = hits + metrics.counter_value("llm_cache_misses_total", method=method)
+        metrics.set_gauge("llm_cache_hit_rate", hits / total if total else 0.0, method=method)
+
+    async def _db_get(self, key: str) -> Optional[CachedCompletion]:
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(LLMResponseCacheEntry).where(
+                        LLMResponseCacheEntry.cache_key == key,
+                        or_(
+                            LLMResponseCacheEntry.expires_at.is_(None),
+                            LLMResponseCacheEntry.expires_at > datetime.now(timezone.utc)
+                        )
+                    )
+                )
+                entry = result.scalar_one_or_none()
+                if entry is None:
+                    return None
+                await session.execute(
+                    update(LLMResponseCacheEntry)
+                    .where(LLMResponseCacheEntry.id == entry.id)
+                    .values(hit_count=LLMResponseCacheEntry.hit_count + 1)
+                )
+                await session.commit()
+                return CachedCompletion(
+                    content=entry.content,
+                    model=entry.model,
+                    prompt_tokens=entry.prompt_tokens or 0,
+                    completion_tokens=entry.completion_tokens or 0,
+                    latency_ms=entry.latency_ms or 0.0,
+                )
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {str(e)}")
+            return None
+
+
+# Singleton instance
+llm_cache = LLMResponseCache(maxsize=settings.LLM_CACHE_SIZE)
@@ -5,21 +5,232 @@ AI-powered recommendations, makeup plans, and fashion understanding
 
 from openai import AsyncOpenAI
 from app.core.config import settings
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple, Type
+from pydantic import BaseModel
 from loguru import logger
+import asyncio
 import json
+import time
+
+from app.core.metrics import metrics
+from app.core.singleflight import SingleFlight
+from app.services.azure.llm_cache import (
+    CachePolicy, CachedCompletion, NO_CACHE, DAY, llm_cache, make_cache_key
+)
+from app.services.azure.model_router import Route, model_router
+from app.services.azure.openai_governor import governor_for
+from app.services.llm.json_stream import StreamingArrayParser
+from app.services.llm.prompts import (
+    ACCESSORY_RECOMMENDATION, MAKEUP_PLAN, PRODUCT_SAFETY, PRODUCT_SAFETY_BATCH, compact
+)
+from app.services.llm.structured import parse_tolerant, response_format_for, strict_json_schema, validate
+from app.services.llm.tokens import count_tokens, fit_messages, token_ledger
+from app.schemas.makeup import AIRecommendation, HairStyleSuggestion, MakeupPlanDraft, OutfitParse
+from app.schemas.vanity import ProductSafetyBatch, ProductSafetyVerdict
+from app.services.makeup.ingredient_matcher import ingredient_matcher, merge_safety_results
 
 
 class LLMService:
     """OpenAI GPT model for intelligent makeup, styling, and analysis"""
 
+    # Response caching per method. Creative generations (makeup plans,
+    # accessories) stay uncached so users keep getting fresh looks.
+    CACHE_POLICIES: Dict[str, CachePolicy] = {
+        "parse_outfit_description": CachePolicy(ttl_seconds=7 * DAY),
+        "check_product_safety": CachePolicy(ttl_seconds=30 * DAY),
+        "check_products_safety_batch": CachePolicy(ttl_seconds=30 * DAY),
+        "generate_hair_style_suggestion": CachePolicy(ttl_seconds=DAY),
+        "get_structured_response": CachePolicy(ttl_seconds=DAY),
+    }
+
     def __init__(self):
         self.client = AsyncOpenAI(
             api_key=settings.AZURE_OPENAI_API_KEY,
             base_url=settings.AZURE_OPENAI_BASE_URL,
             default_query={"api-version": settings.AZURE_OPENAI_API_VERSION},
+            max_retries=0,  # retries are owned by the per-deployment governors
         )
         self.model = settings.AZURE_OPENAI_DEPLOYMENT_NAME
+        self._inflight = SingleFlight("llm")
+
+    # ============================================================
+    # ⚙️ COMPLETION + CACHE
+    # ============================================================
+    async def _completion(
+        self,
+        method: str,
+        messages: List[Dict[str, Any]],
+        json_mode: bool = True,
+        max_tokens: Optional[int] = None,
+        task: Optional[str] = None,
+        schema: Optional[Type[BaseModel]] = None
+    ) -> str:
+        """
+        Chat completion text for `task` (defaults to the method name), routed by
+        model_router and served from the response cache when the task allows it.
+        Identical calls already in flight share one upstream request. With a
+        `schema` the response is constrained to it (strict structured output).
+        """
+        task = task or method
+        route = model_router.route(task)
+        max_tokens = max_tokens or route.max_tokens
+        messages, prompt_tokens = fit_messages(messages, route.prompt_budget, task)
+        metrics.observe("llm_prompt_tokens", prompt_tokens, task=task)
+        if schema is not None:
+            response_format = response_format_for(schema)
+        else:
+            response_format = {"type": "json_object"} if json_mode else None
+        policy = self.CACHE_POLICIES.get(task, self.CACHE_POLICIES.get(method, NO_CACHE))
+        if not settings.ENABLE_LLM_CACHE:
+            policy = NO_CACHE
+        key = make_cache_key(messages, route.primary, route.temperature, max_tokens, response_format)
+
+        return await self._inflight.do(
+            key,
+            lambda: self._fetch_completion(method, key, policy, route, messages, max_tokens, response_format),
+            label=method
+        )
+
+    async def _fetch_completion(
+        self,
+        method: str,
+        key: str,
+        policy: CachePolicy,
+        route: Route,
+        messages: List[Dict[str, Any]],
+        max_tokens: int,
+        response_format: Optional[Dict[str, Any]]
+    ) -> str:
+        cached = await llm_cache.get(method, key, policy)
+        if cached is not None:
+            return cached.content
+
+        started = time.perf_counter()
+        response, deployment = await model_router.complete(
+            self.client,
+            route,
+            messages,
+            max_tokens=max_tokens,
+            response_format=response_format,
+            name=method
+        )
+        latency_ms = (time.perf_counter() - started) * 1000
+        content = response.choices[0].message.content or ""
+
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        cached_tokens = token_ledger.record(usage, method)
+        metrics.observe("llm_call_ms", latency_ms, method=method)
+        logger.debug(f"🧮 {method}: prompt={prompt_tokens} (cached {cached_tokens}), completion={completion_tokens}")
+
+        if response_format:
+            # Only cache payloads that parse; callers raise on bad JSON anyway
+            try:
+                json.loads(content)
+            except json.JSONDecodeError:
+                return content
+
+        if deployment != route.primary:
+            # A fallback answered: file it under that deployment, never as the primary's
+            key = make_cache_key(messages, deployment, route.temperature, max_tokens, response_format)
+        await llm_cache.put(method, key, policy, CachedCompletion(
+            content=content,
+            model=deployment,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency_ms=latency_ms,
+        ))
+        return content
+
+    async def _json_completion(
+        self,
+        method: str,
+        messages: List[Dict[str, Any]],
+        max_tokens: Optional[int] = None,
+        task: Optional[str] = None,
+        schema: Optional[Type[BaseModel]] = None
+    ) -> Dict[str, Any]:
+        content = await self._completion(method, messages, max_tokens=max_tokens, task=task, schema=schema)
+        return await self.parse_structured(method, content, schema)
+
+    # ============================================================
+    # 🧱 STRUCTURED OUTPUT PARSING + REPAIR
+    # ============================================================
+    STRUCTURED_OUTCOMES = ("ok", "salvaged", "repaired", "failed")
+
+    async def parse_structured(
+        self,
+        method: str,
+        content: Optional[str],
+        schema: Optional[Type[BaseModel]] = None
+    ) -> Dict[str, Any]:
+        """
+        JSON object from a model response, validated against `schema` if given.
+        Truncated or fenced output is salvaged locally; only when that fails is
+        one text-only repair call made (never a resend of the original prompt).
+        Raises ValueError if nothing usable comes back.
+        """
+        data, salvaged = parse_tolerant(content)
+        result = self._validated(data, schema)
+        if result is not None:
+            self._record_structured(method, "salvaged" if salvaged else "ok")
+            return result
+
+        if content and content.strip():
+            repaired = await self._repair_json(method, content, schema)
+            if repaired is not None:
+                self._record_structured(method, "repaired")
+                return repaired
+
+        self._record_structured(method, "failed")
+        raise ValueError(f"{method}: model returned no usable JSON")
+
+    async def _repair_json(
+        self,
+        method: str,
+        content: str,
+        schema: Optional[Type[BaseModel]]
+    ) -> Optional[Dict[str, Any]]:
+        target = f"this JSON schema: {compact(strict_json_schema(schema))}" if schema else "a single JSON object"
+        logger.warning(f"🩹 {method}: invalid JSON response, requesting text-only repair")
+        try:
+            repaired = await self._completion(
+                "repair_json",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": (
+                            "You repair malformed or truncated JSON. Keep every value that is present, "
+                            f"fill missing required fields sensibly and return only JSON matching {target}"
+                        )
+                    },
+                    {"role": "user", "content": content}
+                ],
+                task="json_repair",
+                schema=schema
+            )
+        except Exception as e:
+            logger.error(f"❌ {method}: JSON repair call failed: {str(e)}")
+            return None
+        return self._validated(parse_tolerant(repaired)[0], schema)
+
+    @staticmethod
+    def _validated(data: Any, schema: Optional[Type[BaseModel]]) -> Optional[Dict[str, Any]]:
+        if schema is not None:
+            return validate(schema, data)
+        return data if isinstance(data, dict) else None
+
+    def _record_structured(self, method: str, outcome: str):
+        """Outcome counters plus the share of responses that needed a repair call (or failed)"""
+        metrics.incr("llm_structured_total", method=method, outcome=outcome)
+        counts = {
+            o: metrics.counter_value("llm_structured_total", method=method, outcome=o)
+            for o in self.STRUCTURED_OUTCOMES
+        }
+        total = sum(counts.values())
+        retried = counts["repaired"] + counts["failed"]
+        metrics.set_gauge("llm_structured_retry_rate", round(retried / total, 4) if total else 0.0, method=method)
 
     # ============================================================
     # 🧩 TEXT-BASED OUTFIT + ACCESSORY PARSING
@@ -56,19 +267,16 @@ Return JSON:
   "confidence": 0.95
 }}
 """
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            result = await self._json_completion(
+                "parse_outfit_description",
                 messages=[
                     {"role": "system", "content": "You are a stylist extracting structured fashion information."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.5,
-                max_tokens=700,
-                response_format={"type": "json_object"}
+                schema=OutfitParse
             )
-
-            content = response.choices[0].message.content
-            result = json.loads(content)
+            # The schema has a slot per body area; keep only the ones worn
+            result["accessories"] = {k: v for k, v in result["accessories"].items() if v}
             logger.info(f"🧾 Parsed outfit: {result}")
             return result
 
@@ -95,25 +303,13 @@ Return JSON:
     ) -> Dict[str, Any]:
         """Generate a complete makeup plan using outfit, profile, and accessories"""
         try:
-            prompt = self._build_makeup_plan_prompt(
-                user_profile, occasion, scope, outfit_data, accessories_data
+            result = await self._json_completion(
+                "generate_makeup_plan",
+                messages=self._makeup_plan_messages(
+                    user_profile, occasion, scope, outfit_data, accessories_data
+                ),
+                schema=MakeupPlanDraft
             )
-
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert makeup artist. Create detailed, step-by-step, safe makeup looks."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=1500,
-                response_format={"type": "json_object"}
-            )
-
-            result = json.loads(response.choices[0].message.content)
             result.setdefault("occasion", occasion)
             result.setdefault("scope", scope)
 
@@ -124,71 +320,98 @@ Return JSON:
             logger.error(f"Makeup plan generation error: {str(e)}")
             raise
 
-    def _build_makeup_plan_prompt(
+    async def stream_makeup_plan(
         self,
         user_profile: Dict[str, Any],
         occasion: str,
         scope: str,
         outfit_data: Dict[str, Any],
         accessories_data: Dict[str, Any]
-    ) -> str:
-        """Construct the LLM prompt for generating makeup recommendations"""
-
-        concerns_text = ""
-        if user_profile.get("skin_concerns"):
-            concerns = [c.get("type", "") if isinstance(c, dict) else str(c) for c in user_profile["skin_concerns"]]
-            concerns_text = f"\nSkin Concerns: {', '.join(concerns)}"
-
-        allergies_text = ""
-        if user_profile.get("allergies"):
-            allergies_text = f"\nAllergies: {', '.join(user_profile['allergies'])}"
-
-        return f"""
-Create a detailed makeup plan for the following profile and context.
-
-USER PROFILE:
-- Skin Tone: {user_profile.get('skin_tone', 'Medium')}
-- Undertone: {user_profile.get('undertone', 'Warm')}
-- Skin Type: {user_profile.get('skin_type', 'Combination')}
-{concerns_text}{allergies_text}
-
-OUTFIT:
-- Description: {outfit_data.get('refined_description', outfit_data.get('description', 'Not provided'))}
-- Type: {outfit_data.get('outfit_type', 'unknown')}
-- Colors: {', '.join(outfit_data.get('colors', []))}
-
-ACCESSORIES:
-{json.dumps(accessories_data, indent=2)}
-
-OCCASION: {occasion}
-MAKEUP SCOPE: {scope}
-
-Generate a makeup plan that complements the outfit and occasion.
-
-Return JSON:
-{{
-  "occasion": "{occasion}",
-  "scope": "{scope}",
-  "style": "style name",
-  "reasoning": "why this style suits the outfit",
-  "intensity": "subtle|moderate|bold",
-  "steps": [
-    {{
-      "step_number": 1,
-      "category": "foundation|eyes|lips|cheeks|base",
-      "instruction": "step detail",
-      "tool_needed": "brush|blender|fingers",
-      "amount": "pea-size|thin layer",
-      "technique": "how to apply",
-      "expected_result": "description",
-      "tips": ["tip1", "tip2"]
-    }}
-  ],
-  "key_focus": ["eyes", "base", "lips"],
-  "estimated_duration": 25,
-  "difficulty": "beginner|intermediate|advanced"
-}}
-"""
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of generate_makeup_plan.
+        Yields ("step", step) as each step object closes, then ("plan", plan).
+        """
+        route = model_router.route("generate_makeup_plan")
+        messages, _ = fit_messages(
+            self._makeup_plan_messages(user_profile, occasion, scope, outfit_data, accessories_data),
+            route.prompt_budget,
+            route.task
+        )
+        parser = StreamingArrayParser("steps")
+        started = time.perf_counter()
+
+        # Streams are not failed over mid-response; they stay on the primary deployment
+        async for chunk in governor_for(route.primary).stream_chat(
+            self.client,
+            name="stream_makeup_plan",
+            model=route.primary,
+            messages=messages,
+            temperature=route.temperature,
+            max_tokens=route.max_tokens,
+            response_format=response_format_for(MakeupPlanDraft),
+            stream_options={"include_usage": True}
+        ):
+            if not chunk.choices:
+                # Final chunk carries usage only
+                token_ledger.record(getattr(chunk, "usage", None), "stream_makeup_plan")
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            for step in parser.feed(delta):
+                if len(parser.items) == 1:
+                    metrics.observe("makeup_plan_first_step_ms", (time.perf_counter() - started) * 1000)
+                yield "step", step
+
+        metrics.observe("makeup_plan_stream_ms", (time.perf_counter() - started) * 1000)
+
+        result = parser.result()
+        if result is None:
+            salvaged, _ = parse_tolerant(parser.text)
+            result = salvaged if isinstance(salvaged, dict) and salvaged.get("steps") else None
+        if result is None:
+            if not parser.items:
+                raise ValueError("Makeup plan stream returned no usable JSON")
+            # Truncated document: keep the steps that did arrive
+            logger.warning("⚠️ Makeup plan stream ended with invalid JSON, using streamed steps")
+            result = {"style": "custom", "steps": parser.items}
+        result.setdefault("occasion", occasion)
+        result.setdefault("scope", scope)
+
+        logger.info(f"💄 Makeup plan streamed for occasion: {occasion} ({len(parser.items)} steps)")
+        yield "plan", result
+
+    @staticmethod
+    def _makeup_plan_messages(
+        user_profile: Dict[str, Any],
+        occasion: str,
+        scope: str,
+        outfit_data: Dict[str, Any],
+        accessories_data: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """Static MAKEUP_PLAN prefix + this request's profile, outfit and accessories"""
+        concerns = [
+            c.get("type", "") if isinstance(c, dict) else str(c)
+            for c in user_profile.get("skin_concerns") or []
+        ]
+        return MAKEUP_PLAN.messages(
+            profile={
+                "skin_tone": user_profile.get("skin_tone", "Medium"),
+                "undertone": user_profile.get("undertone", "Warm"),
+                "skin_type": user_profile.get("skin_type", "Combination"),
+                "skin_concerns": concerns,
+                "allergies": user_profile.get("allergies") or [],
+            },
+            outfit={
+                "description": outfit_data.get("refined_description", outfit_data.get("description", "Not provided")),
+                "type": outfit_data.get("outfit_type", "unknown"),
+                "colors": outfit_data.get("colors", []),
+            },
+            accessories=accessories_data,
+            occasion=occasion,
+            scope=scope,
+        )
 
     # ============================================================
     # 💍 ACCESSORY RECOMMENDATION
@@ -201,44 +424,20 @@ Return JSON:
     ) -> Dict[str, Any]:
         """Suggest accessory balance & improvement"""
         try:
-            prompt = f"""
-Analyze this outfit and accessories:
-
-OUTFIT:
-- {outfit_data.get('refined_description', outfit_data.get('description'))}
-- Colors: {', '.join(outfit_data.get('colors', []))}
-- Type: {outfit_data.get('outfit_type', 'unknown')}
-
-ACCESSORIES:
-{json.dumps(accessories_data, indent=2)}
-
-OCCASION: {occasion}
-
-Suggest which accessories to keep, modify, or remove.
-
-Return JSON:
-{{
-  "keep_accessories": ["earrings", "bindi"],
-  "remove_accessories": ["necklace"],
-  "change_accessories": ["bangles"],
-  "reasoning": "explanation",
-  "makeup_style": "glam|ethnic|minimal",
-  "intensity": "subtle|moderate|bold"
-}}
-"""
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a professional stylist balancing jewelry with outfit."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.6,
-                max_tokens=800,
-                response_format={"type": "json_object"}
+            return await self._json_completion(
+                "generate_accessory_recommendation",
+                messages=ACCESSORY_RECOMMENDATION.messages(
+                    outfit={
+                        "description": outfit_data.get("refined_description", outfit_data.get("description")),
+                        "type": outfit_data.get("outfit_type", "unknown"),
+                        "colors": outfit_data.get("colors", []),
+                    },
+                    accessories=accessories_data,
+                    occasion=occasion,
+                ),
+                schema=AIRecommendation
             )
 
-            return json.loads(response.choices[0].message.content)
-
         except Exception as e:
             logger.error(f"Accessory recommendation error: {str(e)}")
             raise
@@ -321,8 +520,8 @@ IMPORTANT GUIDELINES:
 - maintenance_level: Rate as Low, Medium, or High based on styling time and upkeep
 """
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            result = await self._json_completion(
+                "generate_hair_style_suggestion",
                 messages=[
                     {
                         "role": "system",
@@ -330,23 +529,10 @@ IMPORTANT GUIDELINES:
                     },
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.7,
-                max_tokens=1000,
-                response_format={"type": "json_object"}
+                schema=HairStyleSuggestion
             )
-            
-            result = json.loads(response.choices[0].message.content)
-            
-            # Validate response structure
-            required_keys = ["recommended_style", "benefits", "styling_tips"]
-            if not all(key in result for key in required_keys):
-                raise ValueError("Invalid response structure from LLM")
-            
             return result
             
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error in hair style suggestion: {str(e)}")
-            raise ValueError("Failed to parse AI response")
         except Exception as e:
             logger.error(f"Hair style suggestion error: {str(e)}")
             raise Exception(f"Failed to generate hairstyle recommendation: {str(e)}")
@@ -371,100 +557,246 @@ IMPORTANT GUIDELINES:
         Returns:
             Dict with safety analysis
         """
+        local = None
         try:
-            # Safely extract user profile data
-            allergies = user_profile.get("allergies", [])
-            skin_concerns = user_profile.get("skin_concerns", [])
-            skin_type = user_profile.get("skin_type", "unknown")
-            skin_tone = user_profile.get("skin_tone", "unknown")
-            
-            # Normalize lists
-            if isinstance(allergies, str):
-                allergies = [allergies]
-            if isinstance(skin_concerns, str):
-                skin_concerns = [skin_concerns]
+            allergies, skin_concerns, skin_type, skin_tone = self._safety_profile(user_profile)
             
-            # Handle dict items in concerns
-            if skin_concerns and isinstance(skin_concerns[0], dict):
-                skin_concerns = [c.get("type", "") for c in skin_concerns if isinstance(c, dict)]
+            # Dictionary screening first; the LLM only sees what it couldn't resolve
+            local, remaining = self._screen_ingredients(product_ingredients, allergies, skin_concerns)
+            if local is not None and remaining is None:
+                logger.info(f"🧴 Safety check for {product_name} resolved locally | Safe: {local['is_safe']}")
+                return local
+            if remaining is not None:
+                product_ingredients = remaining
             
-            # Filter empty values
-            allergies = [str(a).strip() for a in allergies if a]
-            skin_concerns = [str(c).strip() for c in skin_concerns if c]
-            
-            # Join ingredients safely
-            ingredients_str = ', '.join(product_ingredients) if product_ingredients else 'Not provided'
+            safety_data = await self._json_completion(
+                "check_product_safety",
+                messages=PRODUCT_SAFETY.messages(
+                    profile=self._safety_prompt_profile(allergies, skin_concerns, skin_type, skin_tone),
+                    product=product_name,
+                    ingredients=', '.join(product_ingredients) if product_ingredients else 'Not provided'
+                ),
+                schema=ProductSafetyVerdict
+            )
 
-            prompt = f"""
-You are an expert cosmetic dermatologist and ingredient analyst.
-Evaluate the following product for skin safety based on the user's profile.
+            result = self._safety_result(safety_data)
+            if local is not None:
+                result = merge_safety_results(local, result)
 
-Product: {product_name}
-Ingredients: {ingredients_str}
+            logger.info(f"🧴 Safety check for {product_name} | Safe: {result['is_safe']}")
+            return result
 
-User Profile:
-- Skin Type: {skin_type}
-- Skin Tone: {skin_tone}
-- Allergies: {', '.join(allergies) or 'None'}
-- Skin Concerns: {', '.join(skin_concerns) or 'None'}
+        except Exception as e:
+            logger.error(f"❌ Product safety check error: {str(e)}")
+            # Return safe fallback on error (keeping any dictionary findings)
+            fallback = self._safety_fallback(str(e))
+            return merge_safety_results(local, fallback) if local is not None else fallback
 
-Provide analysis in JSON:
-{{
-  "is_safe": true|false,
-  "safety_score": 0.0-1.0,
-  "warnings": ["warning1", "warning2"],
-  "allergens_found": ["allergen1"],
-  "concern_conflicts": ["conflict1"],
-  "severity": "low|moderate|high",
-  "recommendation": "safe_to_use|use_with_caution|avoid",
-  "confidence": 0.0-1.0
-}}
-"""
+    async def check_products_safety_batch(
+        self,
+        products: List[Dict[str, Any]],
+        user_profile: Dict[str, Any]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Safety check for many products against one user profile.
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a dermatologist analyzing cosmetic product safety."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.4,
-                max_tokens=600,
-                response_format={"type": "json_object"}
-            )
+        Args:
+            products: Dicts with `id`, `product_name` and `ingredients`
+            user_profile: Same shape as for check_product_safety
 
-            safety_data = json.loads(response.choices[0].message.content)
-
-            # Add fallback defaults
-            result = {
-                "is_safe": safety_data.get("is_safe", True),
-                "safety_score": safety_data.get("safety_score", 0.9),
-                "warnings": safety_data.get("warnings", []),
-                "allergens_found": safety_data.get("allergens_found", []),
-                "concern_conflicts": safety_data.get("concern_conflicts", []),
-                "severity": safety_data.get("severity", "low"),
-                "recommendation": safety_data.get("recommendation", "safe_to_use"),
-                "confidence": safety_data.get("confidence", 0.85)
-            }
+        Returns:
+            Verdicts keyed by str(product id), same fields as check_product_safety.
+            Products the ingredient dictionary fully resolves skip the LLM; the
+            rest are packed into as few calls as the token budget allows, and
+            any id the model leaves out is re-checked on its own.
+        """
+        if not products:
+            return {}
+
+        allergies, skin_concerns, skin_type, skin_tone = self._safety_profile(user_profile)
+        profile = self._safety_prompt_profile(allergies, skin_concerns, skin_type, skin_tone)
+
+        lines, local_verdicts = {}, {}
+        verdicts: Dict[str, Dict[str, Any]] = {}
+        for product in products:
+            ingredients = product.get("ingredients") or []
+            if isinstance(ingredients, str):
+                ingredients = [ingredients]
+            pid = str(product.get("id"))
+            local, remaining = self._screen_ingredients(ingredients, allergies, skin_concerns)
+            if local is not None:
+                if remaining is None:
+                    verdicts[pid] = local
+                    continue
+                local_verdicts[pid] = local
+                ingredients = remaining
+            lines[pid] = (
+                f'{pid} | {product.get("product_name") or "Unknown Product"} | '
+                f"{', '.join(str(i) for i in ingredients) or 'Not provided'}"
+            )
 
-            logger.info(f"🧴 Safety check for {product_name} | Safe: {result['is_safe']}")
-            return result
+        chunks = self._chunk_by_tokens(
+            list(lines.items()),
+            budget=settings.LLM_SAFETY_BATCH_TOKEN_BUDGET - count_tokens(compact(profile)),
+            max_items=settings.LLM_SAFETY_BATCH_MAX_PRODUCTS
+        )
 
+        semaphore = asyncio.Semaphore(settings.LLM_SAFETY_BATCH_CONCURRENCY)
+
+        async def run_chunk(chunk: List[tuple]) -> Dict[str, Dict[str, Any]]:
+            async with semaphore:
+                return await self._safety_chunk(chunk, profile)
+
+        for chunk_result in await asyncio.gather(*(run_chunk(c) for c in chunks)):
+            for pid, verdict in chunk_result.items():
+                local = local_verdicts.get(pid)
+                verdicts[pid] = merge_safety_results(local, verdict) if local is not None else verdict
+
+        # Anything the batch dropped gets an individual check
+        by_id = {str(p.get("id")): p for p in products}
+        missing = [pid for pid in lines if pid not in verdicts]
+        if missing:
+            logger.warning(f"⚠️ Batch safety check missed {len(missing)} products, checking individually")
+
+            async def run_single(pid: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.check_product_safety(
+                        product_name=by_id[pid].get("product_name") or "Unknown Product",
+                        product_ingredients=by_id[pid].get("ingredients") or [],
+                        user_profile=user_profile
+                    )
+
+            for pid, result in zip(missing, await asyncio.gather(*(run_single(pid) for pid in missing))):
+                verdicts[pid] = result
+
+        logger.info(f"🧴 Batch safety check: {len(products)} products in {len(chunks)} calls")
+        return verdicts
+
+    async def _safety_chunk(self, chunk: List[tuple], profile: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """One structured call covering every product in `chunk`"""
+        messages = PRODUCT_SAFETY_BATCH.messages(
+            profile=profile,
+            products="\n" + "\n".join(line for _, line in chunk)
+        )
+        try:
+            data = await self._json_completion(
+                "check_products_safety_batch",
+                messages=messages,
+                max_tokens=min(4000, 200 + 180 * len(chunk)),
+                schema=ProductSafetyBatch
+            )
         except Exception as e:
-            logger.error(f"❌ Product safety check error: {str(e)}")
-            # Return safe fallback on error
-            return {
-                "is_safe": True,
-                "safety_score": 0.7,
-                "warnings": [f"Safety check unavailable: {str(e)}"],
-                "allergens_found": [],
-                "concern_conflicts": [],
-                "severity": "unknown",
-                "recommendation": "review_manually",
-                "confidence": 0.5
-            }
+            logger.error(f"❌ Batch safety chunk error: {str(e)}")
+            return {}
+
+        ids = {pid for pid, _ in chunk}
+        return {
+            item["id"]: self._safety_result(item)
+            for item in data["results"]
+            if item["id"] in ids
+        }
+
+    @staticmethod
+    def _screen_ingredients(
+        ingredients: List[str],
+        allergies: List[str],
+        skin_concerns: List[str]
+    ) -> tuple:
+        """
+        (local verdict, ingredients still needing the LLM).
+        Verdict is None when screening is off or there is nothing to screen;
+        the remainder is None when the dictionary resolved everything.
+        """
+        if not settings.ENABLE_INGREDIENT_MATCHER or not ingredients:
+            return None, ingredients
+        report = ingredient_matcher.evaluate(ingredients, allergies, skin_concerns)
+        if not report.needs_llm:
+            return report.to_safety_result(), None
+        # Unknown allergies can hide in any ingredient, so send the full list
+        remaining = list(ingredients) if report.unresolved_allergies else report.unresolved
+        return report.to_safety_result(), remaining
+
+    @staticmethod
+    def _chunk_by_tokens(items: List[tuple], budget: int, max_items: int) -> List[List[tuple]]:
+        """Greedy packing of (id, text) pairs; an oversized item gets a chunk of its own"""
+        chunks: List[List[tuple]] = []
+        current: List[tuple] = []
+        used = 0
+        for item in items:
+            cost = count_tokens(item[1])
+            if current and (used + cost > budget or len(current) >= max_items):
+                chunks.append(current)
+                current, used = [], 0
+            current.append(item)
+            used += cost
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def _safety_profile(user_profile: Dict[str, Any]) -> tuple:
+        """(allergies, skin_concerns, skin_type, skin_tone) cleaned for prompting"""
+        # Safely extract user profile data
+        allergies = user_profile.get("allergies") or []
+        skin_concerns = user_profile.get("skin_concerns") or []
+        skin_type = user_profile.get("skin_type") or "unknown"
+        skin_tone = user_profile.get("skin_tone") or "unknown"
+        
+        # Normalize lists
+        if isinstance(allergies, str):
+            allergies = [allergies]
+        if isinstance(skin_concerns, str):
+            skin_concerns = [skin_concerns]
+        
+        # Handle dict items in concerns
+        if skin_concerns and isinstance(skin_concerns[0], dict):
+            skin_concerns = [c.get("type", "") for c in skin_concerns if isinstance(c, dict)]
+        
+        # Filter empty values
+        allergies = [str(a).strip() for a in allergies if a]
+        skin_concerns = [str(c).strip() for c in skin_concerns if c]
+        return allergies, skin_concerns, skin_type, skin_tone
+
+    @staticmethod
+    def _safety_prompt_profile(
+        allergies: List[str],
+        skin_concerns: List[str],
+        skin_type: str,
+        skin_tone: str
+    ) -> Dict[str, Any]:
+        return {
+            "skin_type": skin_type,
+            "skin_tone": skin_tone,
+            "allergies": allergies or "None",
+            "skin_concerns": skin_concerns or "None",
+        }
+
+    @staticmethod
+    def _safety_result(safety_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Verdict with fallback defaults for missing fields"""
+        return {
+            "is_safe": safety_data.get("is_safe", True),
+            "safety_score": safety_data.get("safety_score", 0.9),
+            "warnings": safety_data.get("warnings", []),
+            "allergens_found": safety_data.get("allergens_found", []),
+            "concern_conflicts": safety_data.get("concern_conflicts", []),
+            "severity": safety_data.get("severity", "low"),
+            "recommendation": safety_data.get("recommendation", "safe_to_use"),
+            "confidence": safety_data.get("confidence", 0.85)
+        }
+
+    @staticmethod
+    def _safety_fallback(reason: str) -> Dict[str, Any]:
+        return {
+            "is_safe": True,
+            "safety_score": 0.7,
+            "warnings": [f"Safety check unavailable: {reason}"],
+            "allergens_found": [],
+            "concern_conflicts": [],
+            "severity": "unknown",
+            "recommendation": "review_manually",
+            "confidence": 0.5
+        }
 
     # ============================================================
     # 📝 HELPER METHODS
@@ -473,21 +805,25 @@ Provide analysis in JSON:
         self, 
         prompt: str, 
         system_role: str, 
-        max_tokens: int = 400
+        max_tokens: Optional[int] = None,
+        task: str = "structured_response",
+        schema: Optional[Type[BaseModel]] = None
     ) -> Dict[str, Any]:
-        """Get structured JSON response from LLM"""
+        """
+        Get structured JSON response from LLM (sampling limits come from the task's route).
+        Pass a Pydantic `schema` to get strict schema-constrained output.
+        """
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            return await self._json_completion(
+                "get_structured_response",
                 messages=[
                     {"role": "system", "content": f"You are a {system_role}."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.4,
                 max_tokens=max_tokens,
-                response_format={"type": "json_object"}
+                task=task,
+                schema=schema
             )
-            return json.loads(response.choices[0].message.content)
         except Exception as e:
             logger.error(f"Structured response error: {str(e)}")
             raise
@@ -496,20 +832,22 @@ Provide analysis in JSON:
         self, 
         prompt: str, 
         system_role: str = "assistant", 
-        max_tokens: int = 300
+        max_tokens: Optional[int] = None,
+        task: str = "text_completion"
     ) -> str:
-        """Get plain text response from LLM"""
+        """Get plain text response from LLM (sampling limits come from the task's route)"""
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
+            content = await self._completion(
+                "get_text_completion",
                 messages=[
                     {"role": "system", "content": f"You are a {system_role}."},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.5,
-                max_tokens=max_tokens
+                json_mode=False,
+                max_tokens=max_tokens,
+                task=task
             )
-            return response.choices[0].message.content.strip()
+            return content.strip()
         except Exception as e:
             logger.error(f"Text completion error: {str(e)}")
             raise
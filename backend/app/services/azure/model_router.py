@@ -0,0 +1,179 @@
+"""
+GlamAI - LLM Task Routing
+Maps each LLM task to a deployment chain with its own sampling limits
+"""
+
+import json
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.azure.openai_governor import governor_for, is_transient
+
+
+@dataclass(frozen=True)
+class Route:
+    """Deployment chain (primary first), sampling settings and prompt budget for one task"""
+    task: str
+    deployments: Tuple[str, ...]
+    temperature: float
+    max_tokens: int
+    prompt_budget: int
+
+    @property
+    def primary(self) -> str:
+        return self.deployments[0]
+
+
+# task -> (tier, temperature, max_tokens, prompt_budget). "small" tasks are
+# extraction and parsing jobs a cheaper deployment handles well; "large" ones
+# are user-facing generations and safety verdicts. Prompts over their budget
+# are trimmed from the tail of the request data (see llm/tokens.py).
+ROUTE_TABLE: Dict[str, Tuple[str, float, int, int]] = {
+    "parse_outfit_description": ("small", 0.5, 700, 1200),
+    "generate_makeup_plan": ("large", 0.7, 1500, 2500),
+    "generate_accessory_recommendation": ("large", 0.6, 800, 1500),
+    "generate_hair_style_suggestion": ("large", 0.7, 1000, 2000),
+    "check_product_safety": ("large", 0.4, 600, 2000),
+    "check_products_safety_batch": ("large", 0.4, 4000, 4000),
+    "structured_response": ("large", 0.4, 400, 1500),
+    "text_completion": ("small", 0.5, 300, 1000),
+    "ingredient_extraction": ("small", 0.2, 500, 600),
+    "product_enrichment": ("small", 0.3, 300, 600),
+    "query_parse": ("small", 0.2, 500, 600),
+    "result_summary": ("small", 0.5, 300, 800),
+    "product_text_parse": ("small", 0.3, 1000, 1000),
+    "barcode_lookup": ("large", 0.4, 1000, 800),
+    "json_repair": ("small", 0.0, 2000, 3000),
+}
+
+DEFAULT_TASK = "structured_response"
+
+
+class ModelRouter:
+    """
+    Resolves tasks to routes and runs completions along the fallback chain.
+
+    A deployment is skipped while its governor is saturated (throttled or a
+    full queue) and abandoned after a transient error once its own short
+    retry budget is spent; the next deployment in the chain takes over.
+    Non-transient errors (bad request, auth) are raised straight away.
+    """
+
+    def __init__(self):
+        self.routes: Dict[str, Route] = self._build_routes()
+
+    @staticmethod
+    def _build_routes() -> Dict[str, Route]:
+        large = settings.AZURE_OPENAI_DEPLOYMENT_NAME
+        small = settings.AZURE_OPENAI_SMALL_DEPLOYMENT_NAME or large
+        chains = {
+            "small": tuple(dict.fromkeys((small, large))),
+            "large": tuple(dict.fromkeys((large, small))),
+        }
+
+        routes: Dict[str, Route] = {}
+        for task, (tier, temperature, max_tokens, prompt_budget) in ROUTE_TABLE.items():
+            override = settings.LLM_ROUTE_OVERRIDES.get(task, {})
+            tier = override.get("tier", tier)
+            deployments = tuple(override["deployments"]) if override.get("deployments") else chains[tier]
+            routes[task] = Route(
+                task=task,
+                deployments=deployments,
+                temperature=float(override.get("temperature", temperature)),
+                max_tokens=int(override.get("max_tokens", max_tokens)),
+                prompt_budget=int(override.get("prompt_budget", prompt_budget)),
+            )
+        return routes
+
+    def route(self, task: str) -> Route:
+        route = self.routes.get(task)
+        if route is None:
+            logger.warning(f"No LLM route for task '{task}', using {DEFAULT_TASK}")
+            route = replace(self.routes[DEFAULT_TASK], task=task)
+        return route
+
+    async def complete(
+        self,
+        client: Any,
+        route: Route,
+        messages: List[Dict[str, Any]],
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict[str, Any]] = None,
+        name: Optional[str] = None
+    ) -> Tuple[Any, str]:
+        """Chat completion for `route`; returns (response, deployment that served it)"""
+        kwargs: Dict[str, Any] = {}
+        if response_format:
+            kwargs["response_format"] = response_format
+
+        chain = self._order(route)
+        last_error: Optional[Exception] = None
+        for index, deployment in enumerate(chain):
+            has_fallback = index < len(chain) - 1
+            started = time.perf_counter()
+            try:
+                response = await governor_for(deployment).chat(
+                    client,
+                    name=name or route.task,
+                    retries=1 if has_fallback else None,
+                    model=deployment,
+                    messages=messages,
+                    temperature=route.temperature,
+                    max_tokens=max_tokens or route.max_tokens,
+                    **kwargs
+                )
+            except Exception as e:
+                metrics.incr("llm_route_calls_total", task=route.task, deployment=deployment, outcome="error")
+                if not (has_fallback and is_transient(e)):
+                    raise
+                last_error = e
+                metrics.incr("llm_route_fallbacks_total", task=route.task, deployment=deployment, reason="error")
+                logger.warning(f"LLM route {route.task}: {deployment} failed ({e}), falling back")
+                continue
+
+            metrics.observe("llm_route_ms", (time.perf_counter() - started) * 1000, task=route.task, deployment=deployment)
+            metrics.incr("llm_route_calls_total", task=route.task, deployment=deployment, outcome="ok")
+            self._record_quality(route.task, deployment, response, bool(response_format))
+            return response, deployment
+
+        raise last_error or RuntimeError(f"No deployment available for {route.task}")
+
+    def _order(self, route: Route) -> Tuple[str, ...]:
+        """Chain with saturated deployments moved to the back (still tried as a last resort)"""
+        ready = [d for d in route.deployments if not governor_for(d).saturated]
+        busy = [d for d in route.deployments if d not in ready]
+        if busy and ready:
+            for deployment in busy:
+                metrics.incr("llm_route_fallbacks_total", task=route.task, deployment=deployment, reason="saturated")
+        return tuple(ready + busy)
+
+    @staticmethod
+    def _record_quality(task: str, deployment: str, response: Any, json_mode: bool):
+        choice = response.choices[0]
+        content = choice.message.content or ""
+        if getattr(choice, "finish_reason", None) == "length":
+            result = "truncated"
+        elif not content.strip():
+            result = "empty"
+        elif json_mode and not _parses(content):
+            result = "invalid_json"
+        else:
+            result = "ok"
+        metrics.incr("llm_route_quality_total", task=task, deployment=deployment, result=result)
+
+
+def _parses(content: str) -> bool:
+    try:
+        json.loads(content)
+        return True
+    except json.JSONDecodeError:
+        return False
+
+
+# Singleton instance
+model_router = ModelRouter()
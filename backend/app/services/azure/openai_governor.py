@@ -0,0 +1,428 @@
+"""
+GlamAI - Azure OpenAI Governor
+Shared rate limits, adaptive concurrency and retries for every OpenAI call
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+from loguru import logger
+import asyncio
+import heapq
+import itertools
+import random
+import time
+
+import openai
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class Priority(IntEnum):
+    """Lower value is served first"""
+    INTERACTIVE = 0   # a user is waiting on the response
+    STANDARD = 1
+    BACKGROUND = 2    # enrichment / batch work that can wait
+
+
+_current_priority: ContextVar[Priority] = ContextVar("openai_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def priority(level: Priority) -> Iterator[None]:
+    """Run every governed OpenAI call inside the block at `level`"""
+    token = _current_priority.set(level)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class TokenBucket:
+    """Continuous-refill bucket; `capacity` units per `period` seconds"""
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 when it is now)"""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Give back (positive) or charge (negative) once the real usage is known"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _Waiter:
+    __slots__ = ("priority", "tokens", "future", "enqueued")
+
+    def __init__(self, level: Priority, tokens: int, future: asyncio.Future):
+        self.priority = level
+        self.tokens = tokens
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+def estimate_request_tokens(messages: List[dict], max_tokens: int, image_tokens: int = 765) -> int:
+    """Rough prompt + completion budget (~4 characters per token, flat cost per image)"""
+    total = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            total += len(content) // 4
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    total += len(part.get("text", "")) // 4
+                else:
+                    total += image_tokens
+    return total + (max_tokens or 0)
+
+
+class OpenAIGovernor:
+    """
+    Single gate for one Azure OpenAI deployment (see governor_for).
+
+    - Token buckets for requests and tokens per minute
+    - AIMD concurrency: +1/limit per fast success, halved on 429,
+      trimmed when latency passes the target
+    - Retries with full-jitter backoff that honours Retry-After
+    - Priority queue: interactive calls jump background ones, and
+      background work only gets a share of the concurrency limit
+    """
+
+    def __init__(self, deployment: str = ""):
+        self.deployment = deployment
+        self.min_limit = max(1, settings.OPENAI_MIN_CONCURRENCY)
+        self.max_limit = max(self.min_limit, settings.OPENAI_MAX_CONCURRENCY)
+        self.limit = float(min(self.max_limit, max(self.min_limit, settings.OPENAI_INITIAL_CONCURRENCY)))
+        self.requests = TokenBucket(settings.OPENAI_RPM_LIMIT)
+        self.tokens = TokenBucket(settings.OPENAI_TPM_LIMIT)
+
+        self._in_flight = 0
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    # ============================================================
+    # 🚦 PUBLIC API
+    # ============================================================
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        estimated_tokens: int = 1000,
+        name: str = "chat",
+        level: Optional[Priority] = None,
+        retries: Optional[int] = None
+    ) -> Any:
+        """
+        Run `fn()` (one OpenAI request) under the shared limits, retrying transient
+        failures `retries` times (default OPENAI_MAX_RETRIES)
+        """
+        level = _current_priority.get() if level is None else level
+        attempts = (settings.OPENAI_MAX_RETRIES if retries is None else retries) + 1
+
+        for attempt in range(attempts):
+            await self._acquire(level, estimated_tokens)
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(fn(), timeout=settings.OPENAI_REQUEST_TIMEOUT_SECONDS)
+            except asyncio.CancelledError:
+                self._release()
+                raise
+            except Exception as e:
+                self._release()
+                await asyncio.sleep(self._retry_delay(e, attempt, attempts, name))
+                continue
+
+            latency_ms = (time.perf_counter() - started) * 1000
+            self._release()
+            self._on_success(latency_ms)
+            self._reconcile_tokens(result, estimated_tokens)
+            metrics.incr("openai_calls_total", call=name, outcome="ok")
+            metrics.observe("openai_call_ms", latency_ms, call=name, priority=level.name.lower())
+            return result
+
+    async def chat(
+        self,
+        client: Any,
+        estimated_tokens: Optional[int] = None,
+        name: str = "chat",
+        level: Optional[Priority] = None,
+        retries: Optional[int] = None,
+        **kwargs: Any
+    ) -> Any:
+        """Governed `client.chat.completions.create(**kwargs)`"""
+        if estimated_tokens is None:
+            estimated_tokens = estimate_request_tokens(kwargs.get("messages", []), kwargs.get("max_tokens", 0))
+        return await self.call(
+            lambda: client.chat.completions.create(**kwargs),
+            estimated_tokens=estimated_tokens,
+            name=name,
+            level=level,
+            retries=retries
+        )
+
+    async def stream_chat(
+        self,
+        client: Any,
+        estimated_tokens: Optional[int] = None,
+        name: str = "chat",
+        level: Optional[Priority] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        """
+        Governed streaming completion: yields chunks while holding one slot.
+        Only opening the stream is retried; a stream that fails midway raises.
+        """
+        level = _current_priority.get() if level is None else level
+        if estimated_tokens is None:
+            estimated_tokens = estimate_request_tokens(kwargs.get("messages", []), kwargs.get("max_tokens", 0))
+        attempts = settings.OPENAI_MAX_RETRIES + 1
+
+        stream = None
+        for attempt in range(attempts):
+            await self._acquire(level, estimated_tokens)
+            started = time.perf_counter()
+            try:
+                stream = await asyncio.wait_for(
+                    client.chat.completions.create(stream=True, **kwargs),
+                    timeout=settings.OPENAI_REQUEST_TIMEOUT_SECONDS
+                )
+                break
+            except asyncio.CancelledError:
+                self._release()
+                raise
+            except Exception as e:
+                self._release()
+                await asyncio.sleep(self._retry_delay(e, attempt, attempts, name))
+
+        first_chunk_ms: Optional[float] = None
+        outcome = "error"
+        try:
+            async for chunk in stream:
+                if first_chunk_ms is None:
+                    first_chunk_ms = (time.perf_counter() - started) * 1000
+                    metrics.observe("openai_first_chunk_ms", first_chunk_ms, call=name, priority=level.name.lower())
+                yield chunk
+            outcome = "ok"
+        finally:
+            self._release()
+            metrics.incr("openai_calls_total", call=name, outcome=outcome)
+            if outcome == "ok":
+                # Time to first chunk drives AIMD; total length depends on max_tokens
+                self._on_success(first_chunk_ms or 0.0)
+                metrics.observe(
+                    "openai_call_ms", (time.perf_counter() - started) * 1000,
+                    call=name, priority=level.name.lower()
+                )
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def saturated(self) -> bool:
+        """True while throttled, or when a new call would queue behind a full wave"""
+        if time.monotonic() < self._paused_until:
+            return True
+        return self._in_flight >= int(self.limit) and len(self._queue) >= int(self.limit)
+
+    # ============================================================
+    # 🎟️ ADMISSION
+    # ============================================================
+    def _slots_for(self, level: Priority) -> int:
+        limit = int(self.limit)
+        if level == Priority.BACKGROUND:
+            return max(1, int(limit * settings.OPENAI_BACKGROUND_SHARE))
+        return limit
+
+    async def _acquire(self, level: Priority, tokens: int):
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(level, tokens, loop.create_future())
+        heapq.heappush(self._queue, (int(level), next(self._seq), waiter))
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # Admitted just before the caller gave up: hand the slot back
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release()
+            raise
+        metrics.observe(
+            "openai_queue_wait_ms", (time.perf_counter() - waiter.enqueued) * 1000,
+            priority=level.name.lower()
+        )
+
+    def _dispatch(self):
+        """Admit waiters in priority order while slots and budget allow"""
+        now = time.monotonic()
+        while self._queue:
+            _, _, waiter = self._queue[0]
+            if waiter.future.done():
+                heapq.heappop(self._queue)
+                continue
+            if now < self._paused_until:
+                self._schedule(self._paused_until - now)
+                break
+            if self._in_flight >= self._slots_for(waiter.priority):
+                break
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(waiter.tokens))
+            if wait > 0:
+                self._schedule(wait)
+                break
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(waiter.tokens)
+            self._in_flight += 1
+            waiter.future.set_result(None)
+        self._publish()
+
+    def _schedule(self, delay: float):
+        loop = asyncio.get_running_loop()
+        when = loop.time() + delay
+        if self._timer is not None and not self._timer.cancelled() and self._timer.when() <= when:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_at(when, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def _release(self):
+        self._in_flight = max(0, self._in_flight - 1)
+        self._dispatch()
+
+    def _publish(self):
+        metrics.set_gauge("openai_concurrency_limit", round(self.limit, 2), deployment=self.deployment)
+        metrics.set_gauge("openai_in_flight", self._in_flight, deployment=self.deployment)
+        metrics.set_gauge("openai_queue_depth", len(self._queue), deployment=self.deployment)
+
+    # ============================================================
+    # 📈 AIMD + RETRIES
+    # ============================================================
+    def _decrease(self, factor: float):
+        # One decrease per second so a burst of failures doesn't collapse the limit
+        now = time.monotonic()
+        if now - self._last_decrease < 1.0:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * factor)
+
+    def _on_success(self, latency_ms: float):
+        if latency_ms > settings.OPENAI_LATENCY_TARGET_MS:
+            self._decrease(0.9)
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        self._publish()
+
+    def _on_throttle(self, retry_after: Optional[float]):
+        metrics.incr("openai_throttled_total", deployment=self.deployment)
+        self._decrease(0.5)
+        if retry_after:
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        self._publish()
+
+    def _retry_delay(self, error: Exception, attempt: int, attempts: int, name: str) -> float:
+        """Seconds to wait before the next attempt; re-raises `error` when it shouldn't be retried"""
+        retryable, throttled, retry_after = self._classify(error)
+        if throttled:
+            self._on_throttle(retry_after)
+        if not retryable or attempt == attempts - 1:
+            metrics.incr("openai_calls_total", call=name, outcome="error")
+            raise error
+        delay = retry_after if retry_after is not None else self._backoff(attempt)
+        metrics.incr("openai_retries_total", call=name, reason="429" if throttled else type(error).__name__)
+        logger.warning(f"⏳ OpenAI {name} failed ({type(error).__name__}), retry {attempt + 1} in {delay:.1f}s")
+        return delay
+
+    def _backoff(self, attempt: int) -> float:
+        cap = min(settings.OPENAI_BACKOFF_MAX_SECONDS, settings.OPENAI_BACKOFF_BASE_SECONDS * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    @staticmethod
+    def _classify(error: Exception) -> Tuple[bool, bool, Optional[float]]:
+        """(retryable, throttled, retry_after seconds)"""
+        if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError, openai.APIConnectionError)):
+            return True, False, None
+        if isinstance(error, openai.APIStatusError):
+            status = error.status_code
+            retry_after = _retry_after(error.response)
+            if status == 429:
+                return True, True, retry_after
+            if status in (408, 409) or status >= 500:
+                return True, False, retry_after
+        return False, False, None
+
+    def _reconcile_tokens(self, response: Any, estimated: int):
+        usage = getattr(response, "usage", None)
+        actual = getattr(usage, "total_tokens", None)
+        if actual:
+            self.tokens.adjust(estimated - actual)
+
+
+def _retry_after(response: Any) -> Optional[float]:
+    """Seconds from retry-after-ms / retry-after (delta or HTTP date), capped at the backoff max"""
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value: Optional[float] = None
+    try:
+        if headers.get("retry-after-ms"):
+            value = float(headers["retry-after-ms"]) / 1000
+        elif headers.get("retry-after"):
+            raw = headers["retry-after"]
+            try:
+                value = float(raw)
+            except ValueError:
+                value = parsedate_to_datetime(raw).timestamp() - time.time()
+    except (TypeError, ValueError):
+        return None
+    if value is None:
+        return None
+    # Small jitter so throttled callers don't all return on the same tick
+    return min(settings.OPENAI_BACKOFF_MAX_SECONDS, max(0.0, value)) + random.uniform(0, 0.25)
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether `error` is worth retrying / failing over (throttling, timeouts, 5xx)"""
+    return OpenAIGovernor._classify(error)[0]
+
+
+_governors: Dict[str, OpenAIGovernor] = {}
+
+
+def governor_for(deployment: str) -> OpenAIGovernor:
+    """One governor per deployment; each has its own Azure quota"""
+    governor = _governors.get(deployment)
+    if governor is None:
+        governor = _governors[deployment] = OpenAIGovernor(deployment)
+    return governor
+
+
+# Singleton instance (primary deployment)
+openai_governor = governor_for(settings.AZURE_OPENAI_DEPLOYMENT_NAME)
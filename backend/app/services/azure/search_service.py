@@ -13,13 +13,23 @@ from azure.search.documents.indexes.models import (
 )
 from azure.core.credentials import AzureKeyCredential
 from app.core.config import settings
-import logging
 import asyncio
+import logging
 from typing import List, Optional, Dict, Any
-from app.services.azure import llm_service
+from app.core.metrics import metrics
+from app.services.azure.llm_service import llm_service
+from app.services.azure.openai_governor import Priority, priority
+from app.services.search.catalog_search import catalog_search
+from app.services.search.indexing_queue import IndexingQueue
+from app.services.search.trending_feed import TrendingFeed
+from app.services.search.product_index import ORDER_POPULARITY, ORDER_RATING
+from app.services.search.similarity_index import MODE_BLEND
 
 logger = logging.getLogger(__name__)
 
+# Per-document statuses worth retrying (conflict, throttling); other 4xx are permanent
+_RETRYABLE_STATUS = {409, 422, 429, 503}
+
 
 class SearchService:
     def __init__(self):
@@ -28,6 +38,9 @@ class SearchService:
         self.credential = AzureKeyCredential(settings.AZURE_SEARCH_KEY)
         self.search_client = SearchClient(self.endpoint, self.index_name, self.credential)
         self.index_client = SearchIndexClient(self.endpoint, self.credential)
+        self.trending = TrendingFeed(self._query_trending)
+        self.indexer = IndexingQueue(self._upload_batch, name=self.index_name, on_indexed=self.trending.invalidate)
+        catalog_search.on_change(self.trending.invalidate)
         self._ensure_index_exists()
 
     def _ensure_index_exists(self):
@@ -69,67 +82,66 @@ class SearchService:
         except Exception as e:
             logger.error(f"❌ Error ensuring Azure Search index: {e}")
 
+    @staticmethod
+    def _clean_document(p: Dict[str, Any]) -> Dict[str, Any]:
+        """Index document for a product; collection fields must be lists of strings"""
+        ingredients = p.get("ingredients", [])
+        if not isinstance(ingredients, list):
+            ingredients = [ingredients] if ingredients else []
+
+        tags = p.get("tags", [])
+        if not isinstance(tags, list):
+            tags = [tags] if tags else []
+
+        return {
+            "id": str(p.get("id", "")),
+            "brand": str(p.get("brand") or ""),
+            "product_name": str(p.get("product_name") or "Unknown"),
+            "category": str(p.get("category") or "other"),
+            "shade": str(p.get("shade") or ""),
+            "price": float(p.get("price") or 0.0),
+            "average_rating": float(p.get("average_rating") or 0.0),
+            "total_reviews": int(p.get("total_reviews") or 0),
+            "in_stock": bool(p.get("in_stock", True)),
+            "tags": [str(t) for t in tags if t],
+            "ingredients": [str(i) for i in ingredients if i],
+            "image_url": str(p.get("image_url") or ""),
+            "product_url": str(p.get("product_url") or ""),
+        }
+
+    async def _upload_batch(self, documents: List[Dict[str, Any]]) -> Dict[str, bool]:
+        """
+        merge_or_upload one batch (blocking SDK call runs off the event loop).
+        Returns {key: retryable} for the documents that failed.
+        """
+        result = await asyncio.to_thread(self.search_client.merge_or_upload_documents, documents=documents)
+
+        failed = {}
+        for r in result:
+            if not r.succeeded:
+                failed[r.key] = r.status_code in _RETRYABLE_STATUS or (r.status_code or 500) >= 500
+                logger.error(f"   Failed: {r.key} - {r.status_code} {r.error_message}")
+        return failed
+
+    def enqueue_products(self, products: List[Dict[str, Any]]) -> int:
+        """Queue products for batched background indexing (returns immediately)"""
+        return self.indexer.enqueue([self._clean_document(p) for p in products])
+
     async def upload_products(self, products: list[dict]):
         """
-        Upload or merge product data into Azure Search.
-        Properly handles Collection fields (ingredients, tags).
+        Upload or merge product data into Azure Search right away.
+        Request handlers should prefer enqueue_products.
         """
         try:
-            clean_products = []
-            
-            for p in products:
-                # Ensure ingredients and tags are lists
-                ingredients = p.get("ingredients", [])
-                if not isinstance(ingredients, list):
-                    ingredients = [ingredients] if ingredients else []
-                
-                tags = p.get("tags", [])
-                if not isinstance(tags, list):
-                    tags = [tags] if tags else []
-                
-                # Clean the product document
-                clean_doc = {
-                    "id": str(p.get("id", "")),
-                    "brand": str(p.get("brand") or ""),
-                    "product_name": str(p.get("product_name") or "Unknown"),
-                    "category": str(p.get("category") or "other"),
-                    "shade": str(p.get("shade") or ""),
-                    "price": float(p.get("price") or 0.0),
-                    "average_rating": float(p.get("average_rating") or 0.0),
-                    "total_reviews": int(p.get("total_reviews") or 0),
-                    "in_stock": bool(p.get("in_stock", True)),
-                    # Ensure collections are lists of strings
-                    "tags": [str(t) for t in tags if t],
-                    "ingredients": [str(i) for i in ingredients if i],
-                    "image_url": str(p.get("image_url") or ""),
-                    "product_url": str(p.get("product_url") or ""),
-                }
-                
-                clean_products.append(clean_doc)
-                logger.info(f"📦 Prepared document for indexing: {clean_doc['product_name']}")
-                logger.info(f"   - Tags: {len(clean_doc['tags'])} items")
-                logger.info(f"   - Ingredients: {len(clean_doc['ingredients'])} items")
-
-            # Upload to Azure Search
-            result = self.search_client.upload_documents(documents=clean_products)
-            
-            # Check results
-            success_count = sum(1 for r in result if r.succeeded)
-            failed_count = len(result) - success_count
-            
-            logger.info(f"✅ Uploaded {success_count} products to Azure Search")
-            
-            if failed_count > 0:
-                logger.warning(f"⚠️ {failed_count} products failed to upload")
-                for r in result:
-                    if not r.succeeded:
-                        logger.error(f"   Failed: {r.key} - {r.error_message}")
+            clean_products = [self._clean_document(p) for p in products]
+            failed = await self._upload_batch(clean_products)
+            logger.info(f"✅ Uploaded {len(clean_products) - len(failed)} products to Azure Search")
+            if failed:
+                logger.warning(f"⚠️ {len(failed)} products failed to upload")
 
         except Exception as e:
             logger.error(f"❌ Failed to upload products to Azure Search: {e}")
             logger.error(f"   Products attempted: {len(products)}")
-            if products:
-                logger.error(f"   First product sample: {products[0]}")
             raise
 
     # ======================================================
@@ -147,27 +159,35 @@ class SearchService:
         enrich_results: bool = True
     ) -> List[Dict[str, Any]]:
         """
-        Hybrid search with filters and optional AI enrichment
+        Hybrid search with filters and optional AI enrichment.
+        Served from the in-process catalog index; Azure Search is the fallback.
         """
         try:
-            filters = ["in_stock eq true"]
-            
-            if category:
-                filters.append(f"category eq '{category}'")
-            
-            if max_price:
-                filters.append(f"price le {max_price}")
-
-            filter_expr = " and ".join(filters) if filters else None
-
-            results = self.search_client.search(
-                search_text=query or "*",
-                filter=filter_expr,
+            products = self._local_search(
+                query=query,
+                category=category,
+                max_price=max_price or None,
+                order_by=ORDER_RATING,
                 top=top,
-                order_by=["average_rating desc", "total_reviews desc"]
             )
 
-            products = [dict(r) for r in results]
+            if products is None:
+                filters = ["in_stock eq true"]
+
+                if category:
+                    filters.append(f"category eq '{category}'")
+
+                if max_price:
+                    filters.append(f"price le {max_price}")
+
+                filter_expr = " and ".join(filters) if filters else None
+
+                products = await self._azure_search(
+                    search_text=query or "*",
+                    filter=filter_expr,
+                    top=top,
+                    order_by=["average_rating desc", "total_reviews desc"]
+                )
 
             # Optional AI safety enrichment
             if enrich_results and user_profile:
@@ -182,6 +202,27 @@ class SearchService:
             logger.error(f"❌ Product search error: {str(e)}")
             return []
 
+    def _local_search(self, **kwargs) -> Optional[List[Dict[str, Any]]]:
+        """Catalog index hits, or None when the caller should fall back to Azure"""
+        if not catalog_search.available:
+            metrics.incr("product_search_total", backend="azure")
+            return None
+        try:
+            results = catalog_search.search(**kwargs)
+        except Exception as e:
+            logger.warning(f"⚠️ Local catalog search failed, using Azure: {e}")
+            metrics.incr("product_search_total", backend="azure")
+            return None
+        metrics.incr("product_search_total", backend="local")
+        return results
+
+    async def _azure_search(self, **kwargs) -> List[Dict[str, Any]]:
+        """Azure Search query off the event loop (the SDK client is blocking)"""
+        def run() -> List[Dict[str, Any]]:
+            return [dict(r) for r in self.search_client.search(**kwargs)]
+
+        return await asyncio.to_thread(run)
+
     # ======================================================
     # 🧴 AI Safety Enrichment
     # ======================================================
@@ -192,25 +233,27 @@ class SearchService:
         avoid_concerns: Optional[List[str]] = None,
         avoid_allergens: Optional[List[str]] = None
     ) -> List[Dict[str, Any]]:
-        """Check each product using AI for safety."""
-        tasks = []
-
-        for product in products:
-            ingredients = product.get("ingredients", [])
-            product_name = product.get("product_name", "Unknown Product")
-
-            tasks.append(
-                llm_service.check_product_safety(
-                    product_name=product_name,
-                    product_ingredients=ingredients,
-                    user_profile=user_profile
-                )
-            )
+        """Check all hits for safety in batched LLM calls."""
+        batch = [
+            {
+                "id": product.get("id") or str(i),
+                "product_name": product.get("product_name", "Unknown Product"),
+                "ingredients": product.get("ingredients", []),
+            }
+            for i, product in enumerate(products)
+        ]
 
-        safety_results = await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            # Enrichment yields to interactive OpenAI calls
+            with priority(Priority.BACKGROUND):
+                verdicts = await llm_service.check_products_safety_batch(batch, user_profile)
+        except Exception as e:
+            logger.warning(f"⚠️ Safety enrichment failed: {str(e)}")
+            verdicts = {}
 
-        for i, result in enumerate(safety_results):
-            if isinstance(result, Exception):
+        for i, item in enumerate(batch):
+            result = verdicts.get(str(item["id"]))
+            if result is None:
                 logger.warning(f"⚠️ Safety enrichment failed for {products[i].get('product_name')}")
                 products[i]["is_safe_for_user"] = True
                 products[i]["safety_score"] = 0.8
@@ -235,15 +278,35 @@ class SearchService:
         self,
         category: str,
         user_profile: Dict[str, Any],
-        max_price: Optional[float] = None
+        max_price: Optional[float] = None,
+        product: Optional[Dict[str, Any]] = None,
+        mode: str = MODE_BLEND,
+        top: int = 5
     ) -> List[Dict[str, Any]]:
-        """Find budget-friendly substitutes"""
+        """
+        Cheaper products with the closest formula / shade to `product`, from
+        the catalog similarity index. Without the index (or a source product)
+        this falls back to a budget-friendly text search.
+        """
+        if product is not None and catalog_search.available:
+            try:
+                substitutes = catalog_search.substitutes(
+                    {**product, "category": category}, top=top, mode=mode, max_price=max_price
+                )
+                metrics.incr("product_substitutes_total", backend="similarity")
+                if substitutes and user_profile:
+                    return await self._enrich_with_safety(substitutes, user_profile)
+                return substitutes
+            except Exception as e:
+                logger.warning(f"⚠️ Similarity substitutes failed, using search: {e}")
+
+        metrics.incr("product_substitutes_total", backend="search")
         return await self.search_products(
             category=category,
             user_profile=user_profile,
             max_price=max_price,
             query="budget-friendly",
-            top=5
+            top=top
         )
 
     # ======================================================
@@ -254,29 +317,35 @@ class SearchService:
         category: Optional[str] = None,
         top: int = 10
     ) -> List[Dict[str, Any]]:
-        """Get trending/popular products"""
+        """Get trending/popular products (served from the materialized feed)"""
         try:
-            filter_expr = "in_stock eq true"
-            if category:
-                filter_expr += f" and category eq '{category}'"
-
-            results = self.search_client.search(
-                search_text="*",
-                filter=filter_expr,
-                select=[
-                    "id", "brand", "product_name", "category", "price",
-                    "image_url", "average_rating", "total_reviews"
-                ],
-                top=top,
-                order_by=["total_reviews desc", "average_rating desc"]
-            )
-
-            return [dict(r) for r in results]
-
+            return await self.trending.get(category, top)
         except Exception as e:
             logger.error(f"🔥 Trending products error: {str(e)}")
             return []
 
+    async def _query_trending(self, category: Optional[str], top: int) -> List[Dict[str, Any]]:
+        """Most-reviewed products of a category; what the trending feed materializes"""
+        fields = [
+            "id", "brand", "product_name", "category", "price",
+            "image_url", "average_rating", "total_reviews"
+        ]
+        products = self._local_search(category=category, order_by=ORDER_POPULARITY, top=top)
+        if products is not None:
+            return [{field: p.get(field) for field in fields} for p in products]
+
+        filter_expr = "in_stock eq true"
+        if category:
+            filter_expr += f" and category eq '{category}'"
+
+        return await self._azure_search(
+            search_text="*",
+            filter=filter_expr,
+            select=fields,
+            top=top,
+            order_by=["total_reviews desc", "average_rating desc"]
+        )
+
 
 # Singleton Instance
 search_service = SearchService()
\ No newline at end of file
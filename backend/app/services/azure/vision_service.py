@@ -276,48 +276,35 @@ Comprehensive skin analysis for virtual makeup application
 """
 
 from loguru import logger
-from azure.ai.vision.imageanalysis import ImageAnalysisClient
+from azure.ai.vision.imageanalysis.aio import ImageAnalysisClient
 from azure.ai.vision.imageanalysis.models import VisualFeatures
 from azure.core.credentials import AzureKeyCredential
 from openai import AsyncAzureOpenAI
+from app.services.azure.openai_governor import estimate_request_tokens, openai_governor
+from app.services.azure.llm_service import llm_service
+from app.services.llm.prompts import FACE_ANALYSIS, face_analysis_request
+from app.services.llm.structured import response_format_for
+from app.schemas.user import FaceAnalysis
+from app.services.llm.tokens import token_ledger
 from app.core.config import settings
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Awaitable, AsyncIterator
 from PIL import Image
 import io
-import cv2
+import time
+import asyncio
 import numpy as np
-import base64
-import json
-import re
-from json import JSONDecodeError
-from dataclasses import dataclass
-from enum import Enum
-import imghdr
+from dataclasses import dataclass, asdict
+from app.core.metrics import metrics
+from app.services.vision.local_stages import (
+    DetectionOptions, aggregate_local_results, run_local_analysis
+)
+from app.services.vision.analysis_cache import analysis_cache
+from app.services.vision.hashing import content_hash
+from app.services.vision.payload import VisionPayload
+from app.services.vision.worker_pool import vision_pool
 
-
-class SkinToneCategory(str, Enum):
-    """Fitzpatrick Scale based skin tone categories"""
-    VERY_FAIR = "Very Fair"  # Type I
-    FAIR = "Fair"  # Type II
-    LIGHT = "Light"  # Type III
-    MEDIUM = "Medium"  # Type IV
-    TAN = "Tan"  # Type V
-    DEEP = "Deep"  # Type VI
-
-
-class UndertoneType(str, Enum):
-    WARM = "Warm"
-    COOL = "Cool"
-    NEUTRAL = "Neutral"
-    OLIVE = "Olive"
-
-
-class SkinType(str, Enum):
-    OILY = "Oily"
-    DRY = "Dry"
-    COMBINATION = "Combination"
-    NORMAL = "Normal"
-    SENSITIVE = "Sensitive"
+# Tag stored on profiles and cached results; bump whenever the pipeline changes
+ANALYSIS_VERSION = "v2.3_local_tier"
 
 
 @dataclass
@@ -344,136 +331,298 @@ class AdvancedVisionService:
     """Advanced skin analysis using multiple AI services"""
 
     def __init__(self):
-        # Azure Computer Vision Client
+        # Azure Computer Vision Client (async SDK, never blocks the loop)
         self.vision_client = ImageAnalysisClient(
             endpoint=settings.AZURE_VISION_ENDPOINT,
             credential=AzureKeyCredential(settings.AZURE_VISION_KEY)
         )
         
         # Azure OpenAI GPT-4 Vision Client
-        self.openai_client = self.openai_client = AsyncAzureOpenAI(
+        self.openai_client = AsyncAzureOpenAI(
             azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
             api_key=settings.AZURE_OPENAI_API_KEY,
-            api_version=settings.AZURE_OPENAI_API_VERSION
+            api_version=settings.AZURE_OPENAI_API_VERSION,
+            max_retries=0  # retries are owned by openai_governor
         )
         
-        # Face detection cascade
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
-        self.eye_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_eye.xml'
+        # Face detector settings shipped to the vision workers
+        self.detection_options = DetectionOptions(
+            backend=settings.VISION_FACE_DETECTOR,
+            detect_max_side=settings.VISION_DETECT_MAX_SIDE,
+            min_face_ratio=settings.VISION_MIN_FACE_RATIO,
+            detect_eyes=settings.VISION_DETECT_EYES,
+            dnn_prototxt=settings.VISION_DNN_PROTOTXT,
+            dnn_model=settings.VISION_DNN_MODEL,
+            dnn_confidence=settings.VISION_DNN_CONFIDENCE
         )
 
+    async def close(self):
+        """Release the async SDK transports on shutdown"""
+        await self.vision_client.close()
+        await self.openai_client.close()
+
     async def analyze_face_comprehensive(
         self, 
-        image_bytes: bytes
+        image_bytes: bytes,
+        user_id: Optional[int] = None
     ) -> SkinAnalysisResult:
         """
-        Comprehensive face and skin analysis combining multiple AI services
+        Comprehensive face and skin analysis combining multiple AI services.
+        Results are cached per `user_id` (no caching without one).
         """
         try:
             logger.info("Starting comprehensive skin analysis...")
             
-            # 1. Basic image processing and face detection
-            face_data = self._extract_face_features(image_bytes)
-            if not face_data:
-                raise ValueError("No face detected in image")
+            async for event, data in self.stream_face_analysis(image_bytes, user_id):
+                if event == "result":
+                    logger.info(f"✅ Skin analysis completed: {data.skin_tone}, {data.undertone}")
+                    return data
             
-            # 2. Azure Computer Vision analysis
-            azure_result = await self._azure_vision_analysis(image_bytes)
+            raise RuntimeError("Face analysis finished without a result")
             
-            # 3. GPT-4 Vision deep analysis
-            gpt4_result = await self._gpt4_vision_analysis(image_bytes)
-            
-            # 4. OpenCV-based texture and feature analysis
-            texture_analysis = self._analyze_skin_texture(image_bytes, face_data)
+        except Exception as e:
+            logger.error(f"❌ Comprehensive analysis error: {str(e)}")
+            raise
+
+    async def stream_face_analysis(
+        self,
+        image_bytes: bytes,
+        user_id: Optional[int] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Progressive face analysis. Yields (event, data) as each stage lands:
+        
+        - "local":  OpenCV tone / undertone / hex / texture (dict)
+        - "azure":  Azure Image Analysis tags and caption (dict)
+        - "gpt4":   GPT-4o dermatology fields (dict)
+        - "result": final merged SkinAnalysisResult (always last)
+        
+        Cache hits (same user only) yield "result" straight away.
+        """
+        use_cache = settings.ENABLE_VISION_CACHE and user_id is not None
+        
+        # 0. Exact re-upload: serve the cached result without any work
+        digest = content_hash(image_bytes)
+        if use_cache:
+            cached = await analysis_cache.get_exact(user_id, digest, ANALYSIS_VERSION)
+            if cached:
+                yield "result", SkinAnalysisResult(**cached)
+                return
+        
+        # 1. OpenCV face detection, texture and color analysis (worker pool)
+        local = await self._with_deadline(
+            "local", self._run_local_stages(image_bytes),
+            settings.VISION_LOCAL_TIMEOUT_SECONDS
+        )
+        if local is None:
+            raise TimeoutError("Local face analysis timed out")
+        face_data = local["face_data"]
+        if not face_data:
+            raise ValueError("No face detected in image")
+        texture_analysis = local["texture"]
+        color_analysis = local["color"]
+        local_tier = local.get("local_tier") or {}
+        face_hash = local.get("face_hash")
+        
+        # Near-duplicate selfie (re-encoded, resized...): reuse and alias the exact hash
+        if use_cache:
+            cached = await analysis_cache.get_similar(user_id, face_hash, ANALYSIS_VERSION)
+            if cached:
+                await analysis_cache.put(user_id, digest, face_hash, ANALYSIS_VERSION, cached)
+                yield "result", SkinAnalysisResult(**cached)
+                return
+        
+        yield "local", {
+            "skin_tone": color_analysis.get("skin_tone"),
+            "fitzpatrick_scale": color_analysis.get("fitzpatrick_scale"),
+            "undertone": color_analysis.get("undertone"),
+            "skin_tone_hex": color_analysis.get("hex_color"),
+            "texture_score": texture_analysis.get("texture_score"),
+            "pore_visibility": texture_analysis.get("pore_visibility"),
+            "face_bbox": face_data["face_bbox"],
+            "confidence": local_tier.get("confidence"),
+            "concerns": local_tier.get("concerns", [])
+        }
+        
+        # Local-first tier: only escalate to GPT-4o when the OpenCV estimate is ambiguous
+        escalate = self._should_escalate(local_tier)
+        
+        # 2 + 3. Azure Computer Vision and GPT-4 Vision fan out only on a
+        # cache miss (partial results allowed), streamed in completion order
+        branches = {
+            asyncio.create_task(self._with_deadline(
+                "azure", self._azure_vision_analysis(image_bytes),
+                settings.VISION_AZURE_TIMEOUT_SECONDS
+            )): "azure",
+        }
+        if escalate:
+            branches[asyncio.create_task(self._with_deadline(
+                "gpt4", self._gpt4_vision_analysis([local["payload"]]),
+                settings.VISION_GPT4_TIMEOUT_SECONDS
+            ))] = "gpt4"
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        try:
+            pending = set(branches)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    branch = branches[task]
+                    results[branch] = task.result()
+                    yield branch, results[branch] or {}
+        finally:
+            # Client went away or a branch failed: don't leave paid calls running
+            for task in branches:
+                task.cancel()
+        
+        # 4. Merge all results
+        final_result = self._merge_analysis_results(
+            face_data=face_data,
+            azure_result=results.get("azure"),
+            gpt4_result=results.get("gpt4"),
+            texture_analysis=texture_analysis,
+            color_analysis=color_analysis,
+            local_tier=local_tier,
+            gpt4_skipped=not escalate
+        )
+        
+        # Degraded (partial) results are not worth pinning in the cache
+        if use_cache and not final_result.raw_data.get("missing_branches"):
+            await analysis_cache.put(user_id, digest, face_hash, ANALYSIS_VERSION, asdict(final_result))
+        
+        yield "result", final_result
+
+    async def analyze_faces_batch(
+        self,
+        images: List[bytes]
+    ) -> SkinAnalysisResult:
+        """
+        Analyse several selfies of the same person (e.g. different lighting)
+        with one multi-image GPT-4o request and a single merged result
+        """
+        try:
+            logger.info(f"Starting batch skin analysis ({len(images)} images)...")
             
-            # 5. Color analysis for skin tone and undertone
-            color_analysis = self._analyze_skin_color(image_bytes, face_data)
+            # 1. Local stages for every image in parallel on the worker pool
+            local_results = await asyncio.gather(*[
+                self._with_deadline(
+                    "local", self._run_local_stages(image_bytes),
+                    settings.VISION_LOCAL_TIMEOUT_SECONDS
+                )
+                for image_bytes in images
+            ])
+            usable = [
+                (index, local) for index, local in enumerate(local_results)
+                if local is not None and local["face_data"]
+            ]
+            if not usable:
+                raise ValueError("No face detected in any of the images")
+            skipped = [index for index in range(len(images)) if index not in {i for i, _ in usable}]
+            if skipped:
+                logger.warning(f"⚠️ No face found in batch image(s) {skipped}, analysing the rest")
+            
+            primary_index, primary = usable[0]
+            texture_analysis, color_analysis = aggregate_local_results([local for _, local in usable])
+            
+            # 2 + 3. Azure on the first usable image, one GPT-4o call over all face crops
+            azure_task = asyncio.create_task(self._with_deadline(
+                "azure", self._azure_vision_analysis(images[primary_index]),
+                settings.VISION_AZURE_TIMEOUT_SECONDS
+            ))
+            gpt4_task = asyncio.create_task(self._with_deadline(
+                "gpt4", self._gpt4_vision_analysis([local["payload"] for _, local in usable]),
+                settings.VISION_GPT4_TIMEOUT_SECONDS
+            ))
+            try:
+                azure_result, gpt4_result = await asyncio.gather(azure_task, gpt4_task)
+            except BaseException:
+                azure_task.cancel()
+                gpt4_task.cancel()
+                raise
             
-            # 6. Merge all results
+            # 4. Merge all results
             final_result = self._merge_analysis_results(
-                face_data=face_data,
+                face_data=primary["face_data"],
                 azure_result=azure_result,
                 gpt4_result=gpt4_result,
                 texture_analysis=texture_analysis,
                 color_analysis=color_analysis
             )
+            final_result.raw_data["batch"] = {
+                "images": len(images),
+                "analysed": [index for index, _ in usable],
+                "skipped": skipped
+            }
+            metrics.incr("vision_batch_images_total", len(images))
             
-            logger.info(f"✅ Skin analysis completed: {final_result.skin_tone}, {final_result.undertone}")
+            logger.info(
+                f"✅ Batch skin analysis completed ({len(usable)}/{len(images)} images): "
+                f"{final_result.skin_tone}, {final_result.undertone}"
+            )
             
             return final_result
             
         except Exception as e:
-            logger.error(f"❌ Comprehensive analysis error: {str(e)}")
+            logger.error(f"❌ Batch analysis error: {str(e)}")
             raise
 
-    def _extract_face_features(self, image_bytes: bytes) -> Optional[Dict[str, Any]]:
-        """Extract detailed face features using OpenCV"""
+    def _should_escalate(self, local_tier: Dict[str, Any]) -> bool:
+        """Decide whether GPT-4o is needed and track the escalation rate"""
+        confidence = local_tier.get("confidence", 0.0)
+        escalate = (
+            not settings.ENABLE_LOCAL_FIRST_TIER
+            or confidence < settings.VISION_LOCAL_CONFIDENCE_THRESHOLD
+        )
+        
+        metrics.incr("vision_tier_total", tier="gpt4" if escalate else "local")
+        escalated = metrics.counter_value("vision_tier_total", tier="gpt4")
+        total = escalated + metrics.counter_value("vision_tier_total", tier="local")
+        metrics.set_gauge("vision_escalation_rate", escalated / total if total else 0.0)
+        
+        logger.info(
+            f"🎚️ Local confidence {confidence:.2f} -> "
+            f"{'escalating to GPT-4o' if escalate else 'local tier only'}"
+        )
+        return escalate
+
+    async def _with_deadline(
+        self,
+        branch: str,
+        coro: Awaitable[Any],
+        timeout: float
+    ) -> Optional[Any]:
+        """Await one fan-out branch; returns None when it fails or its deadline passes"""
+        start = time.perf_counter()
         try:
-            # Convert bytes to numpy array
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if img is None:
-                raise ValueError("Failed to decode image")
-            
-            # Convert to RGB
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            
-            # Detect faces
-            faces = self.face_cascade.detectMultiScale(gray, 1.1, 4)
-            
-            if len(faces) == 0:
-                logger.warning("No face detected")
-                return None
-            
-            # Get largest face
-            x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
-            face_region = img_rgb[y:y+h, x:x+w]
-            
-            # Detect eyes
-            face_gray = gray[y:y+h, x:x+w]
-            eyes = self.eye_cascade.detectMultiScale(face_gray)
-            
-            # Extract different face regions for analysis
-            regions = self._extract_face_regions(face_region, w, h)
-            
-            return {
-                "face_bbox": {"x": int(x), "y": int(y), "width": int(w), "height": int(h)},
-                "face_region": face_region,
-                "regions": regions,
-                "eyes_detected": len(eyes),
-                "image_size": img.shape,
-                "gray_face": face_gray
-            }
-            
-        except Exception as e:
-            logger.error(f"Face feature extraction error: {str(e)}")
+            result = await asyncio.wait_for(coro, timeout=timeout)
+            metrics.incr("vision_branch_total", branch=branch, outcome="ok" if result is not None else "error")
+            return result
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ {branch} branch exceeded {timeout}s deadline, continuing without it")
+            metrics.incr("vision_branch_total", branch=branch, outcome="timeout")
             return None
+        finally:
+            metrics.observe("vision_branch_ms", (time.perf_counter() - start) * 1000, branch=branch)
+
+    async def _run_local_stages(self, image_bytes: bytes) -> Dict[str, Any]:
+        """Run the CPU-bound OpenCV stages on the vision worker pool"""
+        local = await vision_pool.run(
+            "local_analysis",
+            run_local_analysis,
+            image_bytes,
+            settings.VISION_WORKING_MAX_SIDE,
+            settings.VISION_DETAIL_POLICY,
+            settings.VISION_FACE_CROP_MARGIN,
+            settings.VISION_HIGH_DETAIL_MAX_TILES,
+            self.detection_options
+        )
+        for stage, elapsed_ms in local.get("timings", {}).items():
+            metrics.observe("vision_stage_ms", elapsed_ms, stage=stage)
+        return local
 
-    def _extract_face_regions(
-        self, 
-        face_region: np.ndarray, 
-        w: int, 
-        h: int
-    ) -> Dict[str, np.ndarray]:
-        """Extract specific face regions for detailed analysis"""
-        return {
-            "forehead": face_region[0:h//3, w//4:3*w//4],
-            "left_cheek": face_region[h//3:2*h//3, 0:w//3],
-            "right_cheek": face_region[h//3:2*h//3, 2*w//3:w],
-            "nose": face_region[h//3:2*h//3, w//3:2*w//3],
-            "chin": face_region[2*h//3:h, w//4:3*w//4],
-            "full_face": face_region
-        }
-
-    async def _azure_vision_analysis(self, image_bytes: bytes) -> Dict[str, Any]:
-        """Azure Computer Vision analysis"""
+    async def _azure_vision_analysis(self, image_bytes: bytes) -> Optional[Dict[str, Any]]:
+        """Azure Computer Vision analysis (None on failure)"""
         try:
-            result = self.vision_client.analyze(
+            result = await self.vision_client.analyze(
                 image_data=image_bytes,
                 visual_features=[
                     VisualFeatures.PEOPLE,
@@ -485,143 +634,106 @@ class AdvancedVisionService:
             
             return {
                 # "caption": result.caption.text if result.caption else None,
-                # "tags": [tag.name for tag in result.tags.list] if result.tags else [],
+                "tags": [tag.name for tag in result.tags.list] if result.tags else [],
                 "confidence": result.caption.confidence if result.caption else 0.0,
                 # "people_detected": len(result.people.list) if result.people else 0
             }
             
         except Exception as e:
             logger.warning(f"Azure Vision analysis error: {str(e)}")
-            return {}
+            return None
 
     
 
-    async def _gpt4_vision_analysis(self, image_bytes: bytes) -> dict:
-        """Robust GPT-4o Vision dermatological analysis with safe JSON parsing and Azure compatibility."""
+    def _record_vision_usage(self, response: Any, payloads: List[VisionPayload]):
+        """Log and meter the tokens a GPT-4o vision call actually billed"""
+        usage = getattr(response, "usage", None)
+        if not usage:
+            return
+        detail = "high" if any(p.detail == "high" for p in payloads) else "low"
+        cached = token_ledger.record(usage, "gpt4_vision")
+        logger.info(
+            f"🧮 GPT-4o usage ({len(payloads)} image(s), {detail}): prompt={usage.prompt_tokens} "
+            f"(cached {cached}), completion={usage.completion_tokens}, "
+            f"image_estimate={sum(p.estimated_tokens for p in payloads)}"
+        )
+        metrics.incr("gpt4_vision_prompt_tokens", usage.prompt_tokens, detail=detail)
+        metrics.incr("gpt4_vision_completion_tokens", usage.completion_tokens, detail=detail)
+        metrics.incr("gpt4_vision_requests_total", detail=detail)
+
+    async def _gpt4_vision_analysis(self, payloads: List[VisionPayload]) -> Optional[dict]:
+        """
+        Robust GPT-4o Vision dermatological analysis with safe JSON parsing and Azure compatibility.
+        `payloads` are face crops sized to their detail level's tile budget; several
+        photos of the same person are analysed together in one request.
+        Returns None on failure so the merge falls back to the OpenCV values and
+        the result is marked partial (never cached).
+        """
         try:
-            # 🧩 Validate image format
-            mime = imghdr.what(None, image_bytes)
-            if mime not in ["jpeg", "png"]:
-                raise ValueError(f"Unsupported image format: {mime}")
-            if len(image_bytes) > 10 * 1024 * 1024:
-                raise ValueError("Image exceeds 10MB limit.")
-            logger.info(f"🖼️ Valid image input: {mime}, {len(image_bytes)} bytes")
+            for payload in payloads:
+                logger.info(
+                    f"🖼️ GPT-4o payload: {payload.width}x{payload.height} jpeg, {len(payload.jpeg)} bytes, "
+                    f"detail={payload.detail}, ~{payload.estimated_tokens} image tokens"
+                )
 
-            # Convert to base64 for GPT-4o Vision input
-            base64_image = base64.b64encode(image_bytes).decode("utf-8")
+            # Same compact image parts for the primary request and the retry
+            image_parts = [
+                {"type": "image_url", "image_url": {
+                    "url": payload.data_url(),
+                    "detail": payload.detail
+                }}
+                for payload in payloads
+            ]
 
             # ================== PROMPTS ==================
-            system_prompt = (
-                "You are an expert dermatologist and professional makeup artist. "
-                "Analyze facial skin features precisely for cosmetic and skincare recommendations. "
-                "Return only valid JSON. Do not include markdown, code fences, or commentary."
-            )
-
-            user_prompt = (
-                "Analyze this face photo and return strictly a JSON object with these exact keys:\n"
-                "{"
-                "\"skin_tone\": \"Very Fair, Fair, Light, Medium, Tan, Deep\", "
-                "\"fitzpatrick_scale\": \"Type I, II, III, IV, V, VI\", "
-                "\"undertone\": \"Warm, Cool, Neutral, Olive\", "
-                "\"skin_type\": \"Oily, Dry, Combination, Normal, Sensitive\", "
-                "\"hydration_level\": \"Low, Normal, High\", "
-                "\"oil_level\": \"Low, Normal, High\", "
-                "\"pore_size\": \"Fine, Medium, Large\", "
-                "\"texture_quality\": \"Smooth, Slightly Uneven, Uneven, Very Uneven\", "
-                "\"face_shape\": \"Oval, Round, Square, Heart, Diamond, Oblong\", "
-                "\"concerns\": ["
-                "{\"type\": \"acne|dark_spots|hyperpigmentation|redness|fine_lines|wrinkles|dark_circles|uneven_texture|large_pores|dullness\", "
-                "\"severity\": \"mild|moderate|severe\", "
-                "\"locations\": [\"forehead\", \"cheeks\", \"nose\", \"chin\", \"around_eyes\"], "
-                "\"confidence\": 0.0-1.0}"
-                "], "
-                "\"facial_features\": {"
-                "\"eye_shape\": \"...\", \"lip_fullness\": \"...\", \"nose_shape\": \"...\", \"face_symmetry\": \"excellent|good|fair\"}, "
-                "\"makeup_recommendations\": [\"...\", \"...\", \"...\"], "
-                "\"confidence_overall\": 0.0-1.0"
-                "} "
-                "Respond only with valid JSON."
-            )
+            # Static system prefix (role + schema) is shared by every request so
+            # Azure can serve it from the prompt cache; only the images vary
+            messages = [
+                {"role": "system", "content": FACE_ANALYSIS.system},
+                {
+                    "role": "user",
+                    "content": [
+                        {"type": "text", "text": face_analysis_request(len(payloads))},
+                        *image_parts,
+                    ],
+                },
+            ]
 
             # ================== PRIMARY GPT-4o REQUEST ==================
-            response = await self.openai_client.chat.completions.create(
+            # Image cost comes from the payload estimates, not the flat default
+            estimated_tokens = estimate_request_tokens(
+                [{"role": "user", "content": FACE_ANALYSIS.system}], 2000
+            ) + sum(p.estimated_tokens for p in payloads)
+            response = await openai_governor.chat(
+                self.openai_client,
+                estimated_tokens=estimated_tokens,
+                name="gpt4_vision",
                 model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": user_prompt},
-                            {"type": "image_url", "image_url": {
-                                "url": f"data:image/{mime};base64,{base64_image}",
-                                "detail": "high"
-                            }},
-                        ],
-                    },
-                ],
+                messages=messages,
                 max_tokens=2000,
                 temperature=0.3,
-                response_format={"type": "json_object"},
+                response_format=response_format_for(FaceAnalysis),
             )
+            self._record_vision_usage(response, payloads)
 
             # ================== RAW CONTENT EXTRACTION ==================
-            content = getattr(response.choices[0].message, "content", None)
+            message = response.choices[0].message
+            content = getattr(message, "content", None)
             if not content:
-                content = getattr(response, "output_text", None)
-            if not content and hasattr(response, "to_json"):
-                try:
-                    raw_json = response.to_json()
-                    content = raw_json.get("choices", [{}])[0].get("message", {}).get("content", "")
-                except Exception:
-                    pass
-
-            # ================== RETRY IF EMPTY ==================
-            if not content:
-                logger.warning("⚠️ Empty GPT-4o Vision response. Retrying without response_format...")
-                retry = await self.openai_client.chat.completions.create(
-                    model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {
-                            "role": "user",
-                            "content": [
-                                {"type": "text", "text": user_prompt},
-                                {"type": "image_url", "image_url": {
-                                    "url": f"data:image/{mime};base64,{base64_image}",
-                                    "detail": "high"
-                                }},
-                            ],
-                        },
-                    ],
-                    max_tokens=2000,
-                    temperature=0.3,
-                )
-                content = retry.choices[0].message.content or getattr(retry, "output_text", "")
-
-            if not content:
-                raise ValueError("GPT-4o Vision returned no content after retry.")
-
-            # ================== JSON CLEANUP & PARSING ==================
-            content = re.sub(r"^```json|```$", "", content.strip(), flags=re.MULTILINE).strip()
+                # Refusals / filtered output: resending the images would not help
+                refusal = getattr(message, "refusal", None)
+                raise ValueError(f"GPT-4o Vision returned no content{f' ({refusal})' if refusal else ''}")
 
+            # ================== JSON PARSING (tolerant, text-only repair) ==================
             try:
-                analysis = json.loads(content)
-            except JSONDecodeError as je:
-                logger.warning(f"⚠️ Invalid JSON structure returned: {je} | Raw: {content[:200]}")
-                match = re.search(r"\{.*\}", content, re.DOTALL)
-                if match:
-                    try:
-                        analysis = json.loads(match.group(0))
-                    except Exception:
-                        analysis = {}
-                else:
-                    analysis = {}
+                analysis = await llm_service.parse_structured("gpt4_vision", content, FaceAnalysis)
+            except ValueError as ve:
+                logger.warning(f"⚠️ Invalid JSON structure returned: {ve} | Raw: {content[:200]}")
+                return None
 
             # ================== SAFE DEFAULTS ==================
+            # No tone defaults: the merge falls back to the measured OpenCV values
             defaults = {
-                "skin_tone": "Medium",
-                "fitzpatrick_scale": "Type IV",
-                "undertone": "Neutral",
                 "skin_type": "Normal",
                 "hydration_level": "Normal",
                 "oil_level": "Normal",
@@ -641,187 +753,53 @@ class AdvancedVisionService:
 
         except Exception as e:
             logger.error(f"❌ GPT-4o Vision analysis error: {str(e)}")
-            # Guaranteed safe fallback
-            return {
-                "skin_tone": "Medium",
-                "fitzpatrick_scale": "Type IV",
-                "undertone": "Neutral",
-                "skin_type": "Normal",
-                "hydration_level": "Normal",
-                "oil_level": "Normal",
-                "pore_size": "Medium",
-                "texture_quality": "Slightly Uneven",
-                "face_shape": "Oval",
-                "concerns": [],
-                "facial_features": {},
-                "makeup_recommendations": [],
-                "confidence_overall": 0.4,
-            }
-
-
-    def _analyze_skin_texture(
-        self, 
-        image_bytes: bytes, 
-        face_data: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Analyze skin texture using image processing"""
-        try:
-            regions = face_data.get("regions", {})
-            
-            # Analyze cheek region for texture
-            cheek_region = regions.get("right_cheek")
-            if cheek_region is None or cheek_region.size == 0:
-                return {"texture_score": 0.5, "pore_visibility": "medium"}
-            
-            gray_cheek = cv2.cvtColor(cheek_region, cv2.COLOR_RGB2GRAY)
-            
-            # Calculate texture metrics
-            # 1. Standard deviation (higher = more texture/roughness)
-            texture_std = np.std(gray_cheek)
-            
-            # 2. Laplacian variance (higher = more edges/texture)
-            laplacian = cv2.Laplacian(gray_cheek, cv2.CV_64F)
-            texture_variance = laplacian.var()
-            
-            # 3. Normalize texture score (0-1, higher is smoother)
-            texture_score = 1.0 - min(texture_std / 50.0, 1.0)
-            
-            # Determine pore visibility
-            if texture_variance > 500:
-                pore_visibility = "large"
-            elif texture_variance > 200:
-                pore_visibility = "medium"
-            else:
-                pore_visibility = "fine"
-            
-            return {
-                "texture_score": float(texture_score),
-                "texture_std": float(texture_std),
-                "texture_variance": float(texture_variance),
-                "pore_visibility": pore_visibility
-            }
-            
-        except Exception as e:
-            logger.warning(f"Texture analysis error: {str(e)}")
-            return {"texture_score": 0.5, "pore_visibility": "medium"}
+            return None
 
-    def _analyze_skin_color(
-        self, 
-        image_bytes: bytes, 
-        face_data: Dict[str, Any]
-    ) -> Dict[str, Any]:
-        """Detailed color analysis for skin tone and undertone"""
-        try:
-            regions = face_data.get("regions", {})
-            
-            # Analyze multiple regions for accurate color
-            cheek_region = regions.get("right_cheek")
-            forehead_region = regions.get("forehead")
-            
-            if cheek_region is None or cheek_region.size == 0:
-                return {}
-            
-            # Get average colors in different color spaces
-            rgb_cheek = np.mean(cheek_region, axis=(0, 1))
-            
-            # Convert to different color spaces
-            cheek_hsv = cv2.cvtColor(
-                cheek_region, 
-                cv2.COLOR_RGB2HSV
-            )
-            hsv_values = np.mean(cheek_hsv, axis=(0, 1))
-            
-            cheek_lab = cv2.cvtColor(
-                cheek_region, 
-                cv2.COLOR_RGB2LAB
-            )
-            lab_values = np.mean(cheek_lab, axis=(0, 1))
-            
-            # Determine skin tone based on brightness
-            brightness = np.mean(rgb_cheek)
-            
-            if brightness > 220:
-                tone = SkinToneCategory.VERY_FAIR
-                fitzpatrick = "Type I"
-            elif brightness > 200:
-                tone = SkinToneCategory.FAIR
-                fitzpatrick = "Type II"
-            elif brightness > 170:
-                tone = SkinToneCategory.LIGHT
-                fitzpatrick = "Type III"
-            elif brightness > 140:
-                tone = SkinToneCategory.MEDIUM
-                fitzpatrick = "Type IV"
-            elif brightness > 110:
-                tone = SkinToneCategory.TAN
-                fitzpatrick = "Type V"
-            else:
-                tone = SkinToneCategory.DEEP
-                fitzpatrick = "Type VI"
-            
-            # Determine undertone using LAB color space
-            a_value = lab_values[1]  # Green-Red axis
-            b_value = lab_values[2]  # Blue-Yellow axis
-            
-            if b_value > 128 and a_value > 128:
-                undertone = UndertoneType.WARM
-            elif b_value < 128 and a_value < 128:
-                undertone = UndertoneType.COOL
-            elif abs(a_value - 128) < 10 and abs(b_value - 128) < 10:
-                undertone = UndertoneType.NEUTRAL
-            else:
-                undertone = UndertoneType.OLIVE
-            
-            # Convert RGB to hex
-            hex_color = "#{:02x}{:02x}{:02x}".format(
-                int(rgb_cheek[0]), 
-                int(rgb_cheek[1]), 
-                int(rgb_cheek[2])
-            )
-            
-            return {
-                "skin_tone": tone.value,
-                "fitzpatrick_scale": fitzpatrick,
-                "undertone": undertone.value,
-                "hex_color": hex_color,
-                "rgb_values": rgb_cheek.tolist(),
-                "hsv_values": hsv_values.tolist(),
-                "lab_values": lab_values.tolist(),
-                "brightness": float(brightness)
-            }
-            
-        except Exception as e:
-            logger.warning(f"Color analysis error: {str(e)}")
-            return {
-                "skin_tone": "Medium",
-                "undertone": "Neutral",
-                "hex_color": "#C8A882"
-            }
 
     def _merge_analysis_results(
         self,
         face_data: Dict[str, Any],
-        azure_result: Dict[str, Any],
-        gpt4_result: Dict[str, Any],
+        azure_result: Optional[Dict[str, Any]],
+        gpt4_result: Optional[Dict[str, Any]],
         texture_analysis: Dict[str, Any],
-        color_analysis: Dict[str, Any]
+        color_analysis: Dict[str, Any],
+        local_tier: Optional[Dict[str, Any]] = None,
+        gpt4_skipped: bool = False
     ) -> SkinAnalysisResult:
-        """Merge all analysis results with confidence weighting"""
+        """
+        Merge all analysis results with confidence weighting.
+        A branch that failed or missed its deadline arrives as None, is
+        listed in `missing_branches` and is merged as an empty result, so
+        the OpenCV values are used on their own.
+        `gpt4_skipped` marks a confident local-tier result (GPT-4o not called).
+        """
+        local_tier = local_tier or {}
+        missing_branches = [
+            name for name, branch in (("azure", azure_result), ("gpt4", gpt4_result))
+            if branch is None and not (name == "gpt4" and gpt4_skipped)
+        ]
+        azure_result = azure_result or {}
+        gpt4_result = gpt4_result or {}
         
         # Prioritize GPT-4 results (highest confidence) with OpenCV fallbacks
         skin_tone = gpt4_result.get("skin_tone") or color_analysis.get("skin_tone", "Medium")
         undertone = gpt4_result.get("undertone") or color_analysis.get("undertone", "Neutral")
         skin_type = gpt4_result.get("skin_type", "Normal")
         
-        # Merge concerns from GPT-4
-        concerns = gpt4_result.get("concerns", [])
+        # Merge concerns from GPT-4 (local detectors when it was not consulted)
+        concerns = gpt4_result.get("concerns", []) if not gpt4_skipped else local_tier.get("concerns", [])
+        
+        if gpt4_skipped:
+            overall = local_tier.get("confidence", 0.6)
+        else:
+            overall = gpt4_result.get("confidence_overall", 0.85 if "gpt4" not in missing_branches else 0.6)
         
         # Build confidence scores
         confidence_scores = {
-            "overall": gpt4_result.get("confidence_overall", 0.85),
+            "overall": overall,
             "skin_tone": 0.9 if color_analysis else 0.7,
             "undertone": 0.85 if color_analysis else 0.7,
-            "skin_type": gpt4_result.get("confidence_overall", 0.8),
+            "skin_type": gpt4_result.get("confidence_overall", 0.5 if gpt4_skipped else 0.8),
             "concerns": np.mean([c.get("confidence", 0.7) for c in concerns]) if concerns else 0.7
         }
         
@@ -852,7 +830,10 @@ class AdvancedVisionService:
                 "azure": azure_result,
                 "gpt4": gpt4_result,
                 "texture": texture_analysis,
-                "color": color_analysis
+                "color": color_analysis,
+                "local_tier": local_tier,
+                "tier": "local" if gpt4_skipped else "gpt4",
+                "missing_branches": missing_branches
             }
         )
 
@@ -0,0 +1,89 @@
+"""
+GlamAI - Incremental JSON Array Parser
+Pulls complete objects out of a top-level array while the completion is still streaming
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+
+class StreamingArrayParser:
+    """
+    Feed streamed text; get back each element of `root[key]` as soon as its
+    closing brace arrives.
+
+    Only a single character scan is kept (string / escape state and nesting
+    depth), so total work is linear in the completion length.
+    """
+
+    def __init__(self, key: str = "steps"):
+        self.key = key
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._array_depth: Optional[int] = None  # depth inside the target array
+        self._item_start: Optional[int] = None
+        self.items: List[Dict[str, Any]] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Append streamed text; returns items completed by this chunk"""
+        self.text += chunk
+        completed: List[Dict[str, Any]] = []
+        text = self.text
+
+        for pos in range(self._pos, len(text)):
+            ch = text[pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = text[self._string_start + 1:pos]
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif ch == ":" and self._depth == 1:
+                self._current_key = self._last_string
+            elif ch == "," and self._depth == 1:
+                self._current_key = None
+            elif ch in "{[":
+                if ch == "[" and self._depth == 1 and self._current_key == self.key:
+                    self._array_depth = self._depth + 1
+                elif ch == "{" and self._array_depth is not None and self._depth == self._array_depth:
+                    self._item_start = pos
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if ch == "}" and self._item_start is not None and self._depth == self._array_depth:
+                    item = self._parse(text[self._item_start:pos + 1])
+                    self._item_start = None
+                    if item is not None:
+                        self.items.append(item)
+                        completed.append(item)
+                elif ch == "]" and self._array_depth is not None and self._depth == self._array_depth - 1:
+                    self._array_depth = None
+
+        self._pos = len(text)
+        return completed
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Whole document once the stream has finished (None if it isn't valid JSON)"""
+        parsed = self._parse(self.text.strip())
+        return parsed if isinstance(parsed, dict) else None
+
+    @staticmethod
+    def _parse(fragment: str) -> Optional[Any]:
+        try:
+            return json.loads(fragment)
+        except json.JSONDecodeError:
+            return None
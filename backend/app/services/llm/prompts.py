@@ -0,0 +1,196 @@
+"""
+GlamAI - Prompt Templates
+Static prefix first, per-request data last, so Azure OpenAI prompt caching can reuse the prefix
+"""
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+
+def compact(value: Any) -> str:
+    """Minimal JSON for prompt data: no indentation or spaces after separators, empty fields dropped"""
+    return json.dumps(_prune(value), ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _prune(value: Any) -> Any:
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, (list, tuple)):
+        return [_prune(v) for v in value]
+    return value
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """
+    System message (role + rules + output schema) that is byte-identical for
+    every request, followed by one user message carrying only request data.
+
+    Provider prompt caching matches on the longest shared prefix, so nothing
+    request-specific may ever be formatted into `system`.
+    """
+    name: str
+    system: str
+
+    def messages(self, **data: Any) -> List[Dict[str, Any]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user_content(**data)},
+        ]
+
+    @staticmethod
+    def user_content(**data: Any) -> str:
+        """One `KEY: value` line per field; dicts and lists are compact JSON"""
+        lines = []
+        for key, value in data.items():
+            if value in (None, "", [], {}):
+                continue
+            text = value if isinstance(value, str) else compact(value)
+            lines.append(f"{key.upper()}: {text}")
+        return "\n".join(lines)
+
+
+# ============================================================
+# 💄 MAKEUP PLAN
+# ============================================================
+MAKEUP_PLAN = PromptTemplate(
+    name="makeup_plan",
+    system="""You are an expert makeup artist. Create detailed, step-by-step, safe makeup looks.
+
+The user message gives PROFILE, OUTFIT, ACCESSORIES (compact JSON), OCCASION and SCOPE.
+Generate a makeup plan that complements the outfit and occasion for that profile.
+Never recommend products or techniques that conflict with listed allergies or skin concerns.
+Fill "occasion" and "scope" with the given values.
+
+Return JSON:
+{
+  "occasion": "<OCCASION>",
+  "scope": "<SCOPE>",
+  "style": "style name",
+  "reasoning": "why this style suits the outfit",
+  "intensity": "subtle|moderate|bold",
+  "steps": [
+    {
+      "step_number": 1,
+      "category": "foundation|eyes|lips|cheeks|base",
+      "instruction": "step detail",
+      "tool_needed": "brush|blender|fingers",
+      "amount": "pea-size|thin layer",
+      "technique": "how to apply",
+      "expected_result": "description",
+      "tips": ["tip1", "tip2"]
+    }
+  ],
+  "key_focus": ["eyes", "base", "lips"],
+  "estimated_duration": 25,
+  "difficulty": "beginner|intermediate|advanced"
+}""",
+)
+
+
+# ============================================================
+# 💍 ACCESSORY RECOMMENDATION
+# ============================================================
+ACCESSORY_RECOMMENDATION = PromptTemplate(
+    name="accessory_recommendation",
+    system="""You are a professional stylist balancing jewelry with outfit.
+
+The user message gives OUTFIT and ACCESSORIES (compact JSON) and the OCCASION.
+Suggest which accessories to keep, modify, or remove.
+
+Return JSON:
+{
+  "keep_accessories": ["earrings", "bindi"],
+  "remove_accessories": ["necklace"],
+  "change_accessories": ["bangles"],
+  "reasoning": "explanation",
+  "makeup_style": "glam|ethnic|minimal",
+  "intensity": "subtle|moderate|bold"
+}""",
+)
+
+
+# ============================================================
+# 🧴 PRODUCT SAFETY
+# ============================================================
+_SAFETY_VERDICT = """{
+  "is_safe": true|false,
+  "safety_score": 0.0-1.0,
+  "warnings": ["warning1", "warning2"],
+  "allergens_found": ["allergen1"],
+  "concern_conflicts": ["conflict1"],
+  "severity": "low|moderate|high",
+  "recommendation": "safe_to_use|use_with_caution|avoid",
+  "confidence": 0.0-1.0
+}"""
+
+PRODUCT_SAFETY = PromptTemplate(
+    name="product_safety",
+    system=f"""You are an expert cosmetic dermatologist and ingredient analyst.
+Evaluate the product in the user message for skin safety based on the user's PROFILE
+(skin type, skin tone, allergies, skin concerns).
+
+Provide analysis in JSON:
+{_SAFETY_VERDICT}""",
+)
+
+PRODUCT_SAFETY_BATCH = PromptTemplate(
+    name="product_safety_batch",
+    system="""You are an expert cosmetic dermatologist and ingredient analyst.
+Evaluate EACH product listed under PRODUCTS (one per line, prefixed with its id)
+for skin safety based on the user's PROFILE.
+
+Return JSON with one entry per product, echoing its id:
+{
+  "results": [
+    """ + _SAFETY_VERDICT.replace("{\n", '{\n  "id": "<id>",\n', 1).replace("\n", "\n    ") + """
+  ]
+}""",
+)
+
+
+# ============================================================
+# 🖼️ FACE ANALYSIS (GPT-4o VISION)
+# ============================================================
+FACE_ANALYSIS = PromptTemplate(
+    name="face_analysis",
+    system=(
+        "You are an expert dermatologist and professional makeup artist. "
+        "Analyze facial skin features precisely for cosmetic and skincare recommendations. "
+        "Return only valid JSON. Do not include markdown, code fences, or commentary.\n"
+        "Analyze the face photo(s) and return strictly a JSON object with these exact keys:\n"
+        "{"
+        "\"skin_tone\": \"Very Fair, Fair, Light, Medium, Tan, Deep\", "
+        "\"fitzpatrick_scale\": \"Type I, II, III, IV, V, VI\", "
+        "\"undertone\": \"Warm, Cool, Neutral, Olive\", "
+        "\"skin_type\": \"Oily, Dry, Combination, Normal, Sensitive\", "
+        "\"hydration_level\": \"Low, Normal, High\", "
+        "\"oil_level\": \"Low, Normal, High\", "
+        "\"pore_size\": \"Fine, Medium, Large\", "
+        "\"texture_quality\": \"Smooth, Slightly Uneven, Uneven, Very Uneven\", "
+        "\"face_shape\": \"Oval, Round, Square, Heart, Diamond, Oblong\", "
+        "\"concerns\": ["
+        "{\"type\": \"acne|dark_spots|hyperpigmentation|redness|fine_lines|wrinkles|dark_circles|uneven_texture|large_pores|dullness\", "
+        "\"severity\": \"mild|moderate|severe\", "
+        "\"locations\": [\"forehead\", \"cheeks\", \"nose\", \"chin\", \"around_eyes\"], "
+        "\"confidence\": 0.0-1.0}"
+        "], "
+        "\"facial_features\": {"
+        "\"eye_shape\": \"...\", \"lip_fullness\": \"...\", \"nose_shape\": \"...\", \"face_symmetry\": \"excellent|good|fair\"}, "
+        "\"makeup_recommendations\": [\"...\", \"...\", \"...\"], "
+        "\"confidence_overall\": 0.0-1.0"
+        "}\n"
+        "When several photos of the same person are given, judge skin tone, undertone and "
+        "concerns across all of them, discounting lighting casts, and return ONE combined analysis. "
+        "Respond only with valid JSON."
+    ),
+)
+
+
+def face_analysis_request(photo_count: int) -> str:
+    """Variable text that precedes the images in the user message"""
+    if photo_count > 1:
+        return f"These {photo_count} photos show the same person under different lighting."
+    return "Analyze this face photo."
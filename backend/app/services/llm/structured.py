@@ -0,0 +1,133 @@
+"""
+GlamAI - Structured Outputs
+Strict JSON-schema response formats from Pydantic models, plus a tolerant
+parser for truncated or fenced responses
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from app.core.config import settings
+
+# Keywords strict mode rejects (or that only add noise to the schema)
+_UNSUPPORTED_KEYWORDS = {
+    "default", "title", "examples", "format", "minimum", "maximum",
+    "exclusiveMinimum", "exclusiveMaximum", "minLength", "maxLength",
+    "pattern", "minItems", "maxItems",
+}
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+
+
+def _strictify(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_strictify(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+    if "$ref" in node:
+        return {"$ref": node["$ref"]}  # strict mode allows no siblings next to $ref
+
+    node = {k: _strictify(v) for k, v in node.items() if k not in _UNSUPPORTED_KEYWORDS}
+    if node.get("type") == "object":
+        properties = node.get("properties", {})
+        node["properties"] = properties
+        node["required"] = list(properties)
+        node["additionalProperties"] = False
+    return node
+
+
+@lru_cache(maxsize=None)
+def strict_json_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """OpenAI strict-mode schema: every property required, no extra keys"""
+    return _strictify(model.model_json_schema())
+
+
+def response_format_for(model: Type[BaseModel]) -> Dict[str, Any]:
+    """json_schema response format for `model` (json_object when strict schemas are off)"""
+    if not settings.LLM_STRICT_SCHEMAS:
+        return {"type": "json_object"}
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "strict": True,
+            "schema": strict_json_schema(model),
+        },
+    }
+
+
+def parse_tolerant(text: Optional[str]) -> Tuple[Optional[Any], bool]:
+    """
+    (parsed JSON, whether it had to be salvaged). Handles code fences,
+    leading/trailing prose and documents cut off mid-way: a truncated
+    document is closed at the last complete member. (None, False) if nothing
+    usable is found.
+    """
+    if not text:
+        return None, False
+    text = _FENCE.sub("", text.strip())
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError:
+        pass
+
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        return None, False
+    try:
+        return json.JSONDecoder().raw_decode(text, start)[0], True
+    except json.JSONDecodeError:
+        pass
+
+    for candidate in _closed_prefixes(text[start:]):
+        try:
+            return json.loads(candidate), True
+        except json.JSONDecodeError:
+            continue
+    return None, False
+
+
+def _closed_prefixes(text: str, attempts: int = 24) -> List[str]:
+    """
+    Truncated `text` closed at its end and at each earlier comma (any depth),
+    newest first. One linear scan records the open brackets at every cut.
+    """
+    stack: List[str] = []
+    in_string = escape = False
+    cuts: List[Tuple[int, str]] = []
+    for pos, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+        elif ch == ",":
+            cuts.append((pos, "".join(reversed(stack))))
+
+    tail = text + ('"' if in_string else "")
+    candidates = [tail.rstrip().rstrip(",") + "".join(reversed(stack))]
+    candidates += [text[:pos] + closers for pos, closers in reversed(cuts[-attempts:])]
+    return candidates
+
+
+def validate(model: Type[BaseModel], data: Any) -> Optional[Dict[str, Any]]:
+    """`data` checked against `model` and dumped back to plain JSON types, or None"""
+    if not isinstance(data, dict):
+        return None
+    try:
+        return model.model_validate(data).model_dump(mode="json")
+    except ValidationError:
+        return None
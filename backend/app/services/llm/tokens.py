@@ -0,0 +1,195 @@
+"""
+GlamAI - Token Budgeting & Accounting
+Counts prompt tokens before sending, trims prompts to per-task budgets and
+tallies billed tokens per endpoint and per user
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from app.core.metrics import metrics
+
+try:  # exact counts; falls back to a 4-chars-per-token heuristic if not installed
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+MESSAGE_OVERHEAD_TOKENS = 4  # role + separators per chat message
+IMAGE_PART_TOKENS = 765  # one high-detail 512px tile set; vision calls estimate their own
+_TRUNCATED = " …[truncated]"
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and tiktoken is not None and not _encoding_failed:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:  # BPE file download can fail offline
+            _encoding_failed = True
+            logger.warning(f"⚠️ tiktoken unavailable, using estimated token counts: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def count_message_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Prompt size of a chat request (text parts counted, image parts estimated)"""
+    total = 3  # reply priming
+    for message in messages:
+        total += MESSAGE_OVERHEAD_TOKENS
+        content = message.get("content")
+        if isinstance(content, str):
+            total += count_tokens(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    total += count_tokens(part.get("text", ""))
+                else:
+                    total += IMAGE_PART_TOKENS
+    return total
+
+
+def trim_to_tokens(text: str, budget: int) -> str:
+    """Longest prefix of `text` within `budget` tokens, marked as truncated"""
+    if budget <= 0:
+        return ""
+    if count_tokens(text) <= budget:
+        return text
+    keep = max(0, budget - count_tokens(_TRUNCATED))
+    encoding = _get_encoding()
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:keep]) + _TRUNCATED
+    return text[:keep * 4] + _TRUNCATED
+
+
+def fit_messages(messages: List[Dict[str, Any]], budget: int, task: str = "") -> Tuple[List[Dict[str, Any]], int]:
+    """
+    (messages, prompt tokens) with the last user message trimmed so the
+    request fits `budget`. Templates put the static prefix first and request
+    data last, so the tail is the only part that is ever cut.
+    """
+    tokens = count_message_tokens(messages)
+    if tokens <= budget or not messages:
+        return messages, tokens
+
+    last = messages[-1]
+    if last.get("role") != "user" or not isinstance(last.get("content"), str):
+        logger.warning(f"⚠️ {task or 'LLM'} prompt is {tokens} tokens (budget {budget}) and cannot be trimmed")
+        return messages, tokens
+
+    overshoot = tokens - budget
+    content = last["content"]
+    trimmed = trim_to_tokens(content, max(0, count_tokens(content) - overshoot))
+    messages = [*messages[:-1], {**last, "content": trimmed}]
+    fitted = count_message_tokens(messages)
+    metrics.incr("llm_prompt_trimmed_total", task=task)
+    metrics.incr("llm_prompt_trimmed_tokens_total", tokens - fitted, task=task)
+    logger.info(f"✂️ {task or 'LLM'} prompt trimmed {tokens} → {fitted} tokens (budget {budget})")
+    return messages, fitted
+
+
+# ============================================================
+# 🧾 USAGE ACCOUNTING
+# ============================================================
+_ID_SEGMENT = re.compile(r"/(\d+|[0-9a-fA-F-]{32,36})(?=/|$)")
+
+
+def endpoint_label(method: str, path: str) -> str:
+    """`POST /api/v1/makeup/42/generate-plan` -> `POST /api/v1/makeup/{id}/generate-plan`"""
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path)}"
+
+
+@dataclass
+class UsageScope:
+    """Who an LLM call is billed to; mutable so auth can fill in the user later"""
+    endpoint: str = "background"
+    user_id: Optional[int] = None
+
+
+_scope: ContextVar[Optional[UsageScope]] = ContextVar("llm_usage_scope", default=None)
+
+
+@contextmanager
+def usage_scope(endpoint: str) -> Iterator[UsageScope]:
+    """Attribute LLM usage inside the block (and tasks it spawns) to `endpoint`"""
+    scope = UsageScope(endpoint=endpoint)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def set_usage_user(user_id: Optional[int]):
+    scope = _scope.get()
+    if scope is not None:
+        scope.user_id = user_id
+
+
+class TokenLedger:
+    """
+    Billed prompt / completion / cached-prompt tokens. Per-endpoint totals go to
+    the metrics registry; per-user totals are kept here, bounded to the most
+    recently active `max_users`, so user ids never become metric labels.
+    They are only served to their owner (`user_totals`); `snapshot()` is
+    published unauthenticated and carries no user ids.
+    """
+
+    def __init__(self, max_users: int = 10_000):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users: "OrderedDict[int, Dict[str, int]]" = OrderedDict()
+
+    def record(self, usage: Any, call: str) -> int:
+        """Record a response's usage block; returns its cached prompt tokens"""
+        if not usage:
+            return 0
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", 0) or 0) if details else 0
+
+        scope = _scope.get() or UsageScope()
+        for kind, value in (("prompt", prompt), ("completion", completion), ("cached", cached)):
+            metrics.incr("llm_tokens_total", value, kind=kind, call=call)
+            metrics.incr("llm_endpoint_tokens_total", value, kind=kind, endpoint=scope.endpoint)
+
+        if scope.user_id is not None:
+            with self._lock:
+                totals = self._users.pop(scope.user_id, None) or {"prompt": 0, "completion": 0, "cached": 0, "calls": 0}
+                totals["prompt"] += prompt
+                totals["completion"] += completion
+                totals["cached"] += cached
+                totals["calls"] += 1
+                self._users[scope.user_id] = totals
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+        return cached
+
+    def user_totals(self, user_id: int) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._users.get(user_id, {}))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Aggregate view for the public /metrics payload"""
+        with self._lock:
+            return {"tracked_users": len(self._users)}
+
+
+# Singleton instance
+token_ledger = TokenLedger()
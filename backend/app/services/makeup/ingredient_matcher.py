@@ -0,0 +1,452 @@
+"""
+GlamAI - Ingredient Matcher
+Deterministic allergen / skin-concern screening of ingredient lists.
+
+A curated dictionary (common names, synonyms and INCI names) is compiled
+once into an Aho-Corasick automaton, so an ingredient list is scanned in
+a single linear pass however many terms the dictionary holds. Only
+ingredients the dictionary cannot resolve need to go to the LLM.
+"""
+
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+# ============================================================
+# 📚 CURATED DICTIONARY
+# ============================================================
+@dataclass(frozen=True)
+class IngredientEntry:
+    name: str                              # canonical name used in warnings
+    synonyms: Tuple[str, ...] = ()         # common / INCI / trade names
+    allergens: Tuple[str, ...] = ()        # allergen groups this ingredient belongs to
+    concerns: Tuple[str, ...] = ()         # skin concerns it can aggravate
+
+
+INGREDIENT_DICTIONARY: Tuple[IngredientEntry, ...] = (
+    # Fragrance and the labelled fragrance allergens
+    IngredientEntry("fragrance", ("parfum", "perfume", "aroma", "fragrance oil"), ("fragrance",), ("sensitive", "rosacea", "eczema")),
+    IngredientEntry("linalool", (), ("fragrance",), ("sensitive",)),
+    IngredientEntry("limonene", ("d-limonene",), ("fragrance",), ("sensitive",)),
+    IngredientEntry("geraniol", (), ("fragrance",), ("sensitive",)),
+    IngredientEntry("citronellol", (), ("fragrance",), ("sensitive",)),
+    IngredientEntry("citral", (), ("fragrance",), ("sensitive",)),
+    IngredientEntry("eugenol", ("isoeugenol",), ("fragrance",), ("sensitive",)),
+    IngredientEntry("coumarin", (), ("fragrance",), ("sensitive",)),
+    IngredientEntry("cinnamal", ("cinnamyl alcohol", "amyl cinnamal", "hexyl cinnamal"), ("fragrance",), ("sensitive",)),
+    IngredientEntry("benzyl alcohol", (), ("fragrance",), ("sensitive",)),
+    IngredientEntry("benzyl benzoate", ("benzyl salicylate", "benzyl cinnamate"), ("fragrance",), ("sensitive",)),
+    IngredientEntry("farnesol", (), ("fragrance",), ("sensitive",)),
+    IngredientEntry("hydroxycitronellal", (), ("fragrance",), ("sensitive",)),
+    IngredientEntry("oakmoss", ("evernia prunastri extract", "treemoss", "evernia furfuracea extract"), ("fragrance",), ("sensitive",)),
+
+    # Essential oils
+    IngredientEntry("lavender oil", ("lavandula angustifolia oil", "lavandula angustifolia flower oil"), ("essential_oils", "fragrance"), ("sensitive", "rosacea")),
+    IngredientEntry("peppermint oil", ("mentha piperita oil", "mentha piperita leaf oil"), ("essential_oils",), ("sensitive", "rosacea")),
+    IngredientEntry("menthol", ("menthyl lactate",), (), ("sensitive", "rosacea")),
+    IngredientEntry("tea tree oil", ("melaleuca alternifolia leaf oil", "melaleuca alternifolia oil"), ("essential_oils",), ("sensitive",)),
+    IngredientEntry("eucalyptus oil", ("eucalyptus globulus leaf oil",), ("essential_oils",), ("sensitive",)),
+    IngredientEntry("citrus oil", (
+        "citrus aurantium dulcis peel oil", "citrus limon peel oil", "citrus aurantium bergamia fruit oil",
+        "bergamot oil", "lemon oil", "orange peel oil",
+    ), ("essential_oils", "fragrance"), ("sensitive", "rosacea")),
+
+    # Drying alcohols (fatty alcohols below are listed separately as benign)
+    IngredientEntry("alcohol denat", ("alcohol denat.", "denatured alcohol", "sd alcohol", "ethanol", "alcohol", "isopropyl alcohol"), ("drying_alcohol",), ("sensitive", "dry", "rosacea", "eczema")),
+
+    # Sulfates
+    IngredientEntry("sodium lauryl sulfate", ("sls",), ("sulfates",), ("sensitive", "dry", "eczema")),
+    IngredientEntry("sodium laureth sulfate", ("sles",), ("sulfates",), ("dry",)),
+    IngredientEntry("ammonium lauryl sulfate", ("ammonium laureth sulfate",), ("sulfates",), ("dry",)),
+
+    # Comedogenic oils, butters and esters
+    IngredientEntry("coconut oil", ("cocos nucifera oil", "cocos nucifera (coconut) oil"), (), ("acne", "oily")),
+    IngredientEntry("mineral oil", ("paraffinum liquidum", "liquid paraffin"), (), ("acne", "oily")),
+    IngredientEntry("petrolatum", ("petroleum jelly", "petroleum", "vaseline"), (), ("oily",)),
+    IngredientEntry("dimethicone", (), (), ("acne",)),
+    IngredientEntry("isopropyl myristate", (), (), ("acne",)),
+    IngredientEntry("isopropyl palmitate", (), (), ("acne",)),
+    IngredientEntry("isopropyl isostearate", (), (), ("acne",)),
+    IngredientEntry("myristyl myristate", (), (), ("acne",)),
+    IngredientEntry("lauric acid", (), (), ("acne",)),
+    IngredientEntry("algae extract", ("laminaria digitata extract", "carrageenan"), (), ("acne",)),
+    IngredientEntry("cocoa butter", ("theobroma cacao seed butter", "theobroma cacao (cocoa) seed butter"), (), ("acne", "oily")),
+    IngredientEntry("shea butter", ("butyrospermum parkii butter", "butyrospermum parkii (shea) butter", "shea butter extract"), ("tree_nuts",), ("oily",)),
+    IngredientEntry("wheat germ oil", ("triticum vulgare germ oil",), ("gluten",), ("acne",)),
+
+    # Preservatives
+    IngredientEntry("methylparaben", (), ("parabens",), ()),
+    IngredientEntry("ethylparaben", (), ("parabens",), ()),
+    IngredientEntry("propylparaben", (), ("parabens",), ()),
+    IngredientEntry("butylparaben", (), ("parabens",), ()),
+    IngredientEntry("isobutylparaben", (), ("parabens",), ()),
+    IngredientEntry("methylisothiazolinone", ("mit",), ("isothiazolinones",), ("sensitive", "eczema")),
+    IngredientEntry("methylchloroisothiazolinone", ("cmit", "kathon cg"), ("isothiazolinones",), ("sensitive", "eczema")),
+    IngredientEntry("dmdm hydantoin", (), ("formaldehyde",), ("sensitive",)),
+    IngredientEntry("imidazolidinyl urea", (), ("formaldehyde",), ("sensitive",)),
+    IngredientEntry("diazolidinyl urea", (), ("formaldehyde",), ("sensitive",)),
+    IngredientEntry("quaternium-15", (), ("formaldehyde",), ("sensitive",)),
+    IngredientEntry("formaldehyde", ("formalin",), ("formaldehyde",), ("sensitive",)),
+
+    # Other common allergens
+    IngredientEntry("lanolin", ("lanolin alcohol", "wool wax", "adeps lanae"), ("lanolin",), ()),
+    IngredientEntry("carmine", ("ci 75470", "cochineal", "carminic acid"), ("carmine",), ()),
+    IngredientEntry("propolis", ("propolis extract", "propolis cera"), ("bee_products",), ()),
+    IngredientEntry("almond oil", ("prunus amygdalus dulcis oil", "sweet almond oil"), ("tree_nuts",), ()),
+    IngredientEntry("argan oil", ("argania spinosa kernel oil",), ("tree_nuts",), ()),
+    IngredientEntry("macadamia oil", ("macadamia ternifolia seed oil", "macadamia integrifolia seed oil"), ("tree_nuts",), ()),
+    IngredientEntry("wheat protein", ("hydrolyzed wheat protein", "triticum vulgare protein"), ("gluten",), ()),
+    IngredientEntry("soybean oil", ("glycine soja oil",), ("soy",), ()),
+    IngredientEntry("soy protein", ("hydrolyzed soy protein", "glycine soja protein"), ("soy",), ()),
+    IngredientEntry("oxybenzone", ("benzophenone-3",), ("sunscreen_filters",), ("sensitive",)),
+    IngredientEntry("ppd", ("p-phenylenediamine", "paraphenylenediamine"), ("ppd",), ("sensitive",)),
+    IngredientEntry("nickel", (), ("nickel",), ()),
+
+    # Actives that irritate reactive skin
+    IngredientEntry("retinoids", ("retinol", "retinyl palmitate", "retinal", "retinaldehyde"), (), ("sensitive", "rosacea", "eczema")),
+    IngredientEntry("alpha hydroxy acids", ("glycolic acid", "lactic acid", "mandelic acid"), (), ("sensitive", "rosacea")),
+    IngredientEntry("salicylic acid", ("beta hydroxy acid",), (), ("dry",)),
+    IngredientEntry("witch hazel", ("hamamelis virginiana water", "hamamelis virginiana extract"), (), ("sensitive", "dry")),
+
+    # Common ingredients known to be benign for these checks
+    IngredientEntry("water", ("aqua", "eau", "aqua/water/eau", "purified water")),
+    IngredientEntry("glycerin", ("glycerine", "glycerol")),
+    IngredientEntry("fatty alcohol", ("cetyl alcohol", "cetearyl alcohol", "stearyl alcohol", "behenyl alcohol", "myristyl alcohol")),
+    IngredientEntry("niacinamide", ()),
+    IngredientEntry("hyaluronic acid", ("sodium hyaluronate", "hydrolyzed hyaluronic acid")),
+    IngredientEntry("squalane", ()),
+    IngredientEntry("tocopherol", ("tocopheryl acetate", "vitamin e")),
+    IngredientEntry("panthenol", ("provitamin b5",)),
+    IngredientEntry("allantoin", ()),
+    IngredientEntry("ceramide", ("ceramide np", "ceramide ap", "ceramide eop")),
+    IngredientEntry("titanium dioxide", ("ci 77891",)),
+    IngredientEntry("zinc oxide", ("ci 77947",)),
+    IngredientEntry("iron oxides", ("ci 77491", "ci 77492", "ci 77499")),
+    IngredientEntry("mica", ("ci 77019",)),
+    IngredientEntry("silica", ("silica dimethyl silylate",)),
+    IngredientEntry("talc", ()),
+    IngredientEntry("kaolin", ()),
+    IngredientEntry("glycols", ("butylene glycol", "propylene glycol", "pentylene glycol", "caprylyl glycol")),
+    IngredientEntry("phenoxyethanol", ()),
+    IngredientEntry("ethylhexylglycerin", ()),
+    IngredientEntry("xanthan gum", ()),
+    IngredientEntry("caprylic/capric triglyceride", ("caprylic capric triglyceride",)),
+    IngredientEntry("cyclopentasiloxane", ("cyclomethicone",)),
+    IngredientEntry("citric acid", ()),
+    IngredientEntry("sodium benzoate", ()),
+    IngredientEntry("potassium sorbate", ()),
+    IngredientEntry("sodium chloride", ()),
+    IngredientEntry("disodium edta", ("tetrasodium edta",)),
+    IngredientEntry("aloe vera", ("aloe barbadensis leaf juice", "aloe barbadensis leaf extract")),
+    IngredientEntry("centella asiatica", ("centella asiatica extract", "madecassoside")),
+)
+
+# Free-text user allergies -> allergen group
+ALLERGY_ALIASES: Dict[str, str] = {
+    "fragrance": "fragrance", "fragrances": "fragrance", "perfume": "fragrance", "parfum": "fragrance", "scent": "fragrance",
+    "essential oil": "essential_oils", "essential oils": "essential_oils",
+    "alcohol": "drying_alcohol",
+    "sulfate": "sulfates", "sulfates": "sulfates", "sulphate": "sulfates", "sulphates": "sulfates",
+    "paraben": "parabens", "parabens": "parabens",
+    "isothiazolinone": "isothiazolinones", "isothiazolinones": "isothiazolinones",
+    "formaldehyde": "formaldehyde",
+    "lanolin": "lanolin", "wool": "lanolin",
+    "carmine": "carmine",
+    "propolis": "bee_products", "beeswax": "bee_products", "bee products": "bee_products",
+    "nut": "tree_nuts", "nuts": "tree_nuts", "tree nut": "tree_nuts", "tree nuts": "tree_nuts",
+    "almond": "tree_nuts", "shea": "tree_nuts",
+    "gluten": "gluten", "wheat": "gluten",
+    "soy": "soy", "soya": "soy",
+    "oxybenzone": "sunscreen_filters", "chemical sunscreen": "sunscreen_filters",
+    "ppd": "ppd", "hair dye": "ppd",
+    "nickel": "nickel",
+}
+
+# Free-text skin concerns -> concern keys used in the dictionary
+CONCERN_ALIASES: Dict[str, str] = {
+    "acne": "acne", "acne-prone": "acne", "acne prone": "acne", "breakouts": "acne", "pimples": "acne",
+    "sensitive": "sensitive", "sensitivity": "sensitive", "irritation": "sensitive",
+    "oily": "oily", "oiliness": "oily", "excess oil": "oily",
+    "dry": "dry", "dryness": "dry", "dehydrated": "dry", "dehydration": "dry",
+    "rosacea": "rosacea", "redness": "rosacea",
+    "eczema": "eczema", "dermatitis": "eczema",
+}
+
+_SEVERITY_ORDER = {"low": 0, "unknown": 1, "moderate": 2, "high": 3}
+_RECOMMENDATION_ORDER = {"safe_to_use": 0, "review_manually": 1, "use_with_caution": 2, "avoid": 3}
+
+
+def normalize_term(text: str) -> str:
+    """Lowercase with collapsed whitespace; the form both patterns and text are matched in"""
+    return " ".join(str(text).lower().split())
+
+
+# ============================================================
+# 🔎 AHO-CORASICK AUTOMATON
+# ============================================================
+class AhoCorasick:
+    """
+    Multi-pattern matcher: all occurrences of all patterns in one pass.
+    Add patterns, call build(), then iter_matches().
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        self._delta: List[Dict[str, int]] = []  # full transition table, filled by build()
+        self._patterns: List[Tuple[int, Any]] = []  # (length, value)
+        self._built = False
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def add(self, pattern: str, value: Any):
+        if not pattern:
+            return
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(len(self._patterns))
+        self._patterns.append((len(pattern), value))
+        self._built = False
+
+    def build(self):
+        """
+        Breadth-first failure links; outputs are merged along them and the
+        failure transitions are folded into a DFA table so scanning never backtracks.
+        """
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        delta: List[Dict[str, int]] = [{} for _ in self._goto]
+        delta[0] = dict(self._goto[0])
+        while queue:
+            state = queue.popleft()
+            if state:
+                delta[state] = {**delta[self._fail[state]], **self._goto[state]}
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+        self._delta = delta
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, Any]]:
+        """(start, end, value) for every pattern occurrence, in order of end position"""
+        if not self._built:
+            self.build()
+        delta, out, patterns = self._delta, self._out, self._patterns
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                for pid in out[state]:
+                    length, value = patterns[pid]
+                    yield i + 1 - length, i + 1, value
+
+
+# ============================================================
+# 🧪 MATCHER
+# ============================================================
+@dataclass
+class IngredientHit:
+    ingredient: str        # ingredient as listed on the product
+    index: int             # position in the ingredient list
+    term: str              # dictionary term that matched
+    entry: IngredientEntry
+
+
+@dataclass
+class MatchReport:
+    hits: List[IngredientHit] = field(default_factory=list)
+    unresolved: List[str] = field(default_factory=list)            # ingredients the dictionary doesn't know
+    unresolved_allergies: List[str] = field(default_factory=list)  # user allergies with no dictionary mapping
+    allergens_found: List[str] = field(default_factory=list)
+    concern_conflicts: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+    @property
+    def needs_llm(self) -> bool:
+        return bool(self.unresolved or self.unresolved_allergies)
+
+    def to_safety_result(self) -> Dict[str, Any]:
+        """Same shape as LLMService.check_product_safety"""
+        if self.allergens_found:
+            is_safe, severity, recommendation = False, "high", "avoid"
+            score = 0.2
+        elif self.concern_conflicts:
+            is_safe, severity, recommendation = True, "moderate", "use_with_caution"
+            score = max(0.4, 0.9 - 0.1 * len(self.concern_conflicts))
+        else:
+            is_safe, severity, recommendation = True, "low", "safe_to_use"
+            score = 0.95
+        return {
+            "is_safe": is_safe,
+            "safety_score": round(score, 2),
+            "warnings": list(self.warnings),
+            "allergens_found": list(self.allergens_found),
+            "concern_conflicts": list(self.concern_conflicts),
+            "severity": severity,
+            "recommendation": recommendation,
+            "confidence": 0.95 if not self.needs_llm else 0.7
+        }
+
+
+class IngredientMatcher:
+    """Compiled dictionary lookup for ingredient lists"""
+
+    def __init__(self, dictionary: Sequence[IngredientEntry] = INGREDIENT_DICTIONARY):
+        self.entries = {entry.name: entry for entry in dictionary}
+        self._automaton = AhoCorasick()
+        for entry in dictionary:
+            for term in {entry.name, *entry.synonyms}:
+                normalized = normalize_term(term)
+                self._automaton.add(normalized, (normalized, entry))
+        self._automaton.build()
+        self.groups = {group for entry in dictionary for group in entry.allergens}
+
+    @property
+    def term_count(self) -> int:
+        return len(self._automaton)
+
+    def scan(self, ingredients: Iterable[str]) -> Tuple[List[IngredientHit], List[str]]:
+        """
+        Dictionary hits for an ingredient list plus the ingredients with no hit.
+        Leftmost-longest, whole-word matching: "cetyl alcohol" is a fatty
+        alcohol, not a drying one.
+        """
+        originals = [str(i) for i in ingredients if i and str(i).strip()]
+        if not originals:
+            return [], []
+
+        # One text for the whole list; "|" keeps matches from spanning ingredients
+        starts, parts, offset = [], [], 0
+        for ingredient in originals:
+            normalized = normalize_term(ingredient)
+            starts.append(offset)
+            parts.append(normalized)
+            offset += len(normalized) + 1
+        text = "|".join(parts)
+
+        candidates = [
+            (start, end, value)
+            for start, end, value in self._automaton.iter_matches(text)
+            if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum())
+        ]
+        candidates.sort(key=lambda m: (m[0], m[0] - m[1]))
+
+        hits: List[IngredientHit] = []
+        matched = set()
+        last_end = -1
+        for start, end, (term, entry) in candidates:
+            if start < last_end:
+                continue
+            index = bisect_right(starts, start) - 1
+            hits.append(IngredientHit(ingredient=originals[index], index=index, term=term, entry=entry))
+            matched.add(index)
+            last_end = end
+
+        unresolved = [ingredient for i, ingredient in enumerate(originals) if i not in matched]
+        return hits, unresolved
+
+    def resolve_allergies(self, allergies: Iterable[Any]) -> Tuple[set, set, List[str]]:
+        """(allergen groups, canonical ingredient names, allergies left unresolved)"""
+        groups, names, unresolved = set(), set(), []
+        for allergy in allergies or []:
+            term = normalize_term(allergy)
+            if not term:
+                continue
+            if term in ALLERGY_ALIASES:
+                groups.add(ALLERGY_ALIASES[term])
+                continue
+            if term.replace(" ", "_") in self.groups:
+                groups.add(term.replace(" ", "_"))
+                continue
+            hits, _ = self.scan([term])
+            if hits:
+                names.update(hit.entry.name for hit in hits)
+            else:
+                unresolved.append(str(allergy))
+        return groups, names, unresolved
+
+    @staticmethod
+    def resolve_concerns(skin_concerns: Iterable[Any]) -> List[str]:
+        resolved = []
+        for concern in skin_concerns or []:
+            if isinstance(concern, dict):
+                concern = concern.get("type", "")
+            key = CONCERN_ALIASES.get(normalize_term(concern))
+            if key and key not in resolved:
+                resolved.append(key)
+        return resolved
+
+    def evaluate(
+        self,
+        ingredients: Iterable[str],
+        allergies: Optional[Iterable[Any]] = None,
+        skin_concerns: Optional[Iterable[Any]] = None
+    ) -> MatchReport:
+        """Deterministic allergen and concern findings, ordered by ingredient position"""
+        hits, unresolved = self.scan(ingredients)
+        allergy_groups, allergy_names, unresolved_allergies = self.resolve_allergies(allergies or [])
+        concerns = self.resolve_concerns(skin_concerns or [])
+
+        report = MatchReport(hits=hits, unresolved=unresolved, unresolved_allergies=unresolved_allergies)
+        seen = set()
+        for hit in hits:
+            entry = hit.entry
+            matched_groups = [g for g in entry.allergens if g in allergy_groups]
+            if (matched_groups or entry.name in allergy_names) and ("allergen", entry.name) not in seen:
+                seen.add(("allergen", entry.name))
+                report.allergens_found.append(entry.name)
+                label = matched_groups[0].replace("_", " ") if matched_groups else entry.name
+                report.warnings.append(f"Contains {entry.name} ({hit.ingredient}) - listed allergy: {label}")
+            for concern in concerns:
+                if concern in entry.concerns and (concern, entry.name) not in seen:
+                    seen.add((concern, entry.name))
+                    report.concern_conflicts.append(f"{concern}: {entry.name}")
+                    report.warnings.append(f"May worsen {concern}: contains {entry.name}")
+        return report
+
+
+def merge_safety_results(local: Dict[str, Any], remote: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine the dictionary verdict with an LLM verdict for the unresolved remainder"""
+    def union(key: str) -> List[Any]:
+        merged = list(local.get(key) or [])
+        merged += [item for item in remote.get(key) or [] if item not in merged]
+        return merged
+
+    return {
+        "is_safe": bool(local.get("is_safe", True)) and bool(remote.get("is_safe", True)),
+        "safety_score": min(local.get("safety_score", 1.0), remote.get("safety_score", 1.0)),
+        "warnings": union("warnings"),
+        "allergens_found": union("allergens_found"),
+        "concern_conflicts": union("concern_conflicts"),
+        "severity": max(
+            local.get("severity", "low"), remote.get("severity", "low"),
+            key=lambda s: _SEVERITY_ORDER.get(s, 1)
+        ),
+        "recommendation": max(
+            local.get("recommendation", "safe_to_use"), remote.get("recommendation", "safe_to_use"),
+            key=lambda r: _RECOMMENDATION_ORDER.get(r, 1)
+        ),
+        "confidence": min(local.get("confidence", 1.0), remote.get("confidence", 1.0))
+    }
+
+
+# Singleton instance (compiled once at import / startup)
+ingredient_matcher = IngredientMatcher()
@@ -6,6 +6,8 @@ Business logic for makeup plan generation and recommendations
 from typing import Dict, Any, List, Optional
 from loguru import logger
 
+from app.services.makeup.ingredient_matcher import ingredient_matcher
+
 
 class MakeupPlanner:
     """Service for makeup planning logic"""
@@ -84,24 +86,12 @@ class MakeupPlanner:
         """
         validated_products = []
         
-        concern_incompatible_ingredients = {
-            "acne": ["coconut oil", "mineral oil", "dimethicone", "heavy oils"],
-            "sensitive": ["fragrance", "alcohol", "parfum", "essential oils"],
-            "oily": ["heavy oils", "butter", "petroleum"],
-            "dry": ["alcohol", "sulfates"]
-        }
-        
         for product in product_list:
-            warnings = []
-            ingredients = product.get("ingredients", [])
-            
-            for concern in skin_concerns:
-                if concern in concern_incompatible_ingredients:
-                    bad_ingredients = concern_incompatible_ingredients[concern]
-                    
-                    for bad_ing in bad_ingredients:
-                        if any(bad_ing.lower() in ing.lower() for ing in ingredients):
-                            warnings.append(f"May worsen {concern}: contains {bad_ing}")
+            report = ingredient_matcher.evaluate(
+                product.get("ingredients", []),
+                skin_concerns=skin_concerns
+            )
+            warnings = report.warnings
             
             product["compatibility_warnings"] = warnings
             product["is_compatible"] = len(warnings) == 0
@@ -0,0 +1,247 @@
+"""
+GlamAI - Catalog Search
+Keeps the in-process ProductIndex in sync with product_database
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.database import AsyncSessionLocal
+from app.models.vanity import ProductDatabase
+from app.services.search.product_index import ORDER_RELEVANCE, ProductIndex
+from app.services.search.shade_index import ShadeIndex
+from app.services.search.similarity_index import MODE_BLEND, SimilarityIndex
+
+# Re-read rows changed slightly before the watermark (commit vs. clock skew);
+# upserts are idempotent so the overlap is harmless
+_WATERMARK_OVERLAP = timedelta(seconds=5)
+_FULL_REBUILD_EVERY = 120  # refresh ticks; catches hard-deleted rows
+
+_COLUMNS = (
+    ProductDatabase.id,
+    ProductDatabase.category,
+    ProductDatabase.brand,
+    ProductDatabase.product_name,
+    ProductDatabase.shade,
+    ProductDatabase.price,
+    ProductDatabase.average_rating,
+    ProductDatabase.total_reviews,
+    ProductDatabase.in_stock,
+    ProductDatabase.is_active,
+    ProductDatabase.tags,
+    ProductDatabase.ingredients,
+    ProductDatabase.image_url,
+    ProductDatabase.product_url,
+)
+_CHANGED_AT = func.coalesce(ProductDatabase.updated_at, ProductDatabase.created_at)
+
+
+class CatalogSearch:
+    """
+    Owns the live ProductIndex. `load()` builds a fresh index off the event
+    loop and swaps it in; `refresh()` applies rows whose updated_at /
+    created_at moved past the watermark (inactive rows are dropped). A
+    background task refreshes every LOCAL_SEARCH_REFRESH_SECONDS and
+    rebuilds from scratch now and then to pick up hard deletes.
+    """
+
+    def __init__(self):
+        self.index = ProductIndex()
+        self.similarity = SimilarityIndex(dim=settings.SIMILARITY_VECTOR_DIM)
+        self.shades = ShadeIndex()
+        self.ready = False
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._listeners: List[Callable[[], None]] = []
+
+    def on_change(self, callback: Callable[[], None]):
+        """Call `callback` whenever the index is rebuilt or picks up changes"""
+        self._listeners.append(callback)
+
+    def _changed(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"⚠️ Catalog change listener failed: {e}")
+
+    # ============================================================
+    # 🔄 SYNC
+    # ============================================================
+    async def _fetch(self, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Active rows (full load), or every row changed after `since`"""
+        query = select(*_COLUMNS, _CHANGED_AT.label("changed_at"))
+        if since is None:
+            query = query.where(ProductDatabase.is_active.is_(True))
+        else:
+            query = query.where(_CHANGED_AT > since - _WATERMARK_OVERLAP)
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(query)
+            return [dict(row) for row in result.mappings()]
+
+    def _advance(self, rows: List[Dict[str, Any]]):
+        stamps = [row["changed_at"] for row in rows if row.get("changed_at")]
+        if stamps:
+            latest = max(stamps)
+            self._watermark = latest if self._watermark is None else max(self._watermark, latest)
+
+    async def load(self):
+        """Full rebuild from product_database; the old index serves until the swap"""
+        async with self._lock:
+            start = time.perf_counter()
+            rows = await self._fetch()
+
+            def build():
+                index = ProductIndex(capacity=len(rows) + 1024)
+                index.upsert(rows)
+                index.warm()
+                similarity = SimilarityIndex(dim=settings.SIMILARITY_VECTOR_DIM, capacity=len(rows) + 1024)
+                similarity.upsert(rows)
+                shades = ShadeIndex()
+                shades.upsert(rows)
+                return index, similarity, shades
+
+            self.index, self.similarity, self.shades = await asyncio.to_thread(build)
+            self._advance(rows)
+            self.ready = True
+            elapsed = (time.perf_counter() - start) * 1000
+            metrics.observe("local_search_rebuild_ms", elapsed)
+            metrics.set_gauge("local_search_documents", len(self.index))
+            logger.info(f"🔎 Catalog index built: {len(self.index)} products in {elapsed:.0f} ms")
+            self._changed()
+
+        # Rows written while the build ran are past the new watermark
+        await self.refresh()
+
+    async def refresh(self) -> int:
+        """Apply product_database changes since the last sync; returns rows applied"""
+        if not self.ready:
+            await self.load()
+            return len(self.index)
+
+        async with self._lock:
+            rows = await self._fetch(since=self._watermark)
+            if not rows:
+                return 0
+            removed = [row["id"] for row in rows if not row["is_active"]]
+            active = [row for row in rows if row["is_active"]]
+            self.index.remove(removed)
+            self.index.upsert(active)
+            self.similarity.remove(removed)
+            self.similarity.upsert(active)
+            self.shades.remove(removed)
+            self.shades.upsert(active)
+            self._advance(rows)
+            metrics.incr("local_search_refreshed_rows_total", len(rows))
+            metrics.set_gauge("local_search_documents", len(self.index))
+            self._changed()
+            return len(rows)
+
+    def upsert(self, products: List[Dict[str, Any]]):
+        """Write-through hook for code that changes catalog rows"""
+        if self.ready:
+            self.index.upsert(products)
+            self.similarity.upsert(products)
+            self.shades.upsert(products)
+            self._changed()
+
+    def remove(self, product_ids: List[Any]):
+        if self.ready:
+            self.index.remove(product_ids)
+            self.similarity.remove(product_ids)
+            self.shades.remove(product_ids)
+            self._changed()
+
+    async def _run(self):
+        ticks = 0
+        while True:
+            try:
+                if ticks % _FULL_REBUILD_EVERY == 0:
+                    await self.load()
+                else:
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.incr("local_search_refresh_errors_total")
+                logger.warning(f"⚠️ Catalog index sync failed: {e}")
+            ticks += 1
+            await asyncio.sleep(settings.LOCAL_SEARCH_REFRESH_SECONDS)
+
+    def start(self):
+        if settings.ENABLE_LOCAL_SEARCH and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ============================================================
+    # 🔎 SEARCH
+    # ============================================================
+    @property
+    def available(self) -> bool:
+        return settings.ENABLE_LOCAL_SEARCH and self.ready and len(self.index) > 0
+
+    def search(self, query: Optional[str] = None, order_by: str = ORDER_RELEVANCE, **filters) -> List[Dict[str, Any]]:
+        start = time.perf_counter()
+        results = self.index.search(query=query, order_by=order_by, **filters)
+        metrics.observe("local_search_ms", (time.perf_counter() - start) * 1000, order=order_by)
+        return results
+
+    def substitutes(
+        self,
+        product: Dict[str, Any],
+        top: int = 5,
+        mode: str = MODE_BLEND,
+        max_price: Optional[float] = None,
+        category: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Catalog products most similar to `product` (formula and/or shade), best first"""
+        start = time.perf_counter()
+        hits = self.similarity.substitutes(product, k=top, mode=mode, category=category, max_price=max_price)
+        results = []
+        for pid, score in hits:
+            doc = self.index.get(pid)
+            if doc is not None:
+                results.append({**doc, "similarity": round(score, 4)})
+        metrics.observe("local_substitutes_ms", (time.perf_counter() - start) * 1000, mode=mode)
+        return results
+
+    def closest_shades(
+        self,
+        colour: Any,
+        category: Any,
+        top: int = 5,
+        max_delta_e: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """In-stock catalog products whose shade is closest to `colour` (hex / Lab) by ΔE2000"""
+        start = time.perf_counter()
+        limit = settings.SHADE_MATCH_MAX_DELTA_E if max_delta_e is None else max_delta_e
+        results = []
+        # Over-fetch so out-of-stock shades can be skipped
+        for pid, delta_e in self.shades.closest(colour, category, n=top * 2, max_delta_e=limit):
+            doc = self.index.get(pid)
+            if doc is not None and doc["in_stock"]:
+                results.append({**doc, "delta_e": round(delta_e, 2)})
+                if len(results) == top:
+                    break
+        metrics.observe("local_shade_match_ms", (time.perf_counter() - start) * 1000)
+        return results
+
+
+# Singleton instance
+catalog_search = CatalogSearch()
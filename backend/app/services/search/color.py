@@ -0,0 +1,131 @@
+"""
+GlamAI - Shade Colour Space
+sRGB hex / shade names to CIELAB (D65) coordinates
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+_HEX = re.compile(r"#?\b([0-9a-fA-F]{6})\b")
+_WORD = re.compile(r"[a-z]+")
+
+# Approximate swatches for words that recur in shade names; a shade's colour
+# is the mean of the words it contains (e.g. "Warm Honey Beige")
+SHADE_SWATCHES = {
+    # complexion
+    "porcelain": "#F4E3D7", "ivory": "#F1DFC8", "fair": "#EFD3BC", "alabaster": "#F2E1D3",
+    "light": "#E6C3A5", "vanilla": "#EBCFB0", "shell": "#ECD2BA", "beige": "#D9B48F",
+    "sand": "#D4B08C", "nude": "#D2A88A", "natural": "#C9A07E", "buff": "#CDA882",
+    "medium": "#BE8F6A", "honey": "#C68E5A", "golden": "#C89B5A", "tan": "#B98558",
+    "caramel": "#A8693E", "amber": "#A6662F", "toffee": "#9A6240", "mocha": "#7F5539",
+    "chestnut": "#6F4428", "cocoa": "#5C3A28", "espresso": "#4B2E20", "deep": "#5A3A29",
+    "ebony": "#3B2419", "dark": "#4A2E22",
+    # lips / cheeks
+    "red": "#C0272D", "ruby": "#9B111E", "cherry": "#A4161A", "crimson": "#B0202F",
+    "scarlet": "#C52A1F", "wine": "#722F37", "plum": "#6E2A4F", "berry": "#8E2344",
+    "burgundy": "#7A1F2B", "maroon": "#6B1E24", "mauve": "#B07A8A", "rose": "#C76E7E",
+    "pink": "#E58FA5", "blush": "#E4A3A0", "fuchsia": "#C42E8A", "magenta": "#B3237A",
+    "coral": "#F2765F", "peach": "#F0A582", "orange": "#E8672A", "brick": "#9C4A33",
+    "terracotta": "#B8613F", "brown": "#7B4B35", "taupe": "#8B7262",
+    # eyes / metallics
+    "bronze": "#A0673A", "gold": "#C9A13B", "copper": "#B06A3B", "champagne": "#E8CFA8",
+    "silver": "#BFC1C2", "black": "#1C1C1C", "white": "#F7F5F2", "grey": "#8A8A8A",
+    "gray": "#8A8A8A", "blue": "#3A5BA0", "navy": "#1F2A50", "green": "#3C7A4B",
+    "olive": "#6B6B3A", "teal": "#1F7A7A", "purple": "#6A3D8A", "violet": "#7A4FA0",
+    "lilac": "#B9A1CF", "lavender": "#B7A6D6",
+}
+
+# D65 reference white
+_WHITE = np.array([0.95047, 1.0, 1.08883])
+_RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+
+
+def srgb_to_lab(rgb: np.ndarray) -> np.ndarray:
+    """(..., 3) sRGB in 0-255 to CIELAB (L* 0-100)"""
+    c = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(c <= 0.04045, c / 12.92, ((c + 0.055) / 1.055) ** 2.4)
+    xyz = linear @ _RGB_TO_XYZ.T / _WHITE
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def hex_to_lab(value: str) -> Optional[np.ndarray]:
+    match = _HEX.search(value or "")
+    if not match:
+        return None
+    digits = match.group(1)
+    return srgb_to_lab(np.array([int(digits[i:i + 2], 16) for i in (0, 2, 4)]))
+
+
+_SWATCH_LAB = {word: hex_to_lab(code) for word, code in SHADE_SWATCHES.items()}
+
+
+@lru_cache(maxsize=8192)
+def _shade_lab(shade: str) -> Optional[Tuple[float, float, float]]:
+    lab = hex_to_lab(shade)
+    if lab is None:
+        swatches = [_SWATCH_LAB[w] for w in _WORD.findall(shade.lower()) if w in _SWATCH_LAB]
+        if not swatches:
+            return None
+        lab = np.mean(swatches, axis=0)
+    return tuple(float(v) for v in lab)
+
+
+def shade_to_lab(shade: Optional[str]) -> Optional[np.ndarray]:
+    """CIELAB for a shade: an embedded hex code, else the mean of known shade words"""
+    lab = _shade_lab(shade) if shade else None
+    return None if lab is None else np.array(lab)
+
+
+def delta_e76(lab: Sequence[float], labs: np.ndarray) -> np.ndarray:
+    """Euclidean CIELAB distance of one colour to each row of `labs`"""
+    return np.linalg.norm(np.asarray(labs, dtype=np.float64) - np.asarray(lab, dtype=np.float64), axis=-1)
+
+
+def delta_e2000(lab: Sequence[float], labs: np.ndarray) -> np.ndarray:
+    """CIEDE2000 difference of one colour to each row of `labs` (Sharma et al. 2005)"""
+    L1, a1, b1 = (float(v) for v in lab)
+    labs = np.atleast_2d(np.asarray(labs, dtype=np.float64))
+    L2, a2, b2 = labs[:, 0], labs[:, 1], labs[:, 2]
+
+    c_mean = (math.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    g = 0.5 * (1 - np.sqrt(c_mean ** 7 / (c_mean ** 7 + 25.0 ** 7)))
+    a1p, a2p = a1 * (1 + g), a2 * (1 + g)
+    c1p, c2p = np.hypot(a1p, b1), np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+
+    dLp = L2 - L1
+    dCp = c2p - c1p
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    dhp = np.where(c1p * c2p == 0, 0.0, dhp)
+    dHp = 2 * np.sqrt(c1p * c2p) * np.sin(np.radians(dhp) / 2)
+
+    Lp_mean = (L1 + L2) / 2
+    Cp_mean = (c1p + c2p) / 2
+    h_sum = h1p + h2p
+    hp_mean = np.where(
+        c1p * c2p == 0, h_sum,
+        np.where(np.abs(h1p - h2p) <= 180, h_sum / 2, np.where(h_sum < 360, (h_sum + 360) / 2, (h_sum - 360) / 2)),
+    )
+    t = (1 - 0.17 * np.cos(np.radians(hp_mean - 30)) + 0.24 * np.cos(np.radians(2 * hp_mean))
+         + 0.32 * np.cos(np.radians(3 * hp_mean + 6)) - 0.20 * np.cos(np.radians(4 * hp_mean - 63)))
+    d_theta = 30 * np.exp(-(((hp_mean - 275) / 25) ** 2))
+    r_c = 2 * np.sqrt(Cp_mean ** 7 / (Cp_mean ** 7 + 25.0 ** 7))
+    s_l = 1 + 0.015 * (Lp_mean - 50) ** 2 / np.sqrt(20 + (Lp_mean - 50) ** 2)
+    s_c = 1 + 0.045 * Cp_mean
+    s_h = 1 + 0.015 * Cp_mean * t
+    r_t = -np.sin(np.radians(2 * d_theta)) * r_c
+
+    return np.sqrt(
+        (dLp / s_l) ** 2 + (dCp / s_c) ** 2 + (dHp / s_h) ** 2 + r_t * (dCp / s_c) * (dHp / s_h)
+    )
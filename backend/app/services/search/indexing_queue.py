@@ -0,0 +1,216 @@
+"""
+GlamAI - Search Indexing Queue
+Coalesces search documents into batched background uploads
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Uploads a batch; returns {key: retryable} for documents that failed
+UploadFn = Callable[[List[Dict[str, Any]]], Awaitable[Dict[str, bool]]]
+
+
+@dataclass
+class _Pending:
+    doc: Dict[str, Any]
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+    not_before: float = 0.0
+
+
+class IndexingQueue:
+    """
+    Background batcher for search documents.
+
+    `enqueue()` is synchronous and only touches a dict, so request handlers
+    pay nothing for indexing. A flusher task uploads a batch once
+    `batch_size` documents are ready or the oldest has waited `max_age`
+    seconds. A later enqueue of the same id replaces the pending document
+    (merge-or-upload makes the last write win anyway). Failed keys are
+    re-queued with exponential backoff up to `max_attempts`. `on_indexed`
+    runs after every batch that indexed something (cache invalidation).
+    """
+
+    def __init__(
+        self,
+        upload: UploadFn,
+        name: str = "search",
+        batch_size: Optional[int] = None,
+        max_age: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        on_indexed: Optional[Callable[[], None]] = None,
+    ):
+        self._upload = upload
+        self._on_indexed = on_indexed
+        self.name = name
+        self.batch_size = batch_size or settings.SEARCH_INDEX_BATCH_SIZE
+        self.max_age = settings.SEARCH_INDEX_MAX_AGE_SECONDS if max_age is None else max_age
+        self.max_attempts = max_attempts or settings.SEARCH_INDEX_MAX_ATTEMPTS
+        self.max_pending = max_pending or settings.SEARCH_INDEX_MAX_PENDING
+        self._pending: Dict[str, _Pending] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ============================================================
+    # 📥 ENQUEUE
+    # ============================================================
+    def enqueue(self, docs: List[Dict[str, Any]]) -> int:
+        """Queue documents for upload; returns how many were accepted"""
+        accepted = 0
+        for doc in docs:
+            key = str(doc.get("id", ""))
+            if not key:
+                continue
+            previous = self._pending.get(key)
+            if previous is None and len(self._pending) >= self.max_pending:
+                metrics.incr("search_index_dropped_total", queue=self.name, reason="full")
+                logger.warning(f"⚠️ {self.name} indexing queue full, dropped document {key}")
+                continue
+            # Keep the original enqueue time so coalescing never delays a document
+            self._pending[key] = _Pending(doc=doc, enqueued_at=previous.enqueued_at if previous else time.monotonic())
+            accepted += 1
+
+        metrics.incr("search_index_enqueued_total", accepted, queue=self.name)
+        self._publish()
+        self.start()
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+        return accepted
+
+    @property
+    def depth(self) -> int:
+        return len(self._pending)
+
+    @property
+    def lag_seconds(self) -> float:
+        """Age of the oldest document still waiting"""
+        if not self._pending:
+            return 0.0
+        return time.monotonic() - min(p.enqueued_at for p in self._pending.values())
+
+    def _publish(self):
+        metrics.set_gauge("search_index_queue_depth", len(self._pending), queue=self.name)
+        metrics.set_gauge("search_index_queue_lag_ms", self.lag_seconds * 1000, queue=self.name)
+
+    # ============================================================
+    # 🚚 FLUSH
+    # ============================================================
+    def _take_batch(self, force: bool = False) -> List[_Pending]:
+        now = time.monotonic()
+        ready = [p for p in self._pending.values() if p.not_before <= now]
+        if not ready:
+            return []
+        oldest = min(p.enqueued_at for p in ready)
+        if not force and len(ready) < self.batch_size and now - oldest < self.max_age:
+            return []
+        ready.sort(key=lambda p: p.enqueued_at)
+        batch = ready[:self.batch_size]
+        for item in batch:
+            del self._pending[str(item.doc["id"])]
+        return batch
+
+    async def flush(self, force: bool = False) -> int:
+        """Upload every due batch; returns documents indexed"""
+        indexed = 0
+        while True:
+            batch = self._take_batch(force)
+            if not batch:
+                break
+            indexed += await self._send(batch)
+        self._publish()
+        return indexed
+
+    async def _send(self, batch: List[_Pending]) -> int:
+        start = time.perf_counter()
+        try:
+            failed = await self._upload([item.doc for item in batch])
+        except Exception as e:
+            logger.warning(f"⚠️ {self.name} index upload of {len(batch)} documents failed: {e}")
+            failed = {str(item.doc["id"]): True for item in batch}
+        metrics.observe("search_index_batch_ms", (time.perf_counter() - start) * 1000, queue=self.name)
+
+        now = time.monotonic()
+        indexed = 0
+        for item in batch:
+            key = str(item.doc["id"])
+            if key not in failed:
+                indexed += 1
+                metrics.observe("search_index_lag_ms", (now - item.enqueued_at) * 1000, queue=self.name)
+                continue
+            if key in self._pending:
+                continue  # a newer version was enqueued meanwhile and supersedes this one
+            item.attempts += 1
+            if not failed[key] or item.attempts >= self.max_attempts:
+                metrics.incr("search_index_dropped_total", queue=self.name, reason="failed")
+                logger.error(f"❌ {self.name} index gave up on document {key} after {item.attempts} attempts")
+                continue
+            backoff = min(
+                settings.SEARCH_INDEX_BACKOFF_MAX_SECONDS,
+                settings.SEARCH_INDEX_BACKOFF_BASE_SECONDS * (2 ** (item.attempts - 1)),
+            )
+            item.not_before = now + backoff * random.uniform(0.5, 1.0)
+            self._pending[key] = item
+            metrics.incr("search_index_retries_total", queue=self.name)
+
+        metrics.incr("search_index_uploaded_total", indexed, queue=self.name)
+        if indexed:
+            logger.info(f"📦 Indexed {indexed}/{len(batch)} documents into {self.name}")
+            if self._on_indexed is not None:
+                self._on_indexed()
+        return indexed
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_due())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ {self.name} indexing flush failed: {e}")
+
+    def _next_due(self) -> float:
+        """Seconds until the oldest ready document reaches max_age (or a retry is due)"""
+        if not self._pending:
+            return self.max_age or 1.0
+        now = time.monotonic()
+        due = min(max(p.enqueued_at + self.max_age, p.not_before) for p in self._pending.values())
+        return max(0.01, due - now)
+
+    def start(self):
+        if self._task is not None:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return  # no loop yet; the next enqueue from a handler starts the flusher
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and make one last attempt at everything queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for item in self._pending.values():
+            item.not_before = 0.0
+        await self.flush(force=True)
+        if self._pending:
+            logger.warning(f"⚠️ {self.name} indexing queue stopped with {len(self._pending)} documents unsent")
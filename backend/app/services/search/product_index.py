@@ -0,0 +1,330 @@
+"""
+GlamAI - In-process Product Search Index
+BM25F inverted index over the product catalog with boolean-mask filters
+"""
+
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Field weights for BM25F: a hit in the name counts three times one in the
+# ingredient list. Weighted term frequencies share one length normalisation.
+FIELD_WEIGHTS: Dict[str, float] = {
+    "product_name": 3.0,
+    "brand": 2.0,
+    "tags": 1.5,
+    "ingredients": 1.0,
+}
+K1 = 1.2
+B = 0.75
+
+ORDER_RELEVANCE = "relevance"
+ORDER_RATING = "rating"  # average_rating desc, total_reviews desc (the Azure order_by)
+ORDER_POPULARITY = "popularity"  # total_reviews desc, average_rating desc
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset({"a", "an", "and", "for", "the", "of", "with", "in", "to", "on", "by", "or"})
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased alphanumeric tokens with a light plural fold (lipsticks -> lipstick)"""
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+@lru_cache(maxsize=65536)
+def _field_tokens(text: str) -> Tuple[str, ...]:
+    # Brands, tags and ingredient names repeat across the catalog
+    return tuple(tokenize(text))
+
+
+def _as_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [str(v) for v in value if v]
+    return [str(value)]
+
+
+def normalize_document(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Same document shape SearchService.upload_products sends to Azure"""
+    category = product.get("category") or "other"
+    return {
+        "id": str(product.get("id", "")),
+        "brand": str(product.get("brand") or ""),
+        "product_name": str(product.get("product_name") or "Unknown"),
+        "category": str(getattr(category, "value", category)),
+        "shade": str(product.get("shade") or ""),
+        "price": float(product.get("price") or 0.0),
+        "average_rating": float(product.get("average_rating") or 0.0),
+        "total_reviews": int(product.get("total_reviews") or 0),
+        "in_stock": bool(product.get("in_stock", True)),
+        "tags": _as_list(product.get("tags")),
+        "ingredients": _as_list(product.get("ingredients")),
+        "image_url": str(product.get("image_url") or ""),
+        "product_url": str(product.get("product_url") or ""),
+    }
+
+
+class _Postings:
+    """Posting list: NumPy arrays plus a pending tail folded in on next read"""
+    __slots__ = ("_slots", "_weights", "_pending_slots", "_pending_weights")
+
+    def __init__(self):
+        self._slots = np.empty(0, dtype=np.int64)
+        self._weights = np.empty(0, dtype=np.float32)
+        self._pending_slots: List[int] = []
+        self._pending_weights: List[float] = []
+
+    def add(self, slot: int, weight: float):
+        self._pending_slots.append(slot)
+        self._pending_weights.append(weight)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._pending_slots:
+            self._slots = np.concatenate((self._slots, np.asarray(self._pending_slots, dtype=np.int64)))
+            self._weights = np.concatenate((self._weights, np.asarray(self._pending_weights, dtype=np.float32)))
+            self._pending_slots = []
+            self._pending_weights = []
+        return self._slots, self._weights
+
+
+class ProductIndex:
+    """
+    Inverted index + columnar attributes for catalog search.
+
+    Every document occupies a slot; per-slot columns (price, rating,
+    reviews, stock, category, length) are NumPy arrays, and category / stock
+    filters are boolean masks combined with vectorised price comparisons.
+    Updates tombstone the old slot and append a new one; once tombstones
+    make up a quarter of the slots the index compacts itself.
+
+    Not thread-safe: mutate and query from one thread (the event loop), or
+    build a fresh index elsewhere and swap it in.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._docs: List[Optional[Dict[str, Any]]] = []
+        self._slot_of: Dict[str, int] = {}
+        self._postings: Dict[str, _Postings] = {}
+        self._df: Dict[str, int] = {}
+        self._terms_of: List[Tuple[str, ...]] = []
+        self._category_codes: Dict[str, int] = {}
+        self._category_masks: List[np.ndarray] = []
+        self._total_length = 0.0
+        self._dead = 0
+
+        self._capacity = 0
+        self._alloc(max(capacity, 16))
+
+    # ============================================================
+    # 📥 WRITES
+    # ============================================================
+    def _alloc(self, capacity: int):
+        def grow(array: Optional[np.ndarray], dtype) -> np.ndarray:
+            fresh = np.zeros(capacity, dtype=dtype)
+            if array is not None:
+                fresh[:len(array)] = array
+            return fresh
+
+        existing = self._capacity > 0
+        self.price = grow(self.price if existing else None, np.float64)
+        self.rating = grow(self.rating if existing else None, np.float32)
+        self.reviews = grow(self.reviews if existing else None, np.int64)
+        self.doc_length = grow(self.doc_length if existing else None, np.float32)
+        self.alive = grow(self.alive if existing else None, np.bool_)
+        self.in_stock = grow(self.in_stock if existing else None, np.bool_)
+        self._category_masks = [grow(mask, np.bool_) for mask in self._category_masks]
+        self._capacity = capacity
+
+    def upsert(self, products: Iterable[Dict[str, Any]]) -> int:
+        """Add or replace documents (raw product dicts are normalised); returns count"""
+        count = 0
+        for product in products:
+            doc = normalize_document(product)
+            if not doc["id"]:
+                continue
+            self._remove(doc["id"])
+            self._add(doc)
+            count += 1
+        self._maybe_compact()
+        return count
+
+    def remove(self, ids: Iterable[Any]) -> int:
+        removed = sum(1 for pid in ids if self._remove(str(pid)))
+        self._maybe_compact()
+        return removed
+
+    def _add(self, doc: Dict[str, Any]):
+        slot = len(self._docs)
+        if slot >= self._capacity:
+            self._alloc(self._capacity * 2)
+
+        weighted: Dict[str, float] = {}
+        length = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            value = doc[field]
+            for text in value if isinstance(value, list) else (value,):
+                for token in _field_tokens(text):
+                    weighted[token] = weighted.get(token, 0.0) + weight
+                    length += weight
+
+        for term, tf in weighted.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = _Postings()
+            postings.add(slot, tf)
+            self._df[term] = self._df.get(term, 0) + 1
+
+        code = self._category_codes.get(doc["category"])
+        if code is None:
+            code = self._category_codes[doc["category"]] = len(self._category_masks)
+            self._category_masks.append(np.zeros(self._capacity, dtype=np.bool_))
+        self._category_masks[code][slot] = True
+
+        self.price[slot] = doc["price"]
+        self.rating[slot] = doc["average_rating"]
+        self.reviews[slot] = doc["total_reviews"]
+        self.in_stock[slot] = doc["in_stock"]
+        self.doc_length[slot] = length
+        self.alive[slot] = True
+        self._total_length += length
+
+        self._docs.append(doc)
+        self._terms_of.append(tuple(weighted))
+        self._slot_of[doc["id"]] = slot
+
+    def _remove(self, pid: str) -> bool:
+        slot = self._slot_of.pop(pid, None)
+        if slot is None:
+            return False
+        for term in self._terms_of[slot]:
+            self._df[term] -= 1
+        self._total_length -= float(self.doc_length[slot])
+        self.alive[slot] = False
+        self._docs[slot] = None
+        self._dead += 1
+        return True
+
+    def _maybe_compact(self):
+        if self._dead > 1024 and self._dead * 4 > len(self._docs):
+            live = [doc for doc in self._docs if doc is not None]
+            self.__init__(capacity=len(live) * 2)
+            for doc in live:
+                self._add(doc)
+
+    def warm(self):
+        """Materialise every posting array now instead of on first query"""
+        for postings in self._postings.values():
+            postings.arrays()
+
+    # ============================================================
+    # 🔎 QUERIES
+    # ============================================================
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    @property
+    def categories(self) -> List[str]:
+        return list(self._category_codes)
+
+    def get(self, pid: Any) -> Optional[Dict[str, Any]]:
+        slot = self._slot_of.get(str(pid))
+        return None if slot is None else self._docs[slot]
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        category: Optional[str] = None,
+        in_stock: Optional[bool] = True,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        order_by: str = ORDER_RELEVANCE,
+        top: int = 10,
+        skip: int = 0,
+    ) -> List[Dict[str, Any]]:
+        """
+        Azure-compatible search: any-term matching ("*" or empty matches
+        everything), equality filters on category / stock, a price range,
+        and either BM25 relevance or the rating / popularity sorts.
+        Result dicts carry "@search.score" like Azure hits.
+        """
+        n = len(self._docs)
+        if n == 0 or top <= 0:
+            return []
+
+        mask = self.alive[:n].copy()
+        if in_stock is not None:
+            mask &= self.in_stock[:n] if in_stock else ~self.in_stock[:n]
+        if category:
+            code = self._category_codes.get(str(getattr(category, "value", category)))
+            if code is None:
+                return []
+            mask &= self._category_masks[code][:n]
+        if min_price is not None:
+            mask &= self.price[:n] >= min_price
+        if max_price is not None:
+            mask &= self.price[:n] <= max_price
+
+        terms = set(tokenize(query)) if query and query.strip() != "*" else set()
+        scores = self._score(terms, n) if terms else None
+        if scores is not None:
+            mask &= scores > 0
+
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0:
+            return []
+        want = min(candidates.size, skip + top)
+
+        if order_by == ORDER_RELEVANCE and scores is not None:
+            keys = (scores[candidates],)
+        elif order_by == ORDER_POPULARITY:
+            keys = (self.reviews[candidates], self.rating[candidates])
+        else:
+            keys = (self.rating[candidates], self.reviews[candidates])
+        if scores is not None and order_by != ORDER_RELEVANCE:
+            keys = keys + (scores[candidates],)
+
+        ranked = candidates[self._top_order(keys, want)][skip:want]
+        return [
+            {**self._docs[slot], "@search.score": float(scores[slot]) if scores is not None else 1.0}
+            for slot in ranked
+        ]
+
+    def _score(self, terms: Iterable[str], n: int) -> np.ndarray:
+        live = len(self._slot_of)
+        avg_length = self._total_length / live if live else 1.0
+        norm = K1 * (1 - B + B * self.doc_length[:n] / max(avg_length, 1e-6))
+        scores = np.zeros(n, dtype=np.float32)
+        for term in terms:
+            postings = self._postings.get(term)
+            df = self._df.get(term, 0)
+            if postings is None or df <= 0:
+                continue
+            slots, tf = postings.arrays()
+            idf = math.log(1 + (live - df + 0.5) / (df + 0.5))
+            # Slots are unique within a posting list, so fancy-index += is safe
+            scores[slots] += idf * tf * (K1 + 1) / (tf + norm[slots])
+        return scores
+
+    @staticmethod
+    def _top_order(keys: Sequence[np.ndarray], want: int) -> np.ndarray:
+        """Indices of the `want` best rows, sorted by keys (first key primary, all desc)"""
+        primary = keys[0]
+        if want < primary.size:
+            # Keep every row tied with the cut-off so secondary keys decide fairly
+            kth = np.partition(primary, primary.size - want)[primary.size - want]
+            pool = np.flatnonzero(primary >= kth)
+        else:
+            pool = np.arange(primary.size)
+        order = np.lexsort(tuple(-k[pool].astype(np.float64) for k in reversed(keys)))
+        return pool[order[:want]]
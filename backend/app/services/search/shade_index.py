@@ -0,0 +1,138 @@
+"""
+GlamAI - Shade Matching Index
+Per-category KD-trees of product shades in CIELAB, queried with ΔE2000
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.search.color import delta_e2000, shade_to_lab
+
+try:  # optional: KD-tree search (scipy ships with scikit-learn); a vectorised scan is used without it
+    from scipy.spatial import cKDTree as KDTree
+except ImportError:
+    KDTree = None
+
+# Categories whose shade should match the skin tone
+SKIN_MATCHED_CATEGORIES = ("foundation", "concealer", "powder")
+
+# ΔE2000 shrinks chroma and hue differences by up to ~1 + 0.045 C; for
+# complexion colours (C < 60) every pair within ΔE2000 X lies within
+# ΔE*ab 4X, which bounds the Euclidean candidate search
+_DE76_PER_DE00 = 4.0
+# Euclidean neighbours re-ranked by ΔE2000 per requested result; the two
+# orderings agree closely at short range, so this rarely misses a match
+_CANDIDATES_PER_RESULT = 16
+
+
+def _category_key(category: Any) -> str:
+    return str(getattr(category, "value", category) or "other").lower()
+
+
+def _as_lab(colour: Any) -> Optional[np.ndarray]:
+    """Hex string, shade name or Lab triple to a Lab array"""
+    if isinstance(colour, str):
+        return shade_to_lab(colour)  # cached; handles hex codes too
+    return None if colour is None else np.asarray(colour, dtype=np.float64)
+
+
+def shade_delta_e(reference: Any, shade: Optional[str]) -> Optional[float]:
+    """ΔE2000 between a reference colour (hex / Lab) and a shade name, None if either is unknown"""
+    lab = _as_lab(reference)
+    shade_lab = shade_to_lab(shade)
+    if lab is None or shade_lab is None:
+        return None
+    return float(delta_e2000(lab, shade_lab[None, :])[0])
+
+
+class _CategoryTree:
+    __slots__ = ("ids", "labs", "tree")
+
+    def __init__(self, ids: List[str], labs: np.ndarray):
+        self.ids = np.array(ids, dtype=object)
+        self.labs = labs
+        self.tree = KDTree(labs) if KDTree is not None and len(ids) > 64 else None
+
+    def nearest(self, lab: np.ndarray, k: int, radius: float) -> np.ndarray:
+        """Rows of the k Euclidean-nearest shades within `radius`"""
+        k = min(k, len(self.ids))
+        if self.tree is not None:
+            distances, rows = self.tree.query(lab, k=k, distance_upper_bound=radius)
+            rows = np.atleast_1d(rows)
+            return rows[np.atleast_1d(distances) <= radius]
+        distances = np.linalg.norm(self.labs - lab, axis=1)
+        rows = np.argpartition(distances, k - 1)[:k] if k < distances.size else np.arange(distances.size)
+        return rows[distances[rows] <= radius]
+
+
+class ShadeIndex:
+    """
+    Shade coordinates for every product whose shade resolves to CIELAB
+    (embedded hex or the shade-name table), grouped by category. Each
+    category's KD-tree is rebuilt lazily on the first query after a change.
+    `closest()` pulls a small pool of Euclidean (ΔE*ab) neighbours from
+    the tree and ranks them by exact ΔE2000.
+    """
+
+    def __init__(self):
+        self._points: Dict[str, Tuple[str, np.ndarray]] = {}  # id -> (category, lab)
+        self._trees: Dict[str, _CategoryTree] = {}
+        self._dirty: set = set()
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def upsert(self, products: Iterable[Dict[str, Any]]):
+        for product in products:
+            pid = str(product.get("id", ""))
+            if not pid:
+                continue
+            self._drop(pid)
+            lab = shade_to_lab(product.get("shade"))
+            if lab is None:
+                continue
+            category = _category_key(product.get("category"))
+            self._points[pid] = (category, lab)
+            self._dirty.add(category)
+
+    def remove(self, ids: Iterable[Any]):
+        for pid in ids:
+            self._drop(str(pid))
+
+    def _drop(self, pid: str):
+        previous = self._points.pop(pid, None)
+        if previous is not None:
+            self._dirty.add(previous[0])
+
+    def _tree(self, category: str) -> Optional[_CategoryTree]:
+        if category in self._dirty:
+            members = [(pid, lab) for pid, (cat, lab) in self._points.items() if cat == category]
+            if members:
+                self._trees[category] = _CategoryTree([m[0] for m in members], np.array([m[1] for m in members]))
+            else:
+                self._trees.pop(category, None)
+            self._dirty.discard(category)
+        return self._trees.get(category)
+
+    def closest(
+        self,
+        colour: Any,
+        category: Any,
+        n: int = 5,
+        max_delta_e: float = 6.0,
+    ) -> List[Tuple[str, float]]:
+        """(product id, ΔE2000) of the n closest shades under `max_delta_e`, closest first"""
+        lab = _as_lab(colour)
+        tree = self._tree(_category_key(category))
+        if lab is None or tree is None or n <= 0:
+            return []
+
+        rows = tree.nearest(lab, max(64, n * _CANDIDATES_PER_RESULT), max_delta_e * _DE76_PER_DE00)
+        if rows.size == 0:
+            return []
+        distances = delta_e2000(lab, tree.labs[rows])
+        keep = distances < max_delta_e
+        rows, distances = rows[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")[:n]
+        return [(str(tree.ids[rows[i]]), float(distances[i])) for i in order]
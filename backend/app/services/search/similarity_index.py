@@ -0,0 +1,250 @@
+"""
+GlamAI - Product Similarity Index
+Ingredient (hashed TF-IDF) and shade (CIELAB) vectors for substitute lookups
+"""
+
+import math
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.makeup.ingredient_matcher import normalize_term
+from app.services.search.color import shade_to_lab
+
+MODE_FORMULA = "formula"  # same ingredients
+MODE_SHADE = "shade"  # closest colour
+MODE_BLEND = "blend"  # both, weighted
+
+SHADE_WEIGHT = 0.3  # share of the blended score that comes from the shade
+SHADE_FALLOFF = 50.0  # ΔE*ab at which shade similarity reaches 0
+BLEND_OVERSAMPLE = 20  # formula neighbours re-ranked by shade in blend mode
+
+
+def _bucket(term: str, dim: int) -> Tuple[int, float]:
+    h = zlib.crc32(term.encode("utf-8"))
+    return h % dim, (1.0 if (h >> 31) & 1 else -1.0)
+
+
+class BruteForceKNN:
+    """
+    Exact cosine top-k: scores every candidate row with one matrix-vector
+    product. An ANN backend (HNSW, IVF) can replace it by implementing
+    `build` and `search` with the same signatures.
+    """
+    name = "brute_force"
+
+    def build(self, vectors: np.ndarray):
+        pass  # nothing to precompute
+
+    def search(self, vectors: np.ndarray, query: np.ndarray, candidates: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(candidate rows, cosine) of the k rows of `vectors` closest to `query`, best first"""
+        scores = vectors[candidates] @ query
+        if candidates.size > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+            candidates, scores = candidates[part], scores[part]
+        order = np.argsort(-scores, kind="stable")
+        return candidates[order], scores[order]
+
+
+class SimilarityIndex:
+    """
+    One row per product: an L2-normalised ingredient vector (TF-IDF over
+    whole ingredient names, feature-hashed to `dim` columns, earlier INCI
+    positions weighted higher) and the shade's CIELAB coordinates when the
+    shade can be resolved. Substitute queries score candidates that pass
+    the category / price / stock filters and return the top k ids.
+    """
+
+    def __init__(self, dim: int = 128, capacity: int = 1024, knn: Optional[BruteForceKNN] = None):
+        self.dim = dim
+        self.knn = knn or BruteForceKNN()
+        self._ids: List[Optional[str]] = []
+        self._slot_of: Dict[str, int] = {}
+        self._terms_of: List[Tuple[str, ...]] = []
+        self._df: Dict[str, int] = {}
+        self._category_codes: Dict[str, int] = {}
+        self._capacity = 0
+        self._alloc(max(capacity, 16))
+
+    def _alloc(self, capacity: int):
+        def grow(array: Optional[np.ndarray], shape: Tuple[int, ...], dtype) -> np.ndarray:
+            fresh = np.zeros(shape, dtype=dtype)
+            if array is not None:
+                fresh[:len(array)] = array
+            return fresh
+
+        existing = self._capacity > 0
+        self.vectors = grow(self.vectors if existing else None, (capacity, self.dim), np.float32)
+        self.lab = grow(self.lab if existing else None, (capacity, 3), np.float32)
+        self.has_lab = grow(self.has_lab if existing else None, (capacity,), np.bool_)
+        self.price = grow(self.price if existing else None, (capacity,), np.float64)
+        self.in_stock = grow(self.in_stock if existing else None, (capacity,), np.bool_)
+        self.alive = grow(self.alive if existing else None, (capacity,), np.bool_)
+        self.category = grow(self.category if existing else None, (capacity,), np.int32)
+        self._capacity = capacity
+
+    def __len__(self) -> int:
+        return len(self._slot_of)
+
+    # ============================================================
+    # 🧮 VECTORS
+    # ============================================================
+    @staticmethod
+    def _terms(ingredients: Any) -> Tuple[str, ...]:
+        if not ingredients:
+            return ()
+        if not isinstance(ingredients, (list, tuple)):
+            ingredients = str(ingredients).split(",")
+        seen: Dict[str, None] = {}
+        for ingredient in ingredients:
+            term = normalize_term(ingredient)
+            if term:
+                seen.setdefault(term)
+        return tuple(seen)
+
+    def _vectorize(self, terms: Tuple[str, ...], n: Optional[int] = None) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        n = max(len(self._slot_of) if n is None else n, 1)
+        for position, term in enumerate(terms):
+            idf = math.log((1 + n) / (1 + self._df.get(term, 0))) + 1
+            column, sign = _bucket(term, self.dim)
+            vector[column] += sign * idf / math.sqrt(1 + position * 0.25)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def query_vectors(self, product: Dict[str, Any]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Ingredient vector and CIELAB shade (None if unknown) for any product dict"""
+        return self._vectorize(self._terms(product.get("ingredients"))), shade_to_lab(product.get("shade"))
+
+    # ============================================================
+    # 📥 WRITES
+    # ============================================================
+    def upsert(self, products: Iterable[Dict[str, Any]]):
+        products = [p for p in products if str(p.get("id", ""))]
+        for product in products:
+            self._remove(str(product["id"]))
+        # Count document frequencies first so a bulk load is weighted consistently
+        staged = []
+        for product in products:
+            terms = self._terms(product.get("ingredients"))
+            for term in terms:
+                self._df[term] = self._df.get(term, 0) + 1
+            staged.append((product, terms))
+        n = len(self._slot_of) + len(staged)
+        for product, terms in staged:
+            self._add(product, terms, n)
+        self._maybe_compact()
+        self.knn.build(self.vectors[:len(self._ids)])
+
+    def remove(self, ids: Iterable[Any]):
+        for pid in ids:
+            self._remove(str(pid))
+        self._maybe_compact()
+        self.knn.build(self.vectors[:len(self._ids)])
+
+    def _add(self, product: Dict[str, Any], terms: Tuple[str, ...], n: int):
+        slot = len(self._ids)
+        if slot >= self._capacity:
+            self._alloc(self._capacity * 2)
+        pid = str(product["id"])
+        category = str(getattr(product.get("category"), "value", product.get("category")) or "other")
+        code = self._category_codes.setdefault(category, len(self._category_codes))
+
+        self.vectors[slot] = self._vectorize(terms, n)
+        lab = shade_to_lab(product.get("shade"))
+        self.has_lab[slot] = lab is not None
+        if lab is not None:
+            self.lab[slot] = lab
+        self.price[slot] = float(product.get("price") or 0.0)
+        self.in_stock[slot] = bool(product.get("in_stock", True))
+        self.category[slot] = code
+        self.alive[slot] = True
+
+        self._ids.append(pid)
+        self._terms_of.append(terms)
+        self._slot_of[pid] = slot
+
+    def _remove(self, pid: str) -> bool:
+        slot = self._slot_of.pop(pid, None)
+        if slot is None:
+            return False
+        for term in self._terms_of[slot]:
+            self._df[term] -= 1
+        self.alive[slot] = False
+        self._ids[slot] = None
+        return True
+
+    def _maybe_compact(self):
+        """Drop tombstoned rows once they are a quarter of the table"""
+        n = len(self._ids)
+        dead = n - len(self._slot_of)
+        if dead <= 1024 or dead * 4 <= n:
+            return
+        keep = np.flatnonzero(self.alive[:n])
+        for name in ("vectors", "lab", "has_lab", "price", "in_stock", "alive", "category"):
+            array = getattr(self, name)
+            array[:keep.size] = array[keep]
+            array[keep.size:n] = 0
+        self._ids = [self._ids[i] for i in keep]
+        self._terms_of = [self._terms_of[i] for i in keep]
+        self._slot_of = {pid: slot for slot, pid in enumerate(self._ids)}
+
+    # ============================================================
+    # 🔎 QUERIES
+    # ============================================================
+    def substitutes(
+        self,
+        product: Dict[str, Any],
+        k: int = 5,
+        mode: str = MODE_BLEND,
+        category: Optional[str] = None,
+        max_price: Optional[float] = None,
+        exclude_ids: Iterable[Any] = (),
+    ) -> List[Tuple[str, float]]:
+        """
+        (product id, similarity 0-1) of the k most similar in-stock products.
+        `max_price` is exclusive ("cheaper than"); `category` defaults to the
+        product's own.
+        """
+        n = len(self._ids)
+        if n == 0 or k <= 0:
+            return []
+
+        mask = self.alive[:n] & self.in_stock[:n]
+        category = category or product.get("category")
+        if category:
+            code = self._category_codes.get(str(getattr(category, "value", category)))
+            if code is None:
+                return []
+            mask &= self.category[:n] == code
+        if max_price is not None:
+            mask &= (self.price[:n] > 0) & (self.price[:n] < max_price)
+        for pid in (*exclude_ids, product.get("id")):
+            slot = self._slot_of.get(str(pid)) if pid is not None else None
+            if slot is not None:
+                mask[slot] = False
+
+        vector, lab = self.query_vectors(product)
+        use_formula = mode != MODE_SHADE and bool(vector.any())
+        use_shade = mode != MODE_FORMULA and lab is not None
+        if not use_formula and not use_shade:
+            return []
+        if not use_formula:
+            mask &= self.has_lab[:n]
+
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0:
+            return []
+
+        if use_formula:
+            pool = k * BLEND_OVERSAMPLE if use_shade else k
+            candidates, scores = self.knn.search(self.vectors, vector, candidates, min(pool, candidates.size))
+            scores = np.clip(scores, 0.0, 1.0)
+        if use_shade:
+            distance = np.linalg.norm(self.lab[candidates] - lab.astype(np.float32), axis=1)
+            shade = np.where(self.has_lab[candidates], np.clip(1 - distance / SHADE_FALLOFF, 0.0, 1.0), 0.0)
+            scores = (1 - SHADE_WEIGHT) * scores + SHADE_WEIGHT * shade if use_formula else shade
+
+        best = np.argsort(-scores, kind="stable")[:k]
+        return [(self._ids[candidates[i]], float(scores[i])) for i in best if scores[i] > 0]
@@ -0,0 +1,192 @@
+"""
+GlamAI - Materialized Trending Feed
+Per-category trending lists recomputed on a schedule and served from memory
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.singleflight import SingleFlight
+
+try:  # optional shared tier so every worker serves the same materialized feed
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+# Recomputes the `size` most popular products of a category (None = all categories)
+ComputeFn = Callable[[Optional[str], int], Awaitable[List[Dict[str, Any]]]]
+
+_ALL = "*"
+_REDIS_PREFIX = "glamai:trending:"
+
+
+@dataclass
+class _Feed:
+    products: List[Dict[str, Any]]
+    computed_at: float  # wall clock, comparable across workers via the shared tier
+    stale: bool = False
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.computed_at
+
+
+class TrendingFeed:
+    """
+    Materialized trending lists, one per category.
+
+    Reads are a dict lookup and a slice. An entry older than `fresh_seconds`
+    (or invalidated) is still served while one background recompute per
+    category replaces it (stale-while-revalidate); only an entry older than
+    `max_stale_seconds`, or a first read, waits for the recompute. A
+    scheduler recomputes every category that has been read so far. With
+    TRENDING_SHARED_CACHE the lists are also kept in Redis so other workers
+    start warm.
+    """
+
+    def __init__(self, compute: ComputeFn):
+        self._compute = compute
+        self.size = settings.TRENDING_FEED_SIZE
+        self.fresh_seconds = settings.TRENDING_REFRESH_SECONDS
+        self.max_stale_seconds = settings.TRENDING_MAX_STALE_SECONDS
+        self._feeds: Dict[str, _Feed] = {}
+        self._flight = SingleFlight("trending_feed")
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ============================================================
+    # 📤 READS
+    # ============================================================
+    async def get(self, category: Optional[str] = None, top: int = 10) -> List[Dict[str, Any]]:
+        if top > self.size:
+            metrics.incr("trending_feed_reads_total", outcome="bypass")
+            return await self._compute(category, top)
+
+        key = category or _ALL
+        feed = self._feeds.get(key)
+        if feed is None:
+            feed = await self._load_shared(key)
+
+        if feed is None or feed.age > self.max_stale_seconds:
+            metrics.incr("trending_feed_reads_total", outcome="miss")
+            feed = await self._refresh(key)
+        elif feed.stale or feed.age > self.fresh_seconds:
+            metrics.incr("trending_feed_reads_total", outcome="stale")
+            self._revalidate(key)
+        else:
+            metrics.incr("trending_feed_reads_total", outcome="hit")
+
+        self.start()
+        return [dict(p) for p in feed.products[:top]]
+
+    def invalidate(self, category: Optional[str] = None):
+        """
+        Catalog changed: mark one category (or every feed) stale so the next
+        read revalidates it in the background.
+        """
+        keys = list(self._feeds) if category is None else [category, _ALL]
+        for key in keys:
+            feed = self._feeds.get(key)
+            if feed is not None:
+                feed.stale = True
+        if self._client() is not None:
+            asyncio.ensure_future(self._drop_shared(keys))
+        metrics.incr("trending_feed_invalidations_total")
+
+    # ============================================================
+    # 🔄 RECOMPUTE
+    # ============================================================
+    async def _refresh(self, key: str) -> _Feed:
+        return await self._flight.do(key, lambda: self._recompute(key), label="trending")
+
+    async def _recompute(self, key: str) -> _Feed:
+        start = time.perf_counter()
+        products = await self._compute(None if key == _ALL else key, self.size)
+        feed = _Feed(products=products, computed_at=time.time())
+        self._feeds[key] = feed
+        metrics.observe("trending_feed_recompute_ms", (time.perf_counter() - start) * 1000)
+        await self._store_shared(key, feed)
+        return feed
+
+    def _revalidate(self, key: str):
+        async def run():
+            try:
+                await self._refresh(key)
+            except Exception as e:
+                metrics.incr("trending_feed_refresh_errors_total")
+                logger.warning(f"⚠️ Trending feed refresh for {key} failed, serving stale: {e}")
+
+        asyncio.ensure_future(run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.fresh_seconds)
+            for key in list(self._feeds):
+                self._revalidate(key)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    # ============================================================
+    # 🗄️ SHARED TIER (optional Redis)
+    # ============================================================
+    def _client(self):
+        if not settings.TRENDING_SHARED_CACHE or aioredis is None:
+            return None
+        if self._redis is None:
+            self._redis = aioredis.from_url(settings.REDIS_URL)
+        return self._redis
+
+    async def _load_shared(self, key: str) -> Optional[_Feed]:
+        client = self._client()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(_REDIS_PREFIX + key)
+            if raw is None:
+                return None
+            data = json.loads(raw)
+            feed = _Feed(products=data["products"], computed_at=data["computed_at"])
+        except Exception as e:
+            logger.warning(f"⚠️ Trending feed shared read failed: {e}")
+            return None
+        self._feeds[key] = feed
+        metrics.incr("trending_feed_shared_hits_total")
+        return feed
+
+    async def _store_shared(self, key: str, feed: _Feed):
+        client = self._client()
+        if client is None:
+            return
+        try:
+            payload = json.dumps({"products": feed.products, "computed_at": feed.computed_at}, default=str)
+            await client.set(_REDIS_PREFIX + key, payload, ex=int(self.max_stale_seconds))
+        except Exception as e:
+            logger.warning(f"⚠️ Trending feed shared write failed: {e}")
+
+    async def _drop_shared(self, keys: List[str]):
+        try:
+            if keys:
+                await self._client().delete(*(_REDIS_PREFIX + key for key in keys))
+        except Exception as e:
+            logger.warning(f"⚠️ Trending feed shared invalidation failed: {e}")
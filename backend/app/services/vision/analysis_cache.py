@@ -0,0 +1,206 @@
+"""
+GlamAI - Skin Analysis Result Cache
+Content-addressed cache in front of the Azure / GPT-4o face analysis
+
+Two keys per entry:
+- exact: sha256 of the uploaded bytes (identical re-upload)
+- near:  64-bit dHash of the face crop (same selfie re-encoded, resized, etc.)
+
+Two tiers:
+- memory: per-process LRU
+- db:     `skin_analysis_cache` table, shared by every worker and restart
+
+Entries are scoped to the user who uploaded the photo (a near match must
+never hand one person's analysis to another) and to an analysis version,
+so bumping the version invalidates everything produced by the previous
+algorithm.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from loguru import logger
+from sqlalchemy import select, update, or_
+from sqlalchemy.dialects.postgresql import insert
+import json
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.database import AsyncSessionLocal
+from app.models.cache import SkinAnalysisCacheEntry
+from app.services.vision.hashing import (
+    hamming, hash_bands, to_signed64, from_signed64
+)
+
+
+class SkinAnalysisCache:
+    """Exact + perceptual-hash cache of serialized SkinAnalysisResult dicts"""
+
+    def __init__(self, maxsize: int = 256, max_distance: int = 3):
+        self.max_distance = max_distance
+        self._memory = LRUCache(maxsize=maxsize)  # (user_id, version, content_hash) -> entry
+
+    # ========================================
+    # Lookups
+    # ========================================
+    async def get_exact(self, user_id: int, content_hash: str, version: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get((user_id, version, content_hash))
+        if entry is not None:
+            self._record_hit("memory", "exact")
+            return entry["result"]
+
+        row = await self._db_fetch_exact(user_id, content_hash, version)
+        if row is not None:
+            self._remember(user_id, content_hash, version, row["face_hash"], row["result"])
+            self._record_hit("db", "exact")
+            return row["result"]
+
+        metrics.incr("analysis_cache_misses_total", match="exact")
+        return None
+
+    async def get_similar(self, user_id: int, face_hash: Optional[int], version: str) -> Optional[Dict[str, Any]]:
+        if face_hash is None:
+            return None
+
+        entry = self._memory.find(
+            lambda key, value: key[:2] == (user_id, version)
+            and value["face_hash"] is not None
+            and hamming(value["face_hash"], face_hash) <= self.max_distance
+        )
+        if entry is not None:
+            self._record_hit("memory", "near")
+            return entry["result"]
+
+        row = await self._db_fetch_similar(user_id, face_hash, version)
+        if row is not None:
+            self._record_hit("db", "near")
+            return row["result"]
+
+        metrics.incr("analysis_cache_misses_total", match="near")
+        return None
+
+    # ========================================
+    # Writes
+    # ========================================
+    async def put(
+        self,
+        user_id: int,
+        content_hash: str,
+        face_hash: Optional[int],
+        version: str,
+        result: Dict[str, Any]
+    ):
+        result = json.loads(json.dumps(result, default=float))  # JSON-safe copy
+        self._remember(user_id, content_hash, version, face_hash, result)
+
+        bands = hash_bands(face_hash) if face_hash is not None else [None] * 4
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    insert(SkinAnalysisCacheEntry)
+                    .values(
+                        user_id=user_id,
+                        content_hash=content_hash,
+                        analysis_version=version,
+                        face_hash=to_signed64(face_hash) if face_hash is not None else None,
+                        band_0=bands[0],
+                        band_1=bands[1],
+                        band_2=bands[2],
+                        band_3=bands[3],
+                        result=result,
+                        hit_count=0
+                    )
+                    .on_conflict_do_nothing(constraint="uq_skin_analysis_cache_user_hash_version")
+                )
+                await session.commit()
+        except Exception as e:
+            logger.warning(f"Analysis cache write failed: {str(e)}")
+
+    def clear_memory(self):
+        self._memory.clear()
+
+    # ========================================
+    # Internals
+    # ========================================
+    def _remember(self, user_id: int, content_hash: str, version: str, face_hash: Optional[int], result: Dict[str, Any]):
+        self._memory.set((user_id, version, content_hash), {"face_hash": face_hash, "result": result})
+
+    def _record_hit(self, tier: str, match: str):
+        metrics.incr("analysis_cache_hits_total", tier=tier, match=match)
+        logger.info(f"♻️ Skin analysis cache hit ({match}, {tier})")
+
+    async def _db_fetch_exact(self, user_id: int, content_hash: str, version: str) -> Optional[Dict[str, Any]]:
+        try:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    select(SkinAnalysisCacheEntry).where(
+                        SkinAnalysisCacheEntry.user_id == user_id,
+                        SkinAnalysisCacheEntry.content_hash == content_hash,
+                        SkinAnalysisCacheEntry.analysis_version == version
+                    )
+                )
+                entry = result.scalar_one_or_none()
+                if entry is None:
+                    return None
+                await self._touch(session, entry.id)
+                return self._row_dict(entry)
+        except Exception as e:
+            logger.warning(f"Analysis cache lookup failed: {str(e)}")
+            return None
+
+    async def _db_fetch_similar(self, user_id: int, face_hash: int, version: str) -> Optional[Dict[str, Any]]:
+        bands = hash_bands(face_hash)
+        try:
+            async with AsyncSessionLocal() as session:
+                # LSH: candidates share at least one 16-bit band, verified by Hamming distance
+                result = await session.execute(
+                    select(SkinAnalysisCacheEntry)
+                    .where(
+                        SkinAnalysisCacheEntry.user_id == user_id,
+                        SkinAnalysisCacheEntry.analysis_version == version,
+                        or_(
+                            SkinAnalysisCacheEntry.band_0 == bands[0],
+                            SkinAnalysisCacheEntry.band_1 == bands[1],
+                            SkinAnalysisCacheEntry.band_2 == bands[2],
+                            SkinAnalysisCacheEntry.band_3 == bands[3]
+                        )
+                    )
+                    .limit(50)
+                )
+                best, best_distance = None, self.max_distance + 1
+                for entry in result.scalars():
+                    distance = hamming(from_signed64(entry.face_hash), face_hash)
+                    if distance < best_distance:
+                        best, best_distance = entry, distance
+                if best is None:
+                    return None
+                await self._touch(session, best.id)
+                return self._row_dict(best)
+        except Exception as e:
+            logger.warning(f"Analysis cache near lookup failed: {str(e)}")
+            return None
+
+    async def _touch(self, session, entry_id: int):
+        await session.execute(
+            update(SkinAnalysisCacheEntry)
+            .where(SkinAnalysisCacheEntry.id == entry_id)
+            .values(
+                hit_count=SkinAnalysisCacheEntry.hit_count + 1,
+                last_hit_at=datetime.now(timezone.utc)
+            )
+        )
+        await session.commit()
+
+    @staticmethod
+    def _row_dict(entry: SkinAnalysisCacheEntry) -> Dict[str, Any]:
+        return {
+            "face_hash": from_signed64(entry.face_hash) if entry.face_hash is not None else None,
+            "result": entry.result
+        }
+
+
+# Singleton instance
+analysis_cache = SkinAnalysisCache(
+    maxsize=settings.VISION_CACHE_SIZE,
+    max_distance=settings.VISION_CACHE_MAX_DISTANCE
+)
@@ -0,0 +1,50 @@
+"""
+GlamAI - Image Hashing
+Exact and perceptual hashes used to key cached skin analyses
+"""
+
+from typing import List
+import hashlib
+import cv2
+import numpy as np
+
+HASH_BITS = 64
+BAND_BITS = 16
+BAND_COUNT = HASH_BITS // BAND_BITS
+
+
+def content_hash(image_bytes: bytes) -> str:
+    """sha256 of the raw upload (exact re-upload key)"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def dhash(gray: np.ndarray, hash_size: int = 8) -> int:
+    """
+    64-bit difference hash of a grayscale crop.
+    Robust to re-encoding, resizing and small exposure changes.
+    """
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def hash_bands(value: int) -> List[int]:
+    """
+    Split a 64-bit hash into 16-bit LSH bands. Two hashes within
+    Hamming distance < BAND_COUNT always share at least one band.
+    """
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (i * BAND_BITS)) & mask for i in range(BAND_COUNT)]
+
+
+def to_signed64(value: int) -> int:
+    """Fit an unsigned 64-bit hash into a Postgres BIGINT"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def from_signed64(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
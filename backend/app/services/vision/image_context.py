@@ -0,0 +1,77 @@
+"""
+GlamAI - Shared Image Context
+Decode an upload once and share it across every vision stage
+"""
+
+from typing import Dict, Optional, Tuple
+from PIL import Image, ImageOps
+import io
+import cv2
+import numpy as np
+
+
+class ImageContext:
+    """
+    Per-request decoded image.
+
+    - `working`: EXIF-orientation-corrected BGR array capped at `max_side`
+      (JPEGs are DCT-downscaled while decoding, so the full-resolution
+      bitmap of a 12 MP photo is never materialised)
+    - `gray`: lazily computed grayscale view of `working`
+
+    Coordinates reported by stages (face bbox etc.) are in `working` space;
+    use `scale` to map them back to the original upload.
+    """
+
+    def __init__(self, working: np.ndarray, original_size: Tuple[int, int], source_format: Optional[str]):
+        self.working = working
+        self.original_size = original_size  # (width, height) after orientation fix
+        self.source_format = source_format
+        self._gray: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_bytes(cls, image_bytes: bytes, max_side: int = 1600) -> "ImageContext":
+        try:
+            pil_image = Image.open(io.BytesIO(image_bytes))
+        except Exception as e:
+            raise ValueError(f"Failed to decode image: {e}")
+
+        source_format = (pil_image.format or "").lower() or None
+        width, height = pil_image.size
+        if pil_image.getexif().get(0x0112, 1) in (5, 6, 7, 8):  # rotated 90/270 degrees
+            width, height = height, width
+
+        # Let the JPEG decoder skip detail we are about to throw away
+        if pil_image.format == "JPEG" and max(width, height) > max_side:
+            pil_image.draft("RGB", (max_side, max_side))
+
+        pil_image = ImageOps.exif_transpose(pil_image)
+        if pil_image.mode != "RGB":
+            pil_image = pil_image.convert("RGB")
+
+        if max(pil_image.size) > max_side:
+            pil_image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        working = cv2.cvtColor(np.asarray(pil_image), cv2.COLOR_RGB2BGR)
+        return cls(working, (width, height), source_format)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        """(width, height) of the working copy"""
+        return self.working.shape[1], self.working.shape[0]
+
+    @property
+    def scale(self) -> float:
+        """Working-copy pixels per original pixel"""
+        return self.working.shape[1] / float(self.original_size[0] or 1)
+
+    def to_original(self, bbox: Dict[str, int]) -> Dict[str, int]:
+        """Map an {x, y, width, height} box from working-copy to original pixels"""
+        ratio = 1.0 / (self.scale or 1.0)
+        return {key: int(round(value * ratio)) for key, value in bbox.items()}
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.working, cv2.COLOR_BGR2GRAY)
+        return self._gray
@@ -0,0 +1,447 @@
+"""
+GlamAI - Local Vision Stages
+CPU-bound OpenCV stages for skin analysis.
+
+These are plain module-level functions so they can be shipped to the
+vision worker pool processes. Keep this module free of Azure/OpenAI
+clients and app settings: it is imported inside every worker.
+"""
+
+from loguru import logger
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple
+from enum import Enum
+import time
+import cv2
+import numpy as np
+
+from app.services.vision.image_context import ImageContext
+from app.services.vision.hashing import dhash
+from app.services.vision.local_tier import assess_local_tier
+from app.services.vision.payload import build_face_payload
+from app.services.vision.region_stats import compute_region_stats
+
+
+class SkinToneCategory(str, Enum):
+    """Fitzpatrick Scale based skin tone categories"""
+    VERY_FAIR = "Very Fair"  # Type I
+    FAIR = "Fair"  # Type II
+    LIGHT = "Light"  # Type III
+    MEDIUM = "Medium"  # Type IV
+    TAN = "Tan"  # Type V
+    DEEP = "Deep"  # Type VI
+
+
+class UndertoneType(str, Enum):
+    WARM = "Warm"
+    COOL = "Cool"
+    NEUTRAL = "Neutral"
+    OLIVE = "Olive"
+
+
+class SkinType(str, Enum):
+    OILY = "Oily"
+    DRY = "Dry"
+    COMBINATION = "Combination"
+    NORMAL = "Normal"
+    SENSITIVE = "Sensitive"
+
+
+@dataclass
+class DetectionOptions:
+    """
+    Face detection settings shipped to the worker with each job.
+
+    - backend: "haar" (default) or "dnn" (OpenCV res10 SSD, needs model files)
+    - detect_max_side: faces are searched on a gray copy downscaled to this
+      size and the bbox is mapped back (0 = search the working copy as-is)
+    - min_face_ratio: smallest face to look for, as a fraction of the
+      shorter image side (prunes the small pyramid levels)
+    - detect_eyes: the eye cascade only runs when a caller needs the count
+    """
+    backend: str = "haar"
+    detect_max_side: int = 480
+    min_face_ratio: float = 0.15
+    detect_eyes: bool = False
+    dnn_prototxt: Optional[str] = None
+    dnn_model: Optional[str] = None
+    dnn_confidence: float = 0.6
+
+
+# Detectors are loaded once per process (main process or pool worker)
+_CASCADES: Dict[str, cv2.CascadeClassifier] = {}
+_DNN_NETS: Dict[Tuple[str, str], Any] = {}
+
+
+def _get_cascade(name: str) -> cv2.CascadeClassifier:
+    cascade = _CASCADES.get(name)
+    if cascade is None:
+        cascade = cv2.CascadeClassifier(cv2.data.haarcascades + name)
+        _CASCADES[name] = cascade
+    return cascade
+
+
+def _get_dnn(prototxt: str, model: str) -> Any:
+    key = (prototxt, model)
+    net = _DNN_NETS.get(key)
+    if net is None:
+        net = cv2.dnn.readNetFromCaffe(prototxt, model)
+        _DNN_NETS[key] = net
+    return net
+
+
+def warm_up():
+    """Pool initializer: load cascades before the first request hits the worker"""
+    _get_cascade("haarcascade_frontalface_default.xml")
+    _get_cascade("haarcascade_eye.xml")
+
+
+def _detect_haar(gray: np.ndarray, options: DetectionOptions) -> List[Tuple[int, int, int, int]]:
+    min_side = max(24, int(min(gray.shape[:2]) * options.min_face_ratio))
+    faces = _get_cascade("haarcascade_frontalface_default.xml").detectMultiScale(
+        gray, 1.1, 4, minSize=(min_side, min_side)
+    )
+    return [tuple(int(v) for v in face) for face in faces]
+
+
+def _detect_dnn(bgr: np.ndarray, options: DetectionOptions) -> List[Tuple[int, int, int, int]]:
+    net = _get_dnn(options.dnn_prototxt, options.dnn_model)
+    h, w = bgr.shape[:2]
+    blob = cv2.dnn.blobFromImage(cv2.resize(bgr, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
+    net.setInput(blob)
+    detections = net.forward()
+
+    min_side = min(h, w) * options.min_face_ratio
+    faces = []
+    for i in range(detections.shape[2]):
+        if detections[0, 0, i, 2] < options.dnn_confidence:
+            continue
+        x0, y0, x1, y1 = (detections[0, 0, i, 3:7] * np.array([w, h, w, h])).astype(int)
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(w, x1), min(h, y1)
+        if min(x1 - x0, y1 - y0) >= min_side:
+            faces.append((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
+    return faces
+
+
+def detect_faces(ctx: ImageContext, options: DetectionOptions) -> List[Tuple[int, int, int, int]]:
+    """Face boxes (x, y, w, h) in working-copy coordinates"""
+    if options.backend == "dnn" and options.dnn_prototxt and options.dnn_model:
+        try:
+            # The SSD resizes to 300x300 itself, no pyramid to prune
+            return _detect_dnn(ctx.working, options)
+        except Exception as e:
+            logger.warning(f"DNN face detector unavailable, falling back to Haar: {str(e)}")
+
+    gray = ctx.gray
+    factor = 1.0
+    if options.detect_max_side and max(gray.shape[:2]) > options.detect_max_side:
+        factor = options.detect_max_side / float(max(gray.shape[:2]))
+
+    small = gray
+    if factor < 1.0:
+        small = cv2.resize(
+            gray,
+            (int(gray.shape[1] * factor), int(gray.shape[0] * factor)),
+            interpolation=cv2.INTER_AREA
+        )
+    return [
+        (int(x / factor), int(y / factor), int(w / factor), int(h / factor))
+        for x, y, w, h in _detect_haar(small, options)
+    ]
+
+
+def extract_face_features(
+    ctx: ImageContext,
+    options: Optional[DetectionOptions] = None
+) -> Optional[Dict[str, Any]]:
+    """Extract detailed face features using OpenCV"""
+    options = options or DetectionOptions()
+    try:
+        gray = ctx.gray
+
+        # Detect faces
+        faces = detect_faces(ctx, options)
+
+        if len(faces) == 0:
+            logger.warning("No face detected")
+            return None
+
+        # Get largest face
+        x, y, w, h = max(faces, key=lambda face: face[2] * face[3])
+        face_bgr = ctx.working[y:y+h, x:x+w]
+        face_gray = gray[y:y+h, x:x+w]
+
+        # Detect eyes (only on request; None means "not checked")
+        eyes_detected = None
+        if options.detect_eyes:
+            eyes_detected = len(_get_cascade("haarcascade_eye.xml").detectMultiScale(face_gray))
+
+        return {
+            "face_bbox": {"x": int(x), "y": int(y), "width": int(w), "height": int(h)},
+            "face_bgr": face_bgr,
+            "eyes_detected": eyes_detected,
+            "image_size": ctx.working.shape,
+            "original_size": ctx.original_size,
+            "gray_face": face_gray
+        }
+
+    except Exception as e:
+        logger.error(f"Face feature extraction error: {str(e)}")
+        return None
+
+
+def face_region_stats(face_data: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Per-region statistics for the face crop, computed once and memoised on face_data"""
+    if "region_stats" not in face_data:
+        face_bgr = face_data.get("face_bgr")
+        face_data["region_stats"] = compute_region_stats(face_bgr) if face_bgr is not None else {}
+    return face_data["region_stats"]
+
+
+def classify_texture(texture_std: float, texture_variance: float) -> Dict[str, Any]:
+    """Texture score and pore visibility from gray std / Laplacian variance"""
+    # Normalize texture score (0-1, higher is smoother)
+    texture_score = 1.0 - min(texture_std / 50.0, 1.0)
+
+    # Determine pore visibility
+    if texture_variance > 500:
+        pore_visibility = "large"
+    elif texture_variance > 200:
+        pore_visibility = "medium"
+    else:
+        pore_visibility = "fine"
+
+    return {
+        "texture_score": float(texture_score),
+        "texture_std": float(texture_std),
+        "texture_variance": float(texture_variance),
+        "pore_visibility": pore_visibility
+    }
+
+
+def classify_skin_color(
+    rgb_values: np.ndarray,
+    hsv_values: np.ndarray,
+    lab_values: np.ndarray
+) -> Dict[str, Any]:
+    """Skin tone (Fitzpatrick) and undertone from mean skin colour"""
+    # Determine skin tone based on brightness
+    brightness = np.mean(rgb_values)
+
+    if brightness > 220:
+        tone = SkinToneCategory.VERY_FAIR
+        fitzpatrick = "Type I"
+    elif brightness > 200:
+        tone = SkinToneCategory.FAIR
+        fitzpatrick = "Type II"
+    elif brightness > 170:
+        tone = SkinToneCategory.LIGHT
+        fitzpatrick = "Type III"
+    elif brightness > 140:
+        tone = SkinToneCategory.MEDIUM
+        fitzpatrick = "Type IV"
+    elif brightness > 110:
+        tone = SkinToneCategory.TAN
+        fitzpatrick = "Type V"
+    else:
+        tone = SkinToneCategory.DEEP
+        fitzpatrick = "Type VI"
+
+    # Determine undertone using LAB color space
+    a_value = lab_values[1]  # Green-Red axis
+    b_value = lab_values[2]  # Blue-Yellow axis
+
+    if b_value > 128 and a_value > 128:
+        undertone = UndertoneType.WARM
+    elif b_value < 128 and a_value < 128:
+        undertone = UndertoneType.COOL
+    elif abs(a_value - 128) < 10 and abs(b_value - 128) < 10:
+        undertone = UndertoneType.NEUTRAL
+    else:
+        undertone = UndertoneType.OLIVE
+
+    # Convert RGB to hex
+    hex_color = "#{:02x}{:02x}{:02x}".format(
+        int(rgb_values[0]),
+        int(rgb_values[1]),
+        int(rgb_values[2])
+    )
+
+    return {
+        "skin_tone": tone.value,
+        "fitzpatrick_scale": fitzpatrick,
+        "undertone": undertone.value,
+        "hex_color": hex_color,
+        "rgb_values": [float(v) for v in rgb_values],
+        "hsv_values": [float(v) for v in hsv_values],
+        "lab_values": [float(v) for v in lab_values],
+        "brightness": float(brightness)
+    }
+
+
+def analyze_skin_texture(face_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Analyze skin texture using image processing"""
+    try:
+        stats = face_region_stats(face_data)
+
+        # Analyze cheek region for texture:
+        # std (roughness) and Laplacian variance (edges/pores)
+        cheek = stats.get("right_cheek")
+        if not cheek:
+            return {"texture_score": 0.5, "pore_visibility": "medium"}
+
+        texture = classify_texture(cheek["gray_std"], cheek["laplacian_var"])
+        texture["regions"] = {
+            region: {
+                "texture_std": values["gray_std"],
+                "texture_variance": values["laplacian_var"],
+                "skin_fraction": values["skin_fraction"]
+            }
+            for region, values in stats.items()
+        }
+        return texture
+
+    except Exception as e:
+        logger.warning(f"Texture analysis error: {str(e)}")
+        return {"texture_score": 0.5, "pore_visibility": "medium"}
+
+
+def analyze_skin_color(face_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Detailed color analysis for skin tone and undertone"""
+    try:
+        stats = face_region_stats(face_data)
+
+        # Cheek drives tone/undertone; other regions are reported alongside
+        cheek = stats.get("right_cheek")
+
+        if not cheek:
+            return {}
+
+        color = classify_skin_color(
+            np.array(cheek["rgb_mean"]),
+            np.array(cheek["hsv_mean"]),
+            np.array(cheek["lab_mean"])
+        )
+        color["regions"] = {}
+        for region, values in stats.items():
+            region_color = classify_skin_color(
+                np.array(values["rgb_mean"]),
+                np.array(values["hsv_mean"]),
+                np.array(values["lab_mean"])
+            )
+            color["regions"][region] = {
+                "skin_tone": region_color["skin_tone"],
+                "undertone": region_color["undertone"],
+                "hex_color": region_color["hex_color"],
+                "lab_mean": values["lab_mean"],
+                "lab_median": values["lab_median"]
+            }
+        return color
+
+    except Exception as e:
+        logger.warning(f"Color analysis error: {str(e)}")
+        return {
+            "skin_tone": "Medium",
+            "undertone": "Neutral",
+            "hex_color": "#C8A882"
+        }
+
+
+def aggregate_local_results(results: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Combine texture/color from several photos of the same face.
+    Medians of the underlying measurements are re-classified, so one
+    badly lit photo cannot flip tone or undertone on its own.
+    """
+    textures = [r["texture"] for r in results if "texture_std" in r.get("texture", {})]
+    colors = [r["color"] for r in results if "rgb_values" in r.get("color", {})]
+
+    texture = {"texture_score": 0.5, "pore_visibility": "medium"}
+    if textures:
+        texture = classify_texture(
+            float(np.median([t["texture_std"] for t in textures])),
+            float(np.median([t["texture_variance"] for t in textures]))
+        )
+        texture["per_image"] = [classify_texture(t["texture_std"], t["texture_variance"]) for t in textures]
+
+    color: Dict[str, Any] = {}
+    if colors:
+        color = classify_skin_color(
+            np.median([c["rgb_values"] for c in colors], axis=0),
+            np.median([c["hsv_values"] for c in colors], axis=0),
+            np.median([c["lab_values"] for c in colors], axis=0)
+        )
+        color["per_image"] = [
+            {k: c[k] for k in ("skin_tone", "undertone", "hex_color") if k in c} for c in colors
+        ]
+    return texture, color
+
+
+def run_local_analysis(
+    image_bytes: bytes,
+    max_side: int = 1600,
+    detail_policy: str = "auto",
+    crop_margin: float = 0.25,
+    max_tiles: int = 4,
+    detection: Optional[DetectionOptions] = None
+) -> Dict[str, Any]:
+    """
+    Run all local stages in a single worker hop on one shared ImageContext.
+    Only small, picklable results are returned (numpy crops stay in the worker);
+    `payload` is the face-cropped VisionPayload for the GPT-4o request.
+    """
+    timings: Dict[str, float] = {}
+
+    start = time.perf_counter()
+    ctx = ImageContext.from_bytes(image_bytes, max_side=max_side)
+    timings["decode"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    face_data = extract_face_features(ctx, detection)
+    timings["face_detection"] = (time.perf_counter() - start) * 1000
+
+    if not face_data:
+        return {"face_data": None, "texture": {}, "color": {}, "timings": timings}
+
+    start = time.perf_counter()
+    face_region_stats(face_data)
+    timings["region_stats"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    texture = analyze_skin_texture(face_data)
+    timings["texture"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    color = analyze_skin_color(face_data)
+    timings["color"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    local_tier = assess_local_tier(color, face_region_stats(face_data))
+    timings["local_tier"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    payload = build_face_payload(
+        ctx,
+        face_data["face_bbox"],
+        policy=detail_policy,
+        margin=crop_margin,
+        max_tiles=max_tiles
+    )
+    timings["encode"] = (time.perf_counter() - start) * 1000
+
+    return {
+        "face_data": {
+            # Full-resolution coordinates; everything above ran on the working copy
+            "face_bbox": ctx.to_original(face_data["face_bbox"]),
+            "eyes_detected": face_data["eyes_detected"],
+            "image_size": tuple(int(d) for d in face_data["image_size"]),
+            "original_size": face_data["original_size"],
+        },
+        "texture": texture,
+        "color": color,
+        "local_tier": local_tier,
+        "face_hash": dhash(face_data["gray_face"]),
+        "payload": payload,
+        "timings": timings,
+    }
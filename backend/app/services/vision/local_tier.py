@@ -0,0 +1,140 @@
+"""
+GlamAI - Local-first Analysis Tier
+Confidence scoring for the OpenCV classification and cheap NumPy concern detectors.
+
+Runs inside the vision workers on the per-region statistics; the service
+only escalates to GPT-4o when the local confidence is below threshold.
+"""
+
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+from app.services.vision.region_stats import MIN_SKIN_FRACTION
+
+# Brightness cut points used by classify_skin_color (Fitzpatrick buckets)
+_BRIGHTNESS_THRESHOLDS = (110, 140, 170, 200, 220)
+
+# Margins (in 8-bit units) at which a classification counts as unambiguous
+_BRIGHTNESS_MARGIN = 10.0
+_UNDERTONE_MARGIN = 5.0
+
+_AGREEMENT_REGIONS = ("forehead", "left_cheek", "chin")
+
+
+def _undertone_margin(undertone: str, a_value: float, b_value: float) -> float:
+    """Distance of LAB a*/b* from the boundary of the chosen undertone class"""
+    da, db = a_value - 128, b_value - 128
+    if undertone == "Warm":
+        return min(da, db)
+    if undertone == "Cool":
+        return min(-da, -db)
+    if undertone == "Neutral":
+        return 10 - max(abs(da), abs(db))
+    return min(abs(da), abs(db))  # Olive: mixed signs, away from both axes
+
+
+def _region_agreement(color: Dict[str, Any], region_stats: Dict[str, Dict[str, Any]]) -> float:
+    """Share of other skin regions whose tone/undertone match the cheek's"""
+    votes: List[float] = []
+    for region in _AGREEMENT_REGIONS:
+        stats = region_stats.get(region)
+        other = color.get("regions", {}).get(region)
+        if not stats or not other or stats["skin_fraction"] < MIN_SKIN_FRACTION:
+            continue
+        votes.append(
+            (other["skin_tone"] == color.get("skin_tone")) * 0.5
+            + (other["undertone"] == color.get("undertone")) * 0.5
+        )
+    return float(np.mean(votes)) if votes else 0.5
+
+
+def detect_redness(region_stats: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Cheek/nose redness from a* elevation over the forehead/chin baseline"""
+    baseline = [region_stats[r]["lab_mean"][1] for r in ("forehead", "chin") if r in region_stats]
+    if not baseline:
+        return None
+    baseline_a = float(np.median(baseline))
+
+    deltas = {
+        location: max(region_stats[r]["lab_mean"][1] - baseline_a for r in regions)
+        for location, regions in (("cheeks", ("left_cheek", "right_cheek")), ("nose", ("nose",)))
+        if all(r in region_stats for r in regions)
+    }
+    flagged = {location: delta for location, delta in deltas.items() if delta > 5}
+    if not flagged:
+        return None
+
+    delta = max(flagged.values())
+    severity = "severe" if delta > 14 else "moderate" if delta > 9 else "mild"
+    return {
+        "type": "redness",
+        "severity": severity,
+        "locations": sorted(flagged),
+        "confidence": round(min(0.9, 0.5 + delta / 30), 2),
+        "detected_automatically": True,
+        "notes": f"a* +{delta:.1f} over forehead/chin"
+    }
+
+
+def detect_under_eye_darkness(region_stats: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Dark circles from the L* drop between the under-eye band and the cheeks"""
+    under_eye = region_stats.get("under_eye")
+    cheeks = [region_stats[r]["lab_mean"][0] for r in ("left_cheek", "right_cheek") if r in region_stats]
+    if not under_eye or not cheeks:
+        return None
+
+    delta = (float(np.mean(cheeks)) - under_eye["lab_mean"][0]) * 100 / 255  # 8-bit L -> L*
+    if delta <= 6:
+        return None
+
+    severity = "severe" if delta > 16 else "moderate" if delta > 10 else "mild"
+    return {
+        "type": "dark_circles",
+        "severity": severity,
+        "locations": ["around_eyes"],
+        "confidence": round(min(0.9, 0.5 + delta / 40), 2),
+        "detected_automatically": True,
+        "notes": f"L* -{delta:.1f} below cheeks"
+    }
+
+
+def assess_local_tier(
+    color: Dict[str, Any],
+    region_stats: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    """
+    Local estimate confidence (0-1) plus locally detected concerns.
+
+    Confidence blends how far brightness and LAB a*/b* sit from the
+    classification thresholds with how well the other skin regions agree.
+    """
+    if "brightness" not in color or "lab_values" not in color:
+        return {"confidence": 0.0, "components": {}, "concerns": []}
+
+    brightness = color["brightness"]
+    brightness_margin = min(abs(brightness - t) for t in _BRIGHTNESS_THRESHOLDS)
+    _, a_value, b_value = color["lab_values"]
+    undertone_margin = _undertone_margin(color.get("undertone", ""), a_value, b_value)
+
+    components = {
+        "brightness": float(np.clip(brightness_margin / _BRIGHTNESS_MARGIN, 0.0, 1.0)),
+        "undertone": float(np.clip(undertone_margin / _UNDERTONE_MARGIN, 0.0, 1.0)),
+        "region_agreement": _region_agreement(color, region_stats),
+    }
+    confidence = (
+        0.35 * components["brightness"]
+        + 0.35 * components["undertone"]
+        + 0.30 * components["region_agreement"]
+    )
+
+    # Mostly non-skin pixels in the reference region: do not trust the estimate
+    cheek = region_stats.get("right_cheek")
+    if not cheek or cheek["skin_fraction"] < 0.5:
+        confidence *= 0.5
+
+    concerns = [c for c in (detect_redness(region_stats), detect_under_eye_darkness(region_stats)) if c]
+    return {
+        "confidence": round(float(confidence), 3),
+        "components": components,
+        "concerns": concerns
+    }
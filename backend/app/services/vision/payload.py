@@ -0,0 +1,118 @@
+"""
+GlamAI - GPT-4o Vision Payload Optimizer
+Face-cropped, detail-aware image payloads for vision requests
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+import base64
+import math
+import cv2
+import numpy as np
+
+from app.services.vision.image_context import ImageContext
+
+# Azure OpenAI / OpenAI vision pricing model
+TILE_SIZE = 512
+LOW_DETAIL_TOKENS = 85
+TOKENS_PER_TILE = 170
+HIGH_DETAIL_MAX_SIDE = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+
+
+@dataclass
+class VisionPayload:
+    """Encoded image ready for an image_url content part"""
+    jpeg: bytes
+    detail: str  # "low" | "high"
+    width: int
+    height: int
+    estimated_tokens: int
+
+    def data_url(self) -> str:
+        return f"data:image/jpeg;base64,{base64.b64encode(self.jpeg).decode('utf-8')}"
+
+
+def estimate_image_tokens(width: int, height: int, detail: str) -> int:
+    """Prompt tokens the service bills for an image of this size"""
+    if detail == "low":
+        return LOW_DETAIL_TOKENS
+    w, h = _fit_high_detail(width, height)
+    tiles = math.ceil(w / TILE_SIZE) * math.ceil(h / TILE_SIZE)
+    return LOW_DETAIL_TOKENS + TOKENS_PER_TILE * tiles
+
+
+def _fit_high_detail(width: int, height: int) -> Tuple[int, int]:
+    """Server-side resize for high detail: fit 2048 square, then shortest side 768"""
+    factor = min(1.0, HIGH_DETAIL_MAX_SIDE / float(max(width, height)))
+    width, height = width * factor, height * factor
+    factor = min(1.0, HIGH_DETAIL_SHORT_SIDE / float(min(width, height)))
+    return int(width * factor), int(height * factor)
+
+
+def choose_detail(width: int, height: int, policy: str = "auto") -> str:
+    """
+    Pick the detail level for a crop.
+    `policy` is "low", "high" or "auto"; auto uses low detail when the crop
+    is small enough that high-detail tiling would add no real pixels.
+    """
+    if policy in ("low", "high"):
+        return policy
+    return "low" if max(width, height) <= TILE_SIZE * 1.25 else "high"
+
+
+def crop_face(ctx: ImageContext, bbox: Dict[str, Any], margin: float = 0.25) -> np.ndarray:
+    """Face crop (BGR, working-copy space) expanded by `margin` on every side"""
+    img_h, img_w = ctx.working.shape[:2]
+    x, y, w, h = bbox["x"], bbox["y"], bbox["width"], bbox["height"]
+    pad_x, pad_y = int(w * margin), int(h * margin)
+    x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+    x1, y1 = min(img_w, x + w + pad_x), min(img_h, y + h + pad_y)
+    return ctx.working[y0:y1, x0:x1]
+
+
+def _resize_to_budget(image: np.ndarray, detail: str, max_tiles: int) -> np.ndarray:
+    height, width = image.shape[:2]
+    if detail == "low":
+        factor = min(1.0, TILE_SIZE / float(max(width, height)))
+    else:
+        target_w, target_h = _fit_high_detail(width, height)
+        # Shrink further until the tile count fits the budget
+        while math.ceil(target_w / TILE_SIZE) * math.ceil(target_h / TILE_SIZE) > max_tiles:
+            target_w, target_h = int(target_w * 0.9), int(target_h * 0.9)
+        factor = target_w / float(width)
+
+    if factor >= 1.0:
+        return image
+    return cv2.resize(
+        image,
+        (max(1, int(width * factor)), max(1, int(height * factor))),
+        interpolation=cv2.INTER_AREA
+    )
+
+
+def build_face_payload(
+    ctx: ImageContext,
+    bbox: Dict[str, Any],
+    policy: str = "auto",
+    margin: float = 0.25,
+    max_tiles: int = 4,
+    quality: int = 85
+) -> VisionPayload:
+    """Crop the face with a margin, size it to the detail budget and re-encode"""
+    crop = crop_face(ctx, bbox, margin)
+    detail = choose_detail(crop.shape[1], crop.shape[0], policy)
+    resized = _resize_to_budget(crop, detail, max_tiles)
+
+    ok, encoded = cv2.imencode(".jpg", resized, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        raise ValueError("Failed to encode face crop")
+
+    height, width = resized.shape[:2]
+    return VisionPayload(
+        jpeg=encoded.tobytes(),
+        detail=detail,
+        width=width,
+        height=height,
+        estimated_tokens=estimate_image_tokens(width, height, detail)
+    )
@@ -0,0 +1,108 @@
+"""
+GlamAI - Face Region Statistics
+Per-region skin statistics computed from one set of colour conversions of the face crop
+"""
+
+from typing import Any, Dict, Tuple
+import cv2
+import numpy as np
+
+# Label 0 is background / non-skin
+REGION_LABELS: Tuple[str, ...] = ("forehead", "left_cheek", "right_cheek", "nose", "chin", "under_eye")
+
+# Skin pixels in YCrCb (Chai & Ngan style thresholds)
+_CR_RANGE = (133, 173)
+_CB_RANGE = (77, 127)
+
+# Below this share of skin pixels the mask is ignored for the region
+# (heavy makeup, colored lighting) so it still gets stats
+MIN_SKIN_FRACTION = 0.2
+
+
+def region_label_map(h: int, w: int) -> np.ndarray:
+    """uint8 label image with the classic forehead/cheeks/nose/chin layout plus under-eye"""
+    labels = np.zeros((h, w), dtype=np.uint8)
+    labels[0:h//3, w//4:3*w//4] = 1                 # forehead
+    labels[h//3:2*h//3, 0:w//3] = 2                 # left_cheek
+    labels[h//3:2*h//3, 2*w//3:w] = 3               # right_cheek
+    labels[h//3:2*h//3, w//3:2*w//3] = 4            # nose
+    labels[2*h//3:h, w//4:3*w//4] = 5               # chin
+    # Band just below both eyes, carved out of the cheek rows
+    eye_top, eye_bottom = int(h * 0.42), int(h * 0.52)
+    labels[eye_top:eye_bottom, w//8:3*w//8] = 6     # under_eye (left)
+    labels[eye_top:eye_bottom, 5*w//8:7*w//8] = 6   # under_eye (right)
+    return labels
+
+
+def skin_mask(face_bgr: np.ndarray) -> np.ndarray:
+    """uint8 mask (255 = skin) of skin-coloured pixels (drops hair, brows, eyes, background)"""
+    ycrcb = cv2.cvtColor(face_bgr, cv2.COLOR_BGR2YCrCb)
+    return cv2.inRange(ycrcb, (0, _CR_RANGE[0], _CB_RANGE[0]), (255, _CR_RANGE[1], _CB_RANGE[1]))
+
+
+def _masked_median(image: np.ndarray, channel: int, mask: np.ndarray, count: int) -> float:
+    """Median of one uint8 channel under `mask` from its 256-bin histogram"""
+    hist = cv2.calcHist([image], [channel], mask, [256], [0, 256]).ravel()
+    return float(np.searchsorted(np.cumsum(hist), (count + 1) // 2))
+
+
+def compute_region_stats(face_bgr: np.ndarray) -> Dict[str, Dict[str, Any]]:
+    """
+    Statistics for every face region from a single colour conversion per space.
+
+    Per region: pixel count, skin fraction, RGB/LAB/HSV means, LAB medians,
+    gray mean/std/median and Laplacian variance. Stats cover skin pixels only
+    unless the region has too few of them. Each region is reduced with masked
+    cv2.mean / cv2.meanStdDev / cv2.calcHist calls over its bounding box only.
+    """
+    h, w = face_bgr.shape[:2]
+    if h < 3 or w < 3:
+        return {}
+
+    # One conversion per colour space for the whole crop
+    lab = cv2.cvtColor(face_bgr, cv2.COLOR_BGR2LAB)
+    hsv = cv2.cvtColor(face_bgr, cv2.COLOR_BGR2HSV)
+    gray = cv2.cvtColor(face_bgr, cv2.COLOR_BGR2GRAY)
+    # int16 holds the default-aperture response of uint8 input exactly, cheaper than CV_64F
+    laplacian = cv2.Laplacian(gray, cv2.CV_16S)
+
+    base_labels = region_label_map(h, w)
+    skin = skin_mask(face_bgr)
+
+    stats: Dict[str, Dict[str, Any]] = {}
+    for index, region in enumerate(REGION_LABELS, start=1):
+        # Work inside the region's bounding box instead of the whole crop
+        x, y, rw, rh = cv2.boundingRect(cv2.compare(base_labels, index, cv2.CMP_EQ))
+        if rw == 0 or rh == 0:
+            continue
+        roi = (slice(y, y + rh), slice(x, x + rw))
+        region_mask = cv2.compare(base_labels[roi], index, cv2.CMP_EQ)
+        region_count = cv2.countNonZero(region_mask)
+        skin_region = cv2.bitwise_and(region_mask, skin[roi])
+        skin_count = cv2.countNonZero(skin_region)
+        skin_fraction = skin_count / region_count
+
+        # Mask non-skin pixels only in regions that keep enough skin
+        if skin_fraction >= MIN_SKIN_FRACTION:
+            mask, count = skin_region, skin_count
+        else:
+            mask, count = region_mask, region_count
+
+        bgr_mean = cv2.mean(face_bgr[roi], mask=mask)
+        lab_mean = cv2.mean(lab[roi], mask=mask)
+        hsv_mean = cv2.mean(hsv[roi], mask=mask)
+        gray_mean, gray_std = cv2.meanStdDev(gray[roi], mask=mask)
+        _, lap_std = cv2.meanStdDev(laplacian[roi], mask=mask)
+        stats[region] = {
+            "pixel_count": int(count),
+            "skin_fraction": float(skin_fraction),
+            "rgb_mean": [bgr_mean[2], bgr_mean[1], bgr_mean[0]],
+            "lab_mean": list(lab_mean[:3]),
+            "lab_median": [_masked_median(lab[roi], c, mask, count) for c in range(3)],
+            "hsv_mean": list(hsv_mean[:3]),
+            "gray_mean": float(gray_mean[0, 0]),
+            "gray_std": float(gray_std[0, 0]),
+            "gray_median": _masked_median(gray[roi], 0, mask, count),
+            "laplacian_var": float(lap_std[0, 0] ** 2),
+        }
+    return stats
@@ -0,0 +1,112 @@
+"""
+GlamAI - Vision Worker Pool
+Bounded process pool that keeps OpenCV work off the asyncio event loop
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional, Tuple
+from loguru import logger
+import asyncio
+import os
+import time
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.vision import local_stages
+
+
+class VisionPoolBusy(Exception):
+    """Raised when the vision submission queue is full (maps to HTTP 503)"""
+
+
+def _timed_call(fn: Callable[..., Any], args: Tuple[Any, ...]) -> Tuple[Any, float]:
+    """Executed inside the worker: run the stage and report its pure CPU time"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+class VisionWorkerPool:
+    """
+    Process pool with a bounded submission queue.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more may
+    wait; anything beyond that is rejected with VisionPoolBusy instead of
+    piling up latency for every caller on the worker.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None):
+        self.max_workers = max_workers or settings.VISION_POOL_WORKERS or os.cpu_count() or 1
+        self.max_queue = settings.VISION_POOL_MAX_QUEUE if max_queue is None else max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._in_flight - self.max_workers)
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=local_stages.warm_up,
+            )
+            logger.info(f"🧵 Vision worker pool started ({self.max_workers} workers, queue {self.max_queue})")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info("🧵 Vision worker pool stopped")
+
+    def _publish_depth(self):
+        metrics.set_gauge("vision_pool_in_flight", self._in_flight)
+        metrics.set_gauge("vision_pool_queue_depth", self.queue_depth)
+
+    def _release(self):
+        self._in_flight = max(0, self._in_flight - 1)
+        self._publish_depth()
+
+    def _release_from(self, loop: asyncio.AbstractEventLoop):
+        """Done-callback (executor thread): hand the release back to the event loop"""
+        try:
+            loop.call_soon_threadsafe(self._release)
+        except RuntimeError:
+            pass  # loop already closed on shutdown
+
+    async def run(self, stage: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a module-level function in the pool, recording wait and run time"""
+        if self._in_flight >= self.capacity:
+            metrics.incr("vision_pool_rejected_total", stage=stage)
+            raise VisionPoolBusy("Vision workers are busy, please retry shortly")
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+
+        try:
+            job = self._executor.submit(_timed_call, fn, args)
+            # Count the job until the worker is done with it, not until the caller
+            # stops waiting: a deadline cancels the await but the process keeps going
+            self._in_flight += 1
+            self._publish_depth()
+            job.add_done_callback(lambda _: self._release_from(loop))
+            result, run_ms = await asyncio.wrap_future(job)
+        except BrokenProcessPool:
+            logger.error("❌ Vision worker pool broke, restarting")
+            self._executor = None
+            raise
+
+        total_ms = (time.perf_counter() - submitted) * 1000
+        metrics.observe("vision_pool_run_ms", run_ms, stage=stage)
+        metrics.observe("vision_pool_wait_ms", max(0.0, total_ms - run_ms), stage=stage)
+        return result
+
+
+# Singleton instance
+vision_pool = VisionWorkerPool()
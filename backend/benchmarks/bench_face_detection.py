@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+GlamAI - Face Detection Benchmark
+Latency and bbox agreement of the detection modes over the sample faces.
+
+Usage (from backend/):
+    python benchmarks/bench_face_detection.py [images ...] [--runs 5] [--upscale 3000x4000]
+        [--dnn-prototxt deploy.prototxt --dnn-model res10_300x300_ssd_iter_140000.caffemodel]
+
+Every mode is compared against the legacy detector (Haar on the full-size
+grayscale image + eye cascade). "IoU" is the overlap of the largest face
+box with the legacy box; "found" counts images where a face was detected.
+"""
+
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image
+
+from app.services.vision import local_stages
+from app.services.vision.image_context import ImageContext
+from app.services.vision.local_stages import DetectionOptions
+
+SAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "static", "faces")
+
+
+def load_images(paths, upscale):
+    images = {}
+    for path in paths or sorted(glob.glob(os.path.join(SAMPLE_DIR, "*"))):
+        img = Image.open(path).convert("RGB")
+        if upscale:
+            img = img.resize(upscale, Image.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=92)
+        images[os.path.basename(path)] = buf.getvalue()
+    return images
+
+
+def legacy_detect(ctx: ImageContext):
+    """Pre-change behaviour: full-resolution Haar scan, eyes always checked"""
+    gray = ctx.gray
+    faces = local_stages._get_cascade("haarcascade_frontalface_default.xml").detectMultiScale(gray, 1.1, 4)
+    if len(faces) == 0:
+        return None
+    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+    local_stages._get_cascade("haarcascade_eye.xml").detectMultiScale(gray[y:y+h, x:x+w])
+    return int(x), int(y), int(w), int(h)
+
+
+def mode_detect(options: DetectionOptions):
+    def detect(ctx: ImageContext):
+        face_data = local_stages.extract_face_features(ctx, options)
+        if not face_data:
+            return None
+        bbox = face_data["face_bbox"]
+        return bbox["x"], bbox["y"], bbox["width"], bbox["height"]
+    return detect
+
+
+def iou(a, b) -> float:
+    if not a or not b:
+        return 0.0
+    ax1, ay1, bx1, by1 = a[0] + a[2], a[1] + a[3], b[0] + b[2], b[1] + b[3]
+    inter_w = max(0, min(ax1, bx1) - max(a[0], b[0]))
+    inter_h = max(0, min(ay1, by1) - max(a[1], b[1]))
+    inter = inter_w * inter_h
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union else 0.0
+
+
+def measure(detect, contexts, runs):
+    latencies, boxes = [], {}
+    for name, ctx in contexts.items():
+        detect(ctx)  # warm-up (detector load)
+        for _ in range(runs):
+            start = time.perf_counter()
+            boxes[name] = detect(ctx)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.median(latencies)), float(np.percentile(latencies, 95)), boxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--upscale", default="3000x4000", help="WxH to mimic phone photos, '' to keep size")
+    parser.add_argument("--working-side", type=int, default=1600)
+    parser.add_argument("--dnn-prototxt")
+    parser.add_argument("--dnn-model")
+    args = parser.parse_args()
+
+    upscale = tuple(int(v) for v in args.upscale.split("x")) if args.upscale else None
+    images = load_images(args.images, upscale)
+    contexts = {name: ImageContext.from_bytes(data, max_side=args.working_side) for name, data in images.items()}
+    print(f"{len(contexts)} image(s), working copy <= {args.working_side}px, {args.runs} runs each\n")
+
+    modes = {
+        "legacy": legacy_detect,
+        "haar full+eyes": mode_detect(DetectionOptions(detect_max_side=0, min_face_ratio=0.0, detect_eyes=True)),
+        "haar 640": mode_detect(DetectionOptions(detect_max_side=640)),
+        "haar 480": mode_detect(DetectionOptions(detect_max_side=480)),
+        "haar 320": mode_detect(DetectionOptions(detect_max_side=320)),
+    }
+    if args.dnn_prototxt and args.dnn_model:
+        modes["dnn"] = mode_detect(DetectionOptions(
+            backend="dnn", dnn_prototxt=args.dnn_prototxt, dnn_model=args.dnn_model
+        ))
+
+    baseline = None
+    print(f"{'mode':<16} {'p50 ms':>8} {'p95 ms':>8} {'found':>7} {'mean IoU':>9}")
+    for name, detect in modes.items():
+        p50, p95, boxes = measure(detect, contexts, args.runs)
+        if baseline is None:
+            baseline = boxes
+        found = sum(1 for box in boxes.values() if box)
+        mean_iou = np.mean([iou(boxes[k], baseline[k]) for k in boxes]) if boxes else 0.0
+        print(f"{name:<16} {p50:8.1f} {p95:8.1f} {found:>3}/{len(boxes):<3} {mean_iou:9.3f}")
+
+
+if __name__ == "__main__":
+    main()
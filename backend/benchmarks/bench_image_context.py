@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+GlamAI - ImageContext Benchmark
+Compare peak memory and CPU per face analysis before/after decode-once.
+
+Usage (from backend/):
+    python benchmarks/bench_image_context.py [image_path] [--runs 5]
+
+Without an image path the sample face is upscaled to a 12 MP JPEG to
+mimic a phone selfie. Also times the per-region skin stats on a face crop
+against the old single-cheek stats.
+"""
+
+import argparse
+import base64
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.services.vision import local_stages
+from app.services.vision.region_stats import compute_region_stats
+
+SAMPLE_FACE = os.path.join(os.path.dirname(__file__), "..", "static", "faces", "img1.webp")
+
+
+def load_image_bytes(path: str) -> bytes:
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    img = Image.open(SAMPLE_FACE).convert("RGB").resize((3000, 4000), Image.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+def legacy_pipeline(image_bytes: bytes):
+    """Pre-ImageContext flow: full-resolution decode and copies per stage"""
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    faces = local_stages._get_cascade("haarcascade_frontalface_default.xml").detectMultiScale(gray, 1.1, 4)
+    if len(faces):
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        cheek = img_rgb[y:y+h, x:x+w][h//3:2*h//3, 2*w//3:w]
+        gray_cheek = cv2.cvtColor(cheek, cv2.COLOR_RGB2GRAY)
+        np.std(gray_cheek), cv2.Laplacian(gray_cheek, cv2.CV_64F).var()
+        np.mean(cheek, axis=(0, 1))
+        cv2.cvtColor(cheek, cv2.COLOR_RGB2HSV), cv2.cvtColor(cheek, cv2.COLOR_RGB2LAB)
+    # GPT-4o payload was the full original upload
+    return base64.b64encode(image_bytes).decode("utf-8")
+
+
+def context_pipeline(image_bytes: bytes):
+    """Current flow: one ImageContext shared by every stage"""
+    result = local_stages.run_local_analysis(image_bytes)
+    payload = result.get("payload")
+    return base64.b64encode(payload.jpeg if payload else b"").decode("utf-8")
+
+
+def legacy_cheek_stats(face_bgr: np.ndarray):
+    """Pre-region stats: one right-cheek patch, converted per colour space"""
+    h, w = face_bgr.shape[:2]
+    cheek = cv2.cvtColor(face_bgr, cv2.COLOR_BGR2RGB)[h//3:2*h//3, 2*w//3:w]
+    gray_cheek = cv2.cvtColor(cheek, cv2.COLOR_RGB2GRAY)
+    np.std(gray_cheek), cv2.Laplacian(gray_cheek, cv2.CV_64F).var()
+    np.mean(cheek, axis=(0, 1))
+    cv2.cvtColor(cheek, cv2.COLOR_RGB2HSV), cv2.cvtColor(cheek, cv2.COLOR_RGB2LAB)
+
+
+def time_region_stats(runs: int, size: int = 313):
+    """Median wall time (ms) of the stats step on a face crop of `size` px"""
+    face = cv2.resize(cv2.imread(SAMPLE_FACE), (size, size), interpolation=cv2.INTER_AREA)
+    print(f"\nRegion stats on a {size}x{size} face crop ({runs * 20} calls, median)")
+    for name, fn in (("cheek", legacy_cheek_stats), ("regions", compute_region_stats)):
+        fn(face)
+        samples = []
+        for _ in range(runs * 20):
+            start = time.perf_counter()
+            fn(face)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{name:<10} {np.median(samples):6.2f} ms")
+
+
+def measure(name, fn, image_bytes, runs):
+    fn(image_bytes)  # warm-up (cascade load, allocator)
+    peaks, cpu = [], []
+    payload_len = 0
+    for _ in range(runs):
+        tracemalloc.start()
+        start = time.process_time()
+        payload_len = len(fn(image_bytes))
+        cpu.append((time.process_time() - start) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+        tracemalloc.stop()
+    print(
+        f"{name:<10} peak alloc {np.median(peaks):8.1f} MB | "
+        f"cpu {np.median(cpu):8.1f} ms | gpt payload {payload_len / 1e6:6.2f} MB (base64)"
+    )
+    return np.median(peaks), np.median(cpu)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image", nargs="?", default="")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    image_bytes = load_image_bytes(args.image)
+    print(f"Input: {len(image_bytes) / 1e6:.2f} MB, {args.runs} runs (median)\n")
+
+    before = measure("before", legacy_pipeline, image_bytes, args.runs)
+    after = measure("after", context_pipeline, image_bytes, args.runs)
+
+    print(
+        f"\nPeak memory: {before[0] / max(after[0], 1e-9):.1f}x lower, "
+        f"CPU: {before[1] / max(after[1], 1e-9):.1f}x lower"
+    )
+
+    time_region_stats(args.runs)
+
+
+if __name__ == "__main__":
+    main()
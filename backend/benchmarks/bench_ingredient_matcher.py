@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+GlamAI - Ingredient Matcher Benchmark
+Scan time of the compiled Aho-Corasick matcher against substring scanning.
+
+Usage (from backend/):
+    python benchmarks/bench_ingredient_matcher.py [--ingredients 10000] [--runs 5] [--known 0.3]
+
+"legacy" is the old MakeupPlanner nested scan (concerns x bad ingredients x
+product ingredients) over its 4-concern table; "naive" is the same substring
+approach applied to the full curated dictionary, which is what growing the
+old table would cost. "automaton" is IngredientMatcher.evaluate().
+"""
+
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.makeup.ingredient_matcher import (
+    INGREDIENT_DICTIONARY, IngredientMatcher, normalize_term
+)
+
+CONCERNS = ["acne", "sensitive", "oily", "dry"]
+ALLERGIES = ["fragrance", "parabens", "nuts"]
+
+LEGACY_TABLE = {
+    "acne": ["coconut oil", "mineral oil", "dimethicone", "heavy oils"],
+    "sensitive": ["fragrance", "alcohol", "parfum", "essential oils"],
+    "oily": ["heavy oils", "butter", "petroleum"],
+    "dry": ["alcohol", "sulfates"]
+}
+
+
+def make_ingredients(count: int, known_share: float, rng: random.Random):
+    terms = [term for entry in INGREDIENT_DICTIONARY for term in (entry.name, *entry.synonyms)]
+    suffixes = ["extract", "oil", "acid", "glucoside", "ester", "polymer", "copolymer", "chloride"]
+    ingredients = []
+    for _ in range(count):
+        if rng.random() < known_share:
+            ingredients.append(rng.choice(terms).title())
+        else:
+            stem = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12)))
+            ingredients.append(f"{stem} {rng.choice(suffixes)}".title())
+    return ingredients
+
+
+def legacy_scan(ingredients):
+    warnings = []
+    for concern in CONCERNS:
+        for bad_ing in LEGACY_TABLE.get(concern, []):
+            if any(bad_ing.lower() in ing.lower() for ing in ingredients):
+                warnings.append(f"May worsen {concern}: contains {bad_ing}")
+    return warnings
+
+
+def naive_scan(ingredients, terms):
+    lowered = [normalize_term(i) for i in ingredients]
+    return [(term, entry) for term, entry in terms for ing in lowered if term in ing]
+
+
+def timed(fn, runs):
+    samples = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ingredients", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--known", type=float, default=0.3, help="share of ingredients taken from the dictionary")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    ingredients = make_ingredients(args.ingredients, args.known, rng)
+
+    start = time.perf_counter()
+    matcher = IngredientMatcher()
+    build_ms = (time.perf_counter() - start) * 1000
+    terms = [
+        (normalize_term(term), entry)
+        for entry in INGREDIENT_DICTIONARY for term in {entry.name, *entry.synonyms}
+    ]
+
+    print(f"{len(ingredients)} ingredients, {matcher.term_count} dictionary terms, "
+          f"automaton build {build_ms:.1f} ms, median of {args.runs} runs\n")
+    print(f"{'method':<12}{'ms':>10}{'us/ingr':>10}  result")
+
+    legacy_ms, legacy = timed(lambda: legacy_scan(ingredients), args.runs)
+    print(f"{'legacy':<12}{legacy_ms:>10.1f}{legacy_ms * 1000 / len(ingredients):>10.2f}  {len(legacy)} warnings (4-concern table)")
+
+    naive_ms, naive = timed(lambda: naive_scan(ingredients, terms), args.runs)
+    print(f"{'naive':<12}{naive_ms:>10.1f}{naive_ms * 1000 / len(ingredients):>10.2f}  {len(naive)} substring hits")
+
+    auto_ms, report = timed(lambda: matcher.evaluate(ingredients, ALLERGIES, CONCERNS), args.runs)
+    print(f"{'automaton':<12}{auto_ms:>10.1f}{auto_ms * 1000 / len(ingredients):>10.2f}  "
+          f"{len(report.hits)} hits, {len(report.warnings)} warnings, {len(report.unresolved)} unresolved")
+
+    print(f"\nautomaton vs naive: {naive_ms / auto_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+GlamAI - Catalog Search Benchmark
+Query latency of the in-process BM25 ProductIndex and the substitutes
+SimilarityIndex over a synthetic catalog.
+
+Usage (from backend/):
+    python benchmarks/bench_product_search.py [--products 100000] [--queries 200]
+
+Each scenario runs --queries random queries and reports p50 / p95 / max in
+milliseconds. "scan" is a pure-Python linear pass over the same documents
+(substring match + filters + sort), i.e. what searching without an index
+costs; an Azure Search round trip is typically 30-150 ms on top of that.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.search.product_index import (
+    ORDER_POPULARITY, ORDER_RATING, ORDER_RELEVANCE, ProductIndex, tokenize
+)
+from app.services.search.similarity_index import MODE_BLEND, MODE_FORMULA, MODE_SHADE, SimilarityIndex
+
+CATEGORIES = ["foundation", "concealer", "lipstick", "blush", "eyeshadow", "mascara", "eyeliner", "primer", "setting_spray"]
+BRANDS = [f"brand{i}" for i in range(400)] + ["maybelline", "lakme", "nykaa", "mac", "loreal", "fenty"]
+WORDS = [
+    "matte", "dewy", "hydrating", "longwear", "velvet", "satin", "glow", "nude", "rose", "coral",
+    "berry", "warm", "cool", "neutral", "liquid", "stick", "powder", "cream", "waterproof", "vegan",
+    "sheer", "bold", "radiant", "soft", "silk", "mineral", "budget", "friendly", "luxury", "travel",
+]
+TAGS = ["vegan", "cruelty-free", "paraben-free", "fragrance-free", "spf", "oil-free", "budget-friendly", "bestseller"]
+INGREDIENTS = [
+    "water", "glycerin", "dimethicone", "niacinamide", "hyaluronic acid", "titanium dioxide", "iron oxides",
+    "mica", "tocopherol", "fragrance", "phenoxyethanol", "squalane", "shea butter", "coconut oil", "kaolin",
+    "silica", "talc", "zinc oxide", "ceramide", "vitamin c", "salicylic acid", "retinol", "aloe vera",
+]
+SHADES = ["Ruby Red", "Warm Honey", "Ivory", "Coral Crush", "Berry", "Deep Mocha", "Nude Beige", "#C68642", "Shade 120"]
+
+
+def make_catalog(count: int, rng: random.Random):
+    return [
+        {
+            "id": i,
+            "category": rng.choice(CATEGORIES),
+            "brand": rng.choice(BRANDS),
+            "product_name": " ".join(rng.sample(WORDS, rng.randint(2, 5))),
+            "price": round(rng.uniform(99, 4999), 2),
+            "average_rating": round(rng.uniform(2.5, 5.0), 1),
+            "total_reviews": int(rng.expovariate(1 / 400)),
+            "in_stock": rng.random() < 0.9,
+            "tags": rng.sample(TAGS, rng.randint(0, 3)),
+            "ingredients": rng.sample(INGREDIENTS, rng.randint(4, 12)),
+            "shade": rng.choice(SHADES),
+        }
+        for i in range(count)
+    ]
+
+
+def make_queries(count: int, rng: random.Random):
+    return [
+        {
+            "query": " ".join(rng.sample(WORDS + INGREDIENTS[:6], rng.randint(1, 3))),
+            "category": rng.choice(CATEGORIES + [None]),
+            "max_price": rng.choice([None, 499.0, 999.0, 1999.0]),
+        }
+        for _ in range(count)
+    ]
+
+
+def scan(docs, query, category, max_price, top):
+    terms = set(tokenize(query)) if query else set()
+    hits = []
+    for d in docs:
+        if not d["in_stock"] or (category and d["category"] != category):
+            continue
+        if max_price is not None and d["price"] > max_price:
+            continue
+        if terms:
+            text = set(tokenize(" ".join([d["product_name"], d["brand"], *d["tags"], *d["ingredients"]])))
+            if not terms & text:
+                continue
+        hits.append(d)
+    hits.sort(key=lambda d: (d["average_rating"], d["total_reviews"]), reverse=True)
+    return hits[:top]
+
+
+def run(label, fn, queries):
+    samples = []
+    hits = 0
+    for q in queries:
+        start = time.perf_counter()
+        hits += len(fn(q))
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<28}{statistics.median(samples):>9.2f}{p95:>9.2f}{samples[-1]:>9.2f}{hits / len(queries):>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--no-scan", action="store_true", help="skip the linear-scan baseline")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    docs = make_catalog(args.products, rng)
+    queries = make_queries(args.queries, rng)
+
+    start = time.perf_counter()
+    index = ProductIndex(capacity=len(docs))
+    index.upsert(docs)
+    index.warm()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    index.upsert(rng.sample(docs, 1000))
+    update_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{len(index)} products, build {build_ms:.0f} ms, 1000 incremental upserts {update_ms:.1f} ms\n")
+    print(f"{'scenario':<28}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'hits':>9}")
+
+    top = args.top
+    run("bm25 relevance", lambda q: index.search(q["query"], order_by=ORDER_RELEVANCE, top=top), queries)
+    run("bm25 + filters, rating", lambda q: index.search(
+        q["query"], category=q["category"], max_price=q["max_price"], order_by=ORDER_RATING, top=top), queries)
+    run("match-all + filters, rating", lambda q: index.search(
+        "*", category=q["category"], max_price=q["max_price"], order_by=ORDER_RATING, top=top), queries)
+    run("trending (popularity)", lambda q: index.search(
+        None, category=q["category"], order_by=ORDER_POPULARITY, top=top), queries)
+
+    start = time.perf_counter()
+    similarity = SimilarityIndex(capacity=len(docs))
+    similarity.upsert(docs)
+    print(f"\nsimilarity index build {(time.perf_counter() - start) * 1000:.0f} ms\n")
+    sources = [dict(rng.choice(docs), id=None) for _ in range(len(queries))]
+    for mode in (MODE_FORMULA, MODE_SHADE, MODE_BLEND):
+        run(f"substitutes ({mode})", lambda p: similarity.substitutes(p, k=top, mode=mode, max_price=p["price"]), sources)
+
+    if not args.no_scan:
+        run("scan + filters, rating", lambda q: scan(docs, q["query"], q["category"], q["max_price"], top), queries[:20])
+
+
+if __name__ == "__main__":
+    main()
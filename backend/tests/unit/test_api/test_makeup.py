@@ -0,0 +1,103 @@
+"""
+GlamAI - Makeup Endpoint Tests
+Product matching against the vanity and the profile's skin tone
+"""
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.api.deps.auth import get_current_user
+from app.api.v1.endpoints import makeup
+from app.db.database import Base, get_db
+from app.models import (
+    MakeupScope,
+    MakeupSession,
+    OccasionType,
+    ProductCategory,
+    User,
+    UserProfile,
+    VanityProduct,
+)
+
+SKIN_HEX = "#C68E5A"
+
+MAKEUP_PLAN = {
+    "occasion": "office",
+    "steps": [],
+    "product_requirements": [
+        {"category": "foundation", "specific_type": "liquid foundation", "priority": "required"},
+        {"category": "lipstick", "specific_type": "nude lipstick", "priority": "optional"},
+    ],
+}
+
+
+@pytest_asyncio.fixture
+async def db():
+    # In-memory SQLite shared by every connection of the pool
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def user(db):
+    user = User(email="priya@example.com", full_name="Priya")
+    db.add(user)
+    await db.flush()
+    db.add(UserProfile(user_id=user.id, skin_tone_hex=SKIN_HEX))
+    db.add_all([
+        VanityProduct(user_id=user.id, category=ProductCategory.FOUNDATION,
+                      brand="Lakme", product_name="9 to 5 Primer + Matte", shade="Porcelain"),
+        VanityProduct(user_id=user.id, category=ProductCategory.FOUNDATION,
+                      brand="Maybelline", product_name="Fit Me Matte", shade="Warm Honey"),
+        VanityProduct(user_id=user.id, category=ProductCategory.FOUNDATION,
+                      brand="Nykaa", product_name="Skin Shield", shade="Espresso", is_active=False),
+    ])
+    db.add(MakeupSession(id=1, user_id=user.id, occasion=OccasionType.OFFICE,
+                         scope=MakeupScope.FULL_FACE, makeup_plan=MAKEUP_PLAN))
+    await db.commit()
+    # Fresh instance, like get_current_user returns, so the profile is not loaded yet
+    db.expunge_all()
+    return await db.get(User, user.id)
+
+
+@pytest_asyncio.fixture
+async def client(db, user):
+    app = FastAPI()
+    app.include_router(makeup.router, prefix="/makeup")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: user
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_match_products_uses_profile_skin_tone(client):
+    response = await client.get("/makeup/1/product-matching")
+    assert response.status_code == 200
+    matches = {match["category"]: match for match in response.json()}
+
+    # Closest active shade to the profile's skin tone wins
+    foundation = matches["foundation"]
+    assert foundation["has_product"] is True
+    assert foundation["product_name"] == "Fit Me Matte"
+    assert foundation["shade"] == "Warm Honey"
+    assert foundation["substitution_suggestions"] == ["Lakme 9 to 5 Primer + Matte"]
+
+    lipstick = matches["lipstick"]
+    assert lipstick["has_product"] is False
+    assert lipstick["need_to_buy"] is True
+    assert lipstick["recommended_products"][0]["type"] == "lipstick"
+
+
+@pytest.mark.asyncio
+async def test_match_products_unknown_session(client):
+    response = await client.get("/makeup/99/product-matching")
+    assert response.status_code == 404
@@ -0,0 +1,57 @@
+"""
+GlamAI - Shade Colour Space Tests
+CIEDE2000 against the Sharma et al. (2005) reference pairs
+"""
+
+import numpy as np
+import pytest
+
+from app.services.search.color import delta_e2000, delta_e76, hex_to_lab, shade_to_lab
+
+# (Lab 1, Lab 2, ΔE2000) from the CIEDE2000 supplementary test data
+SHARMA_PAIRS = [
+    ((50.0000, 2.6772, -79.7751), (50.0000, 0.0000, -82.7485), 2.0425),
+    ((50.0000, 3.1571, -77.2803), (50.0000, 0.0000, -82.7485), 2.8615),
+    ((50.0000, 0.0000, 0.0000), (50.0000, -1.0000, 2.0000), 2.3669),
+    ((50.0000, 2.4900, -0.0010), (50.0000, -2.4900, 0.0009), 7.1792),
+    ((50.0000, 2.5000, 0.0000), (73.0000, 25.0000, -18.0000), 27.1492),
+    ((60.2574, -34.0099, 36.2677), (60.4626, -34.1751, 39.4387), 1.2644),
+    ((2.0776, 0.0795, -1.1350), (0.9033, -0.0636, -0.5514), 0.9082),
+]
+
+
+@pytest.mark.parametrize("lab1, lab2, expected", SHARMA_PAIRS)
+def test_delta_e2000_matches_reference(lab1, lab2, expected):
+    assert delta_e2000(lab1, np.array([lab2]))[0] == pytest.approx(expected, abs=1e-4)
+
+
+def test_delta_e2000_is_symmetric():
+    for lab1, lab2, expected in SHARMA_PAIRS:
+        assert delta_e2000(lab2, np.array([lab1]))[0] == pytest.approx(expected, abs=1e-4)
+
+
+def test_delta_e2000_vectorised_over_rows():
+    reference = SHARMA_PAIRS[0][1]
+    labs = np.array([pair[0] for pair in SHARMA_PAIRS[:2]] + [reference])
+    distances = delta_e2000(reference, labs)
+    assert distances.shape == (3,)
+    assert distances[:2] == pytest.approx([2.0425, 2.8615], abs=1e-4)
+    assert distances[2] == pytest.approx(0.0)
+
+
+def test_delta_e76_is_euclidean():
+    assert delta_e76((50, 0, 0), np.array([[53, 4, 0]]))[0] == pytest.approx(5.0)
+
+
+def test_hex_to_lab_white_and_black():
+    assert hex_to_lab("#FFFFFF") == pytest.approx([100.0, 0.0, 0.0], abs=0.01)
+    assert hex_to_lab("000000") == pytest.approx([0.0, 0.0, 0.0], abs=0.01)
+    assert hex_to_lab("no colour here") is None
+
+
+def test_shade_to_lab_names_and_embedded_hex():
+    # Shade names average the swatches of the words they contain
+    assert shade_to_lab("Warm Honey Beige") == pytest.approx((hex_to_lab("#C68E5A") + hex_to_lab("#D9B48F")) / 2)
+    assert shade_to_lab("Custom #C68E5A") == pytest.approx(hex_to_lab("#C68E5A"))
+    assert shade_to_lab("Shade 220") is None
+    assert shade_to_lab(None) is None
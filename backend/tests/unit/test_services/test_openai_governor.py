@@ -0,0 +1,203 @@
+"""
+GlamAI - Azure OpenAI Governor Tests
+Token buckets, AIMD concurrency and admission under priority
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from app.core.config import settings
+from app.services.azure import openai_governor as governor_module
+from app.services.azure.openai_governor import OpenAIGovernor, Priority, TokenBucket
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Only for synchronous tests (the event loop reads time.monotonic as well);
+    # request it before `governor` so the buckets start on the fake clock
+    fake = FakeClock()
+    monkeypatch.setattr(governor_module.time, "monotonic", fake)
+    return fake
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_MIN_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "OPENAI_INITIAL_CONCURRENCY", 4)
+    monkeypatch.setattr(settings, "OPENAI_MAX_CONCURRENCY", 5)
+    monkeypatch.setattr(settings, "OPENAI_LATENCY_TARGET_MS", 1000.0)
+    monkeypatch.setattr(settings, "OPENAI_BACKGROUND_SHARE", 0.5)
+    monkeypatch.setattr(settings, "OPENAI_RPM_LIMIT", 600)
+    monkeypatch.setattr(settings, "OPENAI_TPM_LIMIT", 60000)
+    return OpenAIGovernor("test-deployment")
+
+
+def rate_limit_error(headers: dict) -> openai.RateLimitError:
+    request = httpx.Request("POST", "https://example.openai.azure.com/chat/completions")
+    response = httpx.Response(429, headers=headers, request=request)
+    return openai.RateLimitError("Too Many Requests", response=response, body=None)
+
+
+# ============================================================
+# 🪣 TOKEN BUCKET
+# ============================================================
+def test_bucket_refills_continuously(clock):
+    bucket = TokenBucket(60, period=60.0)  # one unit per second
+    assert bucket.wait_time(60) == 0.0
+
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+
+    clock.now += 30
+    assert bucket.wait_time(30) == 0.0
+    assert bucket.wait_time(45) == pytest.approx(15.0)
+
+
+def test_bucket_clamps_requests_to_capacity(clock):
+    bucket = TokenBucket(60, period=60.0)
+    # A request bigger than the whole bucket waits for a full bucket, not forever
+    bucket.take(500)
+    assert bucket.tokens == pytest.approx(0.0)
+    assert bucket.wait_time(500) == pytest.approx(60.0)
+
+
+def test_bucket_adjust_refunds_and_charges(clock):
+    bucket = TokenBucket(100, period=60.0)
+    bucket.take(80)
+    bucket.adjust(30)
+    assert bucket.tokens == pytest.approx(50.0)
+    bucket.adjust(-70)
+    assert bucket.tokens == pytest.approx(-20.0)
+    bucket.adjust(1000)
+    assert bucket.tokens == pytest.approx(100.0)
+
+
+def test_zero_capacity_bucket_never_blocks(clock):
+    assert TokenBucket(0).wait_time(10_000) == 0.0
+
+
+# ============================================================
+# 📈 AIMD
+# ============================================================
+def test_fast_success_increases_additively(clock, governor):
+    governor._on_success(100.0)
+    assert governor.limit == pytest.approx(4.25)
+    for _ in range(20):
+        governor._on_success(100.0)
+    assert governor.limit == pytest.approx(5.0)  # capped at OPENAI_MAX_CONCURRENCY
+
+
+def test_slow_success_trims_limit(clock, governor):
+    governor._on_success(5000.0)
+    assert governor.limit == pytest.approx(3.6)
+
+
+def test_throttle_halves_once_per_second(clock, governor):
+    governor._on_throttle(None)
+    assert governor.limit == pytest.approx(2.0)
+
+    governor._on_throttle(None)  # same burst
+    assert governor.limit == pytest.approx(2.0)
+
+    clock.now += 1.5
+    governor._on_throttle(None)
+    clock.now += 1.5
+    governor._on_throttle(None)
+    assert governor.limit == pytest.approx(1.0)  # floor at OPENAI_MIN_CONCURRENCY
+
+
+def test_retry_after_pauses_admission(clock, governor):
+    assert not governor.saturated
+    governor._on_throttle(5.0)
+    assert governor.saturated
+    clock.now += 5.1
+    assert not governor.saturated
+
+
+def test_usage_reconciles_token_bucket(clock, governor):
+    governor.tokens.take(1000)
+    governor._reconcile_tokens(SimpleNamespace(usage=SimpleNamespace(total_tokens=400)), estimated=1000)
+    assert governor.tokens.tokens == pytest.approx(60000 - 400)
+
+
+def test_retry_after_header_parsing(monkeypatch):
+    monkeypatch.setattr(governor_module.random, "uniform", lambda a, b: 0.0)
+    assert governor_module._retry_after(SimpleNamespace(headers={"retry-after-ms": "1500"})) == pytest.approx(1.5)
+    assert governor_module._retry_after(SimpleNamespace(headers={"retry-after": "3"})) == pytest.approx(3.0)
+    assert governor_module._retry_after(SimpleNamespace(headers={"retry-after": "3600"})) == pytest.approx(
+        settings.OPENAI_BACKOFF_MAX_SECONDS
+    )
+    assert governor_module._retry_after(SimpleNamespace(headers={})) is None
+
+
+# ============================================================
+# 🎟️ ADMISSION
+# ============================================================
+@pytest.mark.asyncio
+async def test_background_work_gets_a_share_of_the_limit(governor):
+    release = asyncio.Event()
+    started = []
+
+    async def request(tag):
+        started.append(tag)
+        await release.wait()
+        return tag
+
+    background = [
+        asyncio.create_task(governor.call(lambda i=i: request(f"bg{i}"), level=Priority.BACKGROUND))
+        for i in range(3)
+    ]
+    await asyncio.sleep(0.01)
+    assert governor.in_flight == 2  # 4 * OPENAI_BACKGROUND_SHARE
+
+    interactive = asyncio.create_task(governor.call(lambda: request("ui"), level=Priority.INTERACTIVE))
+    await asyncio.sleep(0.01)
+    assert "ui" in started and governor.in_flight == 3
+
+    release.set()
+    results = await asyncio.gather(*background, interactive)
+    assert sorted(results) == ["bg0", "bg1", "bg2", "ui"]
+    assert governor.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_throttled_call_is_retried_and_shrinks_limit(governor, monkeypatch):
+    monkeypatch.setattr(governor_module.random, "uniform", lambda a, b: 0.0)
+    attempts = []
+
+    async def request():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise rate_limit_error({"retry-after-ms": "10"})
+        return "ok"
+
+    assert await governor.call(request, retries=2) == "ok"
+    assert len(attempts) == 2
+    assert governor.limit == pytest.approx(2.0 + 1 / 2.0)  # halved, then one fast success
+    assert governor.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_non_transient_errors_are_not_retried(governor):
+    attempts = []
+
+    async def request():
+        attempts.append(1)
+        raise ValueError("bad request body")
+
+    with pytest.raises(ValueError):
+        await governor.call(request, retries=3)
+    assert len(attempts) == 1
+    assert governor.in_flight == 0
@@ -0,0 +1,90 @@
+"""
+GlamAI - Product Search Index Tests
+BM25F ranking, filters and sorts of the in-process catalog index
+"""
+
+import pytest
+
+from app.services.search.product_index import (
+    ORDER_POPULARITY,
+    ORDER_RATING,
+    ProductIndex,
+    tokenize,
+)
+
+CATALOG = [
+    {"id": 1, "brand": "Lakme", "product_name": "Absolute Matte Lipstick", "category": "lipstick",
+     "price": 650, "average_rating": 4.2, "total_reviews": 900, "tags": ["matte"], "ingredients": ["castor oil"]},
+    {"id": 2, "brand": "Maybelline", "product_name": "Color Sensational Lip Gloss", "category": "lip_gloss",
+     "price": 450, "average_rating": 4.5, "total_reviews": 300, "tags": ["glossy"], "ingredients": ["shea butter"]},
+    {"id": 3, "brand": "Nykaa", "product_name": "Velvet Lip Crayon", "category": "lipstick",
+     "price": 399, "average_rating": 3.9, "total_reviews": 1500, "tags": ["matte", "lipstick"],
+     "ingredients": ["vitamin e"]},
+    {"id": 4, "brand": "Lakme", "product_name": "Serum Foundation", "category": "foundation",
+     "price": 900, "average_rating": 4.7, "total_reviews": 120, "tags": ["dewy"], "ingredients": ["castor oil"]},
+    {"id": 5, "brand": "Mamaearth", "product_name": "Castor Oil Kajal", "category": "kajal",
+     "price": 250, "average_rating": 4.0, "total_reviews": 50, "tags": [], "ingredients": ["castor oil"],
+     "in_stock": False},
+]
+
+
+@pytest.fixture
+def index():
+    products = ProductIndex(capacity=2)  # forces the column arrays to grow
+    assert products.upsert(CATALOG) == len(CATALOG)
+    return products
+
+
+def ids(results):
+    return [doc["id"] for doc in results]
+
+
+def test_tokenize_folds_plurals_and_drops_stopwords():
+    assert tokenize("Lipsticks for the Eyes and Lips") == ["lipstick", "eye", "lip"]
+    assert tokenize("Gloss") == ["gloss"]
+
+
+def test_name_match_outranks_tag_match(index):
+    # Product 1 has "lipstick" in the name (weight 3), product 3 only as a tag (1.5)
+    results = index.search("lipstick")
+    assert ids(results) == ["1", "3"]
+    assert results[0]["@search.score"] > results[1]["@search.score"] > 0
+
+
+def test_rare_terms_weigh_more(index):
+    # "castor" is in three documents, "serum" in one: the serum hit wins
+    results = index.search("serum castor", in_stock=None)
+    assert ids(results)[0] == "4"
+    assert set(ids(results)) == {"1", "4", "5"}
+
+
+def test_more_query_terms_matched_scores_higher(index):
+    assert ids(index.search("lakme matte lipstick"))[0] == "1"
+
+
+def test_filters(index):
+    assert set(ids(index.search("castor"))) == {"1", "4"}
+    assert ids(index.search("castor", in_stock=False)) == ["5"]
+    assert ids(index.search("lip", category="lipstick")) == ["3"]
+    assert set(ids(index.search(category="lipstick", max_price=500))) == {"3"}
+    assert set(ids(index.search(min_price=600))) == {"1", "4"}
+    assert index.search("lip", category="eyeliner") == []
+    assert index.search("nonexistent") == []
+
+
+def test_sorts_and_paging(index):
+    assert ids(index.search("*", order_by=ORDER_RATING)) == ["4", "2", "1", "3"]
+    assert ids(index.search(order_by=ORDER_POPULARITY)) == ["3", "1", "2", "4"]
+    assert ids(index.search(order_by=ORDER_RATING, top=2, skip=1)) == ["2", "1"]
+
+
+def test_upsert_replaces_and_remove_drops(index):
+    index.upsert([{**CATALOG[2], "product_name": "Velvet Lipstick Crayon"}])
+    assert len(index) == len(CATALOG)
+    # Now a name and a tag hit
+    assert ids(index.search("lipstick")) == ["3", "1"]
+    assert index.get(3)["product_name"] == "Velvet Lipstick Crayon"
+
+    assert index.remove([1, 99]) == 1
+    assert ids(index.search("lipstick")) == ["3"]
+    assert index.get(1) is None
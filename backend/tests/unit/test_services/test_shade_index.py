@@ -0,0 +1,88 @@
+"""
+GlamAI - Shade Matching Index Tests
+"""
+
+import numpy as np
+import pytest
+
+from app.services.search.color import delta_e2000, hex_to_lab, srgb_to_lab
+from app.services.search.shade_index import ShadeIndex, shade_delta_e
+
+SKIN_HEX = "#C68E5A"  # "honey" swatch
+
+
+@pytest.fixture
+def index():
+    shades = ShadeIndex()
+    shades.upsert([
+        {"id": 1, "category": "foundation", "shade": "Honey"},
+        {"id": 2, "category": "foundation", "shade": "Warm Honey Beige"},
+        {"id": 3, "category": "foundation", "shade": "Porcelain"},
+        {"id": 4, "category": "foundation", "shade": "Espresso"},
+        {"id": 5, "category": "foundation", "shade": "No. 220"},    # unresolvable, skipped
+        {"id": 6, "category": "concealer", "shade": "#C68E5A"},
+        {"id": 7, "category": "lipstick", "shade": "Ruby Red"},
+    ])
+    return shades
+
+
+def test_closest_ranks_by_delta_e(index):
+    matches = index.closest(SKIN_HEX, "foundation", n=5, max_delta_e=15.0)
+    assert [pid for pid, _ in matches] == ["1", "2"]
+    assert matches[0][1] == pytest.approx(0.0, abs=1e-6)
+    assert matches[0][1] < matches[1][1] < 15.0
+
+
+def test_closest_respects_threshold_and_n(index):
+    assert index.closest(SKIN_HEX, "foundation", n=1, max_delta_e=15.0) == [("1", pytest.approx(0.0, abs=1e-6))]
+    assert all(de < 1.0 for _, de in index.closest(SKIN_HEX, "foundation", max_delta_e=1.0))
+    assert index.closest(SKIN_HEX, "foundation", n=0) == []
+
+
+def test_closest_is_per_category(index):
+    assert [pid for pid, _ in index.closest(SKIN_HEX, "concealer")] == ["6"]
+    assert index.closest(SKIN_HEX, "lipstick") == []
+    assert index.closest(SKIN_HEX, "primer") == []
+
+
+def test_closest_accepts_lab_and_enum_category(index):
+    from app.models.vanity import ProductCategory
+
+    matches = index.closest(hex_to_lab(SKIN_HEX), ProductCategory.FOUNDATION, n=1)
+    assert matches[0][0] == "1"
+
+
+def test_unknown_colour_returns_nothing(index):
+    assert index.closest("not a colour", "foundation") == []
+    assert len(index) == 6
+
+
+def test_upsert_and_remove_rebuild_category(index):
+    index.remove([1])
+    assert index.closest(SKIN_HEX, "foundation", n=1, max_delta_e=15.0)[0][0] == "2"
+
+    # Re-shading an existing product moves it to the new colour
+    index.upsert([{"id": 4, "category": "foundation", "shade": SKIN_HEX}])
+    assert index.closest(SKIN_HEX, "foundation", n=1)[0] == ("4", pytest.approx(0.0, abs=1e-6))
+
+
+def test_kd_tree_path_matches_brute_force():
+    rng = np.random.default_rng(7)
+    rgb = rng.integers(60, 240, size=(500, 3))
+    shades = ShadeIndex()
+    shades.upsert(
+        {"id": i, "category": "foundation", "shade": "#%02X%02X%02X" % tuple(c)}
+        for i, c in enumerate(rgb)
+    )
+    skin = srgb_to_lab(np.array([198, 142, 90]))
+
+    distances = delta_e2000(skin, srgb_to_lab(rgb))
+    expected = [str(i) for i in np.argsort(distances, kind="stable")[:5] if distances[i] < 8.0]
+    assert [pid for pid, _ in shades.closest(skin, "foundation", n=5, max_delta_e=8.0)] == expected
+
+
+def test_shade_delta_e():
+    assert shade_delta_e(SKIN_HEX, "Honey") == pytest.approx(0.0, abs=1e-6)
+    assert shade_delta_e(SKIN_HEX, "Porcelain") > 10
+    assert shade_delta_e(SKIN_HEX, "No. 220") is None
+    assert shade_delta_e(None, "Honey") is None